@@ -0,0 +1,389 @@
+## ------------- LIBRARY -------------- ##
+import sys
+import time
+import argparse
+from collections import deque
+
+from world import World
+from inputs import Inputs, UP, DOWN, LEFT, RIGHT, SPACE, KEY_M
+from sprites import Sprite, Bullet, Alien, Coin, Player
+from collision import centers_close, swept_overlaps, swept_centers_close
+from memory import GCManager
+
+
+### ----------------------------------- ###
+### ------------- AUTOPILOT ----------- ###
+### ----------------------------------- ###
+
+# the ship plays itself (attract mode, soak tests): every step it looks ahead and picks
+# the keys instead of pyxel.btn
+#   pilot = Autopilot(budget_ms=4)
+#   world.step(pilot.inputs(world))
+#
+# the search is a beam search over the five moves (stay, up, down, left, right), always shooting.
+# a move is held for `repeat` steps, the `width` best ways to go are kept at every depth,
+# down to `depth` moves ahead, until the time budget of the decision is used up.
+# the world isn't stepped for that (the pools live on the classes, and stepping them costs
+# the grids and the compacts): observe() copies what matters into a Lookahead state and
+# ahead() steps that copy with the same rules as the game (benchmarks/autopilot.py checks it
+# against the pools' own update_all step by step)
+MOVES = (0, UP, DOWN, LEFT, RIGHT)
+
+# a crash ends the search down that way, surviving longer is still better
+CRASH = -1000.0
+
+
+## ----- Lookahead: the world as plain tuples ----- ##
+# (x, y, px, py, score, crashed, aliens, bullets, coins)
+#   aliens, coins -> tuples of (x, y, vx), bullets -> tuples of (x, y)
+# nothing in a state is ever changed, a step makes a new one: a state is its own clone,
+# the beam keeps as many as it wants for free
+# what it leaves out: the stars (nothing hits a star), the explosions (only drawn), the animation
+# frames and the spawns (the new aliens come in at the right edge, further than the search looks)
+def observe(world):
+    player = Player.player
+    if Sprite.vectorized:
+        def rows(cls):
+            sprites = cls.sprites
+            n = len(sprites)
+            return tuple(zip(sprites.x[:n].tolist(), sprites.y[:n].tolist(), sprites.vx[:n].tolist()))
+        bullets = Bullet.sprites
+        n = len(bullets)
+        shots = tuple(zip(bullets.x[:n].tolist(), bullets.y[:n].tolist()))
+        return (player.x, player.y, player.px, player.py, world.score, world.state != "Playing",
+                rows(Alien), shots, rows(Coin))
+    return (player.x, player.y, player.px, player.py, world.score, world.state != "Playing",
+            tuple((sprite.x, sprite.y, sprite.vx) for sprite in Alien.sprites),
+            tuple((sprite.x, sprite.y) for sprite in Bullet.sprites),
+            tuple((sprite.x, sprite.y, sprite.vx) for sprite in Coin.sprites))
+
+
+# one step of World.step while playing (Bullet, Alien, Coin update_all, then Player.update)
+# -> the next state
+def ahead(world, state, held, shoot=True):
+    x, y, px, py, score, crashed, aliens, bullets, coins = state
+    continuous = Sprite.continuous
+    right = world.width
+    aw, ah = Alien.width, Alien.height
+    bw, bh = Bullet.width, Bullet.height
+    cw, ch = Coin.width, Coin.height
+    pw, ph = Player.width, Player.height
+    radius = Alien.crash_radius
+    # bullets go right (speed is negative), gone past the right edge
+    shift = -Bullet.speed
+    bullets = [(bx + shift, by) for bx, by in bullets if bx + shift <= right]
+    hit = [False] * len(bullets)
+
+    # aliens: a bullet takes the first alien it touches, in spawn order, an alien the first bullet
+    # the ship crashes into any alien whose center is close enough (one that was just shot too)
+    # swept: only the boxes around the whole moves that overlap get the real test (like the grids)
+    reach = radius + aw
+    top = min(y, py) - reach
+    bottom = max(y, py) + ph + reach
+    kept = []
+    for ax, ay, vx in aliens:
+        # where it was (the swept tests go from there) and where it goes
+        x0 = ax
+        ax -= vx
+        if continuous:
+            if x0 < -aw:
+                continue
+        elif ax < -aw:
+            continue
+        dead = False
+        for i, (bx, by) in enumerate(bullets):
+            if hit[i] or not (by < ay + ah and ay < by + bh):
+                continue
+            if continuous:
+                touched = (bx - shift < max(ax, x0) + aw and min(ax, x0) < bx + bw and
+                           swept_overlaps(x0, ay, ax, ay, aw, ah, bx - shift, by, bx, by, bw, bh))
+            else:
+                touched = bx < ax + aw and ax < bx + bw
+            if touched:
+                hit[i] = True
+                dead = True
+                break
+        if continuous:
+            close = (top < ay + ah and ay < bottom and
+                     swept_centers_close(px, py, x, y, pw, ph, x0, ay, ax, ay, aw, ah, radius))
+        else:
+            close = centers_close(x, y, pw, ph, ax, ay, aw, ah, radius)
+        if close:
+            crashed = True
+            dead = True
+        # (swept: gone after this frame, but it could still hit something on its way out)
+        if not dead and ax >= -aw:
+            kept.append((ax, ay, vx))
+    if any(hit):
+        bullets = [bullet for bullet, gone in zip(bullets, hit) if not gone]
+
+    # coins: collected when they touch the ship where it is (swept: along its last move)
+    left = []
+    for cx, cy, vx in coins:
+        cx -= vx
+        if cx < -cw:
+            continue
+        if continuous:
+            touched = swept_overlaps(px, py, x, y, pw, ph, cx + vx, cy, cx, cy, cw, ch)
+        else:
+            touched = cx < x + pw and x < cx + cw and cy < y + ph and y < cy + ch
+        if touched:
+            # (the ship crashing on the same step scores nothing)
+            if not crashed:
+                score += 1
+            continue
+        left.append((cx, cy, vx))
+
+    # the ship (Player.update)
+    px, py = x, y
+    if held & UP:
+        y = max(y - 2, 0)
+    if held & DOWN:
+        y = min(y + 2, world.height - ph)
+    if held & LEFT:
+        x = max(x - 2, 2)
+    if held & RIGHT:
+        x = min(x + 2, world.width // 2)
+    if shoot and len(bullets) < Bullet.max_live:
+        bullets.append((x + pw - 8, y + ph // 2 - 8 // 2))
+    return (x, y, px, py, score, crashed, tuple(kept), tuple(bullets), tuple(left))
+
+
+# how good a state is, `steps` steps after the decision, starting from `score`
+def evaluate(world, state, score, steps):
+    x, y, _, _, now, crashed, aliens, _, coins = state
+    if crashed:
+        return CRASH + steps
+    value = 10.0 * (now - score)
+
+    x += Player.width / 2
+    y += Player.height / 2
+    # the aliens coming at the ship: closer in y and fewer steps away -> worse
+    half = Alien.height / 2 + Player.height / 2 + 4
+    for ax, ay, vx in aliens:
+        dx = ax + Alien.width / 2 - x
+        dy = abs(ay + Alien.height / 2 - y)
+        if dy >= half or dx < -Alien.width:
+            continue
+        arrives = max(dx, 0.0) / max(vx, 0.5)
+        if arrives < 30:
+            value -= 3.0 * (1 - dy / half) * (1 - arrives / 30)
+    # the nearest coin still ahead pulls the ship
+    nearest = None
+    for cx, cy, _ in coins:
+        dx = cx + Coin.width / 2 - x
+        if dx < -Coin.width:
+            continue
+        distance = abs(cy + Coin.height / 2 - y) + max(dx, 0.0) / 4
+        if nearest is None or distance < nearest:
+            nearest = distance
+    if nearest is not None:
+        value -= 0.02 * nearest
+    # the middle leaves room to go either way
+    value -= 0.005 * abs(y - world.height / 2)
+    return value
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+
+
+class Autopilot:
+    def __init__(self, budget_ms=4.0, depth=8, width=4, repeat=3, restart_after=60, latencies=10000):
+        # time for one decision (the front end splits a frame's budget between its steps)
+        self.budget_ms = budget_ms
+        self.depth = depth
+        self.width = width
+        self.repeat = repeat
+        # steps on the game over screen before starting again (0 -> right away)
+        self.restart_after = restart_after
+        self.ended = 0
+        # the last move, kept when a decision runs out of time before the first depth
+        self.move = 0
+
+        # totals: decisions, nodes (one move held `repeat` steps), steps looked ahead, time searching,
+        # depths reached, decisions that went over their budget
+        self.decisions = 0
+        self.nodes = 0
+        self.steps = 0
+        self.search_time = 0.0
+        self.depths = 0
+        self.late = 0
+        # the last decisions' time, ms
+        self.latencies = deque(maxlen=latencies)
+        # late decisions whose search fit in the budget in CPU time: the thread was preempted
+        self.preempted = 0
+        # seconds: the worst node (None before the first decision measured one), what runs after
+        # the last node (the sort, the bookkeeping)
+        self.worst = None
+        self.tail = budget_ms / 40000
+
+    def inputs(self, world, budget_ms=None):
+        # the keys for the next step: start, play, pause -> resume, game over -> start again
+        # None -> the real keys decide (the menus, the game over screen before restart_after)
+        state = world.state
+        if state == "Playing":
+            self.ended = 0
+            return Inputs(held=self.decide(world, budget_ms), pressed=SPACE)
+        if state == "Start":
+            return Inputs(pressed=SPACE)
+        if state == "Pause":
+            return Inputs(pressed=KEY_M)
+        if state == "End":
+            self.ended += 1
+            if self.ended > self.restart_after:
+                self.ended = 0
+                return Inputs(pressed=KEY_M)
+        return None
+
+    def decide(self, world, budget_ms=None):
+        # -> the move to hold for the next step
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000
+        clock = time.perf_counter
+        cpu_clock = time.thread_time
+        repeat = self.repeat
+        # a node (its steps + evaluate()) only starts if the worst one seen lately still fits before
+        # `cutoff`, what's left after it is for the sort and the bookkeeping (self.tail).
+        # the first decision knows nothing yet: half the budget for one node
+        worst = min(self.worst or budget / 2, budget / 2)
+        cutoff = start + budget - self.tail
+        deadline = cutoff - worst
+        # every depth is width * 5 nodes: no wider than what fits in half the budget
+        width = max(1, min(self.width, int(budget / 2 / (worst * len(MOVES)))))
+
+        root = observe(world)
+        score = root[4]
+        # (value, first move, state)
+        beam = [(0.0, None, root)]
+        choice = None
+        depth = 0
+        nodes = 0
+        slowest = 0.0
+        tail = 0.0
+        out_of_time = False
+        while depth < self.depth and beam and not out_of_time:
+            children = []
+            for _, first, state in beam:
+                for move in MOVES:
+                    if clock() > deadline:
+                        out_of_time = True
+                        break
+                    began = cpu_clock()
+                    child = state
+                    steps = 0
+                    while steps < repeat and not child[5]:
+                        child = ahead(world, child, move)
+                        steps += 1
+                    self.steps += steps
+                    # still checked inside the node (a slower node than any seen, the thread was
+                    # preempted): a node cut short isn't compared with the whole ones
+                    if clock() > cutoff:
+                        out_of_time = True
+                        break
+                    value = evaluate(world, child, score, depth * repeat + steps)
+                    # CPU time: a node the thread wasn't running for doesn't make the next search shorter
+                    slowest = max(slowest, cpu_clock() - began)
+                    nodes += 1
+                    children.append((value, move if first is None else first, child))
+                if out_of_time:
+                    break
+            # a depth cut short only decides when there's nothing deeper to go by
+            if not children or (out_of_time and choice is not None):
+                break
+            sorting = clock()
+            if sorting > cutoff and choice is not None:
+                break
+            children.sort(key=lambda child: child[0], reverse=True)
+            choice = children[0][1]
+            depth += 1
+            # a crash isn't looked at further
+            beam = [child for child in children[:width] if not child[2][5]]
+            tail = max(tail, clock() - sorting)
+        searched = clock()
+        if choice is not None:
+            self.move = choice
+
+        end = time.perf_counter()
+        elapsed = end - start
+        # the worst node and tail lately, slowly forgotten. The tail is at least 2.5% of the budget
+        # (the clocks, the CPU time a hypervisor charges to the thread) and at most a quarter
+        if nodes:
+            self.worst = max(slowest, (self.worst or 0.0) * 0.99)
+        self.tail = max(min(tail + end - searched, budget / 4), self.tail * 0.99, budget / 40)
+        self.decisions += 1
+        self.nodes += nodes
+        self.search_time += elapsed
+        self.depths += depth
+        if elapsed > budget:
+            self.late += 1
+            # the search itself fit, the thread just wasn't running (another process, the VM)
+            if time.thread_time() - cpu <= budget:
+                self.preempted += 1
+        self.latencies.append(elapsed * 1000)
+        return self.move
+
+    def report(self):
+        # ex: "autopilot 1800 decisions 21000 nodes/s (63000 steps/s) depth 4.6, decision ms p50 4.01
+        #      p90 4.02 p99 4.08 max 4.60, 4 over budget (4 preempted)"
+        if not self.latencies:
+            return "autopilot 0 decisions"
+        searching = max(self.search_time, 1e-9)
+        latencies = self.latencies
+        return (f"autopilot {self.decisions} decisions {self.nodes / searching:.0f} nodes/s "
+                f"({self.steps / searching:.0f} steps/s) depth {self.depths / self.decisions:.1f}, "
+                f"decision ms p50 {percentile(latencies, 50):.2f} p90 {percentile(latencies, 90):.2f} "
+                f"p99 {percentile(latencies, 99):.2f} max {max(latencies):.2f}, {self.late} over budget "
+                f"({self.preempted} preempted)")
+
+
+## ----- Soak test: games without a window ----- ##
+#   python autopilot.py --games 5 --budget 4     # exits with 1 if a search went over its budget
+def main():
+    parser = argparse.ArgumentParser(description="the autopilot plays games without a window")
+    parser.add_argument('--games', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=4.0, help="ms for one decision")
+    parser.add_argument('--depth', type=int, default=8, help="moves ahead")
+    parser.add_argument('--width', type=int, default=4, help="ways kept at every depth")
+    parser.add_argument('--repeat', type=int, default=3, help="steps a move is held")
+    parser.add_argument('--max-steps', type=int, default=9000, help="a game still going is stopped here")
+    parser.add_argument('--arrays', action='store_true', help="sprites in numpy arrays")
+    parser.add_argument('--continuous', action='store_true', help="swept collisions")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--late', type=float, default=0.0,
+                        help="%% of decisions whose search may go over budget before the soak fails")
+    args = parser.parse_args()
+
+    pilot = Autopilot(budget_ms=args.budget, depth=args.depth, width=args.width, repeat=args.repeat,
+                      restart_after=0)
+    # the collector runs like in the game: in what's left of a 30 fps frame, never in a search
+    memory = GCManager()
+    memory.freeze()
+    memory.manage()
+    for game in range(args.games):
+        world = World(seed=args.seed + game, vectorized=args.arrays, continuous=args.continuous)
+        world.step(pilot.inputs(world))
+        steps = 0
+        while world.state == "Playing" and steps < args.max_steps:
+            started = time.perf_counter()
+            world.step(pilot.inputs(world))
+            steps += 1
+            memory.idle((started + 1 / 30 - time.perf_counter()) * 1000)
+        memory.transition()
+        print(f"game {game + 1}: {steps} steps ({steps / 30:.0f} s) score {world.score} level {world.level} "
+              f"{'crashed' if world.state == 'End' else 'still playing'}")
+    print(pilot.report())
+    memory.close()
+    # a search over its budget is a dropped frame in the game. A decision that was only late because
+    # the thread wasn't running (its CPU time fit) is counted in the report but isn't the search's
+    overruns = pilot.late - pilot.preempted
+    if overruns > pilot.decisions * args.late / 100:
+        print(f"FAIL: {overruns} of {pilot.decisions} searches went over {args.budget} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
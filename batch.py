@@ -0,0 +1,250 @@
+## ------------- LIBRARY -------------- ##
+import numpy as np
+
+from world import World
+from scheduler import Waves
+from sprites import Bullet, Alien, Coin, Player
+from inputs import UP, DOWN, LEFT, RIGHT, SPACE
+
+
+### ----------------------------------- ###
+### ----------- BATCH WORLD ----------- ###
+### ----------------------------------- ###
+
+# n games at once, stepped together: every field is an array with one row per game
+# and one column per sprite slot, shape (n, max_entities). Made for training and
+# evaluating autopilots, where one World per process is far too slow.
+#   games = BatchWorld(1000, seed=1)
+#   scores, done, observations = games.step(actions)   # actions: (n,) key bits
+#   games.reset(done)
+#
+# the same rules as World.step while playing (stars off, they don't change the game):
+# bullets move, aliens spawn / move / get shot / crash into the ship, coins spawn /
+# move / get collected, the ship moves and shoots, and the level goes up every 10 points.
+# the tuning knobs are the same class attributes (Alien.spawn_interval, Alien.speed_spread,
+# Coin.spawn_interval, World.level_points...), read on every step.
+# explosions are left out, they're only drawn. A game is done once the ship crashed,
+# it then stays as it is until reset().
+#
+# actions are the bits of inputs.py: UP / DOWN / LEFT / RIGHT are held, SPACE shoots
+# every random number of a step comes from uniform((3, n)): alien y, alien speed, coin y
+# spawns follow World.spawns: the regular ones, then the waves of every level up
+# (one timing wheel per game, a row of future spawn counts), at most 1 of a kind per step
+class BatchWorld:
+    def __init__(self, n, width=120, height=90, seed=None, max_entities=16, uniform=None,
+                 observed_aliens=4, observed_coins=2, waves=None):
+        self.n = n
+        self.width = width
+        self.height = height
+        # slots per game for aliens and coins, a spawn with no free slot is dropped
+        # (like a full pool with "drop_newest"), bullets have Bullet.max_live slots
+        self.max_entities = max_entities
+        self.uniform = uniform or np.random.default_rng(seed).random
+        # how many aliens / coins (the oldest ones) are in the observations
+        self.observed_aliens = observed_aliens
+        self.observed_coins = observed_coins
+
+        k = min(max_entities, Alien.max_live)
+        c = min(max_entities, Coin.max_live)
+        b = Bullet.max_live
+        self.alien_x = np.zeros((n, k))
+        self.alien_y = np.zeros((n, k))
+        self.alien_vx = np.zeros((n, k))
+        self.alien_alive = np.zeros((n, k), dtype=bool)
+        self.coin_x = np.zeros((n, c))
+        self.coin_y = np.zeros((n, c))
+        self.coin_alive = np.zeros((n, c), dtype=bool)
+        self.bullet_x = np.zeros((n, b))
+        self.bullet_y = np.zeros((n, b))
+        self.bullet_alive = np.zeros((n, b), dtype=bool)
+
+        self.player_x = np.zeros(n, dtype=np.int64)
+        self.player_y = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.level = np.ones(n, dtype=np.int64)
+        # frames played (the tick of the spawn scheduler)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        # waves: kind -> (n, size) spawns due at tick % size, and spawns waiting for the budget
+        self.waves = Waves.load() if waves is None else waves
+        if any(budget != 1 for budget in self.waves.budget.values()):
+            raise ValueError("the batch only spawns one alien and one coin per step (budget 1)")
+        size = 1
+        while size <= self.waves.longest():
+            size *= 2
+        self.wheel = {kind: np.zeros((n, size), dtype=np.int64) for kind in ('alien', 'coin')}
+        self.owed = {kind: np.zeros(n, dtype=np.int64) for kind in ('alien', 'coin')}
+        # steps played, the crash step included
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    def reset(self, games=None):
+        # games -> bool mask or indices of the games to start over (None -> all)
+        if games is None:
+            games = slice(None)
+        for alive in (self.alien_alive, self.coin_alive, self.bullet_alive):
+            alive[games] = False
+        # where Player.setup puts the ship in World.setup
+        self.player_x[games] = 5
+        self.player_y[games] = 50
+        self.score[games] = 0
+        self.level[games] = 1
+        self.ticks[games] = 0
+        for kind in self.wheel:
+            self.wheel[kind][games] = 0
+            self.owed[kind][games] = 0
+        self.frames[games] = 0
+        self.done[games] = False
+        return self.observe()
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        playing = ~self.done
+        moving = playing[:, None]
+        u = self.uniform((3, self.n))
+        rows = np.arange(self.n)
+
+        ## bullets
+        self.bullet_x -= Bullet.speed * moving
+        self.bullet_alive &= ~(self.bullet_x > self.width)
+
+        ## spawns (World.spawns.advance)
+        ticks = self.ticks
+        slot = ticks & (self.wheel['alien'].shape[1] - 1)
+        spawns = {}
+        for kind, regular in (('alien', (ticks + 1) % Alien.spawn_interval == 0),
+                              ('coin', ticks % Coin.spawn_interval == 0)):
+            wheel = self.wheel[kind]
+            waves = wheel[rows, slot] * playing
+            wheel[rows, slot] -= waves
+            owed = self.owed[kind]
+            owed += regular * playing + waves
+            spawns[kind] = playing & (owed > 0)
+            owed -= spawns[kind]
+        self.ticks += playing
+
+        ## aliens
+        self.add(spawns['alien'], rows, self.alien_alive, self.width,
+                 np.floor(u[0] * (self.height - Alien.height + 1)),
+                 (self.alien_x, self.alien_y),
+                 vx=(self.alien_vx, Alien.speed_spread * u[1] + self.level))
+        self.alien_x -= self.alien_vx * moving
+        self.alien_alive &= ~(self.alien_x < -Alien.width)
+        ax, ay = self.alien_x, self.alien_y
+        inside = self.alien_alive & moving
+
+        # every alien in spawn order takes the first bullet (in spawn order) it touches
+        bx, by = self.bullet_x, self.bullet_y
+        columns = np.flatnonzero(inside.any(axis=0))
+        for j in columns.tolist():
+            x = ax[:, j, None]
+            y = ay[:, j, None]
+            touching = (inside[:, j, None] & self.bullet_alive &
+                        (x < bx + Bullet.width) & (bx < x + Alien.width) &
+                        (y < by + Bullet.height) & (by < y + Alien.height))
+            hit = touching.any(axis=1)
+            if hit.any():
+                self.bullet_alive[rows[hit], touching[hit].argmax(axis=1)] = False
+                self.alien_alive[hit, j] = False
+
+        # the ship crashes into any alien that was on screen (even one just shot)
+        center_x = (self.player_x + Player.width // 2)[:, None]
+        center_y = (self.player_y + Player.height // 2)[:, None]
+        crashed = ((center_x - (ax + Alien.width // 2))**2 +
+                   (center_y - (ay + Alien.height // 2))**2 < Alien.crash_radius**2) & inside
+        self.alien_alive &= ~crashed
+        crashed = crashed.any(axis=1)
+
+        ## coins
+        self.add(spawns['coin'], rows, self.coin_alive, self.width,
+                 np.floor(u[2] * (self.height - Coin.height + 1)),
+                 (self.coin_x, self.coin_y))
+        self.coin_x -= Coin.speed * moving
+        self.coin_alive &= ~(self.coin_x < -Coin.width)
+        cx, cy = self.coin_x, self.coin_y
+        px = self.player_x[:, None]
+        py = self.player_y[:, None]
+        collected = (self.coin_alive & moving &
+                     (cx < px + Player.width) & (px < cx + Coin.width) &
+                     (cy < py + Player.height) & (py < cy + Coin.height))
+        self.coin_alive &= ~collected
+        # coins picked up after the crash (same step) don't count
+        self.score += collected.sum(axis=1) * ~crashed
+
+        ## ship (same order as Player.update)
+        self.pack(self.bullet_alive, self.bullet_x, self.bullet_y)
+        held = actions * playing
+        self.player_y = np.where(held & UP, np.maximum(self.player_y - 2, 0), self.player_y)
+        self.player_y = np.where(held & DOWN, np.minimum(self.player_y + 2, self.height - Player.height),
+                                 self.player_y)
+        self.player_x = np.where(held & LEFT, np.maximum(self.player_x - 2, 2), self.player_x)
+        self.player_x = np.where(held & RIGHT, np.minimum(self.player_x + 2, self.width // 2),
+                                 self.player_x)
+        self.add((held & SPACE) != 0, rows, self.bullet_alive, self.player_x + Player.width - 8,
+                 self.player_y + Player.height // 2 - 8 // 2, (self.bullet_x, self.bullet_y))
+
+        ## rules
+        self.frames += playing
+        self.done |= crashed
+        points = World.level_points
+        up = playing & ~crashed & (self.score != 0) & (self.score % points == 0)
+        level = np.where(up, self.score // points + 1, self.level)
+        changed = level != self.level
+        self.level = level
+        if changed.any():
+            self.level_up(rows[changed])
+
+        self.pack(self.alien_alive, self.alien_x, self.alien_y, self.alien_vx)
+        self.pack(self.coin_alive, self.coin_x, self.coin_y)
+        return self.score, self.done, self.observe()
+
+    def level_up(self, games):
+        # the waves of the new level of these games, counted from the next tick
+        for level in np.unique(self.level[games]).tolist():
+            group = games[self.level[games] == level]
+            for kind, count, every, after in self.waves.at(level):
+                wheel = self.wheel[kind]
+                ticks = self.ticks[group, None] + after + every * np.arange(count)
+                np.add.at(wheel, (np.repeat(group, count), (ticks & (wheel.shape[1] - 1)).ravel()), 1)
+
+    @staticmethod
+    def add(spawn, rows, alive, x, y, fields, vx=None):
+        # one new sprite at the end of the live ones, for the games in spawn
+        # (the live ones are packed at the start of each row, see pack())
+        slot = alive.sum(axis=1)
+        spawn = spawn & (slot < alive.shape[1])
+        if not spawn.any():
+            return
+        games = rows[spawn]
+        slot = slot[spawn]
+        alive[games, slot] = True
+        fields[0][games, slot] = x[spawn] if np.ndim(x) else x
+        fields[1][games, slot] = y[spawn]
+        if vx is not None:
+            vx[0][games, slot] = vx[1][spawn]
+
+    @staticmethod
+    def pack(alive, *fields):
+        # the live sprites of every game to the start of the row, in spawn order
+        order = np.argsort(~alive, axis=1, kind='stable')
+        for field in (alive,) + fields:
+            field[:] = np.take_along_axis(field, order, axis=1)
+
+    def observe(self):
+        # one row of float32 per game:
+        # ship x, y (0..1), level, then for the oldest aliens: dx, dy (from the ship, / screen size),
+        # speed, alive, then for the oldest coins: dx, dy, alive (dead slots are all 0)
+        a = self.observed_aliens
+        c = self.observed_coins
+        px = self.player_x[:, None]
+        py = self.player_y[:, None]
+        alive = self.alien_alive[:, :a]
+        aliens = np.stack([(self.alien_x[:, :a] - px) / self.width, (self.alien_y[:, :a] - py) / self.height,
+                           self.alien_vx[:, :a], np.ones_like(self.alien_vx[:, :a])], axis=2) * alive[:, :, None]
+        alive = self.coin_alive[:, :c]
+        coins = np.stack([(self.coin_x[:, :c] - px) / self.width, (self.coin_y[:, :c] - py) / self.height,
+                          np.ones_like(self.coin_x[:, :c])], axis=2) * alive[:, :, None]
+        ship = np.stack([self.player_x / self.width, self.player_y / self.height, self.level], axis=1)
+        return np.concatenate([ship, aliens.reshape(self.n, -1), coins.reshape(self.n, -1)],
+                              axis=1).astype(np.float32)
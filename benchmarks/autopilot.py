@@ -0,0 +1,132 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import World
+from inputs import Inputs, UP, DOWN, SPACE, KEY_M
+from sprites import Bullet, Alien, Coin, Player
+from snapshot import take, restore
+from autopilot import Autopilot, MOVES, observe, ahead, percentile
+
+
+# The autopilot (autopilot.py), without a window:
+# 1. lookahead: from states of a game played by the wanderer (it crashes) and of one played by the
+#    autopilot (it gets to the fast aliens of the high levels), random moves are stepped both
+#    with ahead() and with the pools' own update_all + Player.update (then the world is restored
+#    from a snapshot): ship, score, crash, every alien, bullet and coin must match on every step.
+#    And a decision leaves the world exactly as it was (the same snapshot before and after).
+# 2. play: games with a few decision budgets against the scripted wanderer the other benchmarks
+#    use: steps survived, score, nodes per second and the decision time.
+#
+#   python benchmarks/autopilot.py
+#   python benchmarks/autopilot.py --arrays --continuous --budgets 1 4 8 --max-steps 5000
+
+
+def wander(world, rng):
+    # shoots and wanders, starts again after a game over
+    if world.state == "Start":
+        return Inputs(pressed=SPACE)
+    if world.state == "End":
+        return Inputs(pressed=KEY_M)
+    held = rng.choice((0, UP, DOWN, UP, DOWN, 0))
+    return Inputs(held=held, pressed=SPACE if rng.random() < 0.3 else 0)
+
+
+def lookahead(steps, every, horizon, vectorized, continuous, seed, driven):
+    # -> (states checked, steps compared, how many ended in a crash)
+    world = World(seed=seed, vectorized=vectorized, continuous=continuous)
+    pilot = Autopilot(budget_ms=1, restart_after=0)
+    rng = random.Random(seed)
+    checked = 0
+    compared = 0
+    crashes = 0
+    for step in range(steps):
+        if world.state == "Playing" and step % every == 0:
+            data = take(world)
+            pilot.decide(world)
+            assert take(world) == data, f"step {step}: a decision changed the world"
+
+            state = observe(world)
+            for k in range(horizon):
+                move = rng.choice(MOVES)
+                # the game's own rules (World.step while playing, without stars and spawns)
+                Bullet.update_all()
+                Alien.update_all()
+                Coin.update_all()
+                Player.update(Inputs(held=move, pressed=SPACE))
+                state = ahead(world, state, move)
+                assert observe(world) == state, f"step {step}+{k}: lookahead went another way"
+                compared += 1
+                if state[5]:
+                    crashes += 1
+                    break
+            restore(world, data)
+            checked += 1
+        world.step(pilot.inputs(world) if driven else wander(world, rng))
+    return checked, compared, crashes
+
+
+def play(games, max_steps, budget, vectorized, continuous, seed):
+    # -> (steps survived, scores, autopilot or None for the wanderer)
+    pilot = Autopilot(budget_ms=budget, restart_after=0) if budget is not None else None
+    survived = []
+    scores = []
+    for game in range(games):
+        world = World(seed=seed + game, vectorized=vectorized, continuous=continuous)
+        rng = random.Random(seed + game)
+        world.step(Inputs(pressed=SPACE))
+        steps = 0
+        while world.state == "Playing" and steps < max_steps:
+            world.step(pilot.inputs(world) if pilot is not None else wander(world, rng))
+            steps += 1
+        survived.append(steps)
+        scores.append(world.score)
+    return survived, scores, pilot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="autopilot: lookahead exactness, play, nodes/s, decision time")
+    parser.add_argument('--arrays', action='store_true', help="use the numpy pools (Sprite.vectorized)")
+    parser.add_argument('--continuous', action='store_true', help="swept collisions")
+    parser.add_argument('--steps', type=int, default=3000, help="steps of the game the lookahead is checked on")
+    parser.add_argument('--every', type=int, default=5)
+    parser.add_argument('--horizon', type=int, default=60)
+    parser.add_argument('--games', type=int, default=2)
+    parser.add_argument('--max-steps', type=int, default=6000, help="a game still going is stopped here")
+    parser.add_argument('--budgets', type=float, nargs='+', default=[0.25, 1, 4], help="ms for one decision")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    for continuous in (False, True):
+        for driven in (False, True):
+            checked, compared, crashes = lookahead(args.steps, args.every, args.horizon, args.arrays, continuous,
+                                                   args.seed, driven)
+            print(f"{'swept' if continuous else 'discrete'}, {'autopilot' if driven else 'wanderer'}: "
+                  f"lookahead matched the game on {compared} steps from {checked} states ({crashes} crashes), "
+                  f"decisions left the world untouched")
+
+    print()
+    print(f"{'budget ms':>10} {'survived':>9} {'min':>6} {'score':>6} {'nodes/s':>8} {'depth':>6} "
+          f"{'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'max ms':>7} {'late':>5} {'preempted':>9}")
+    for budget in [None] + args.budgets:
+        survived, scores, pilot = play(args.games, args.max_steps, budget, args.arrays, args.continuous, args.seed)
+        line = (f"{'wander' if budget is None else budget:>10} {statistics.mean(survived):>9.0f} "
+                f"{min(survived):>6} {statistics.mean(scores):>6.1f}")
+        if pilot is not None and pilot.latencies:
+            latencies = pilot.latencies
+            line += (f" {pilot.nodes / pilot.search_time:>8.0f} {pilot.depths / pilot.decisions:>6.1f} "
+                     f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 90):>7.2f} "
+                     f"{percentile(latencies, 99):>7.2f} {max(latencies):>7.2f} "
+                     f"{(pilot.late - pilot.preempted) / pilot.decisions:>5.0%} "
+                     f"{pilot.preempted / pilot.decisions:>9.1%}")
+        print(line)
+    print(f"(survived: steps out of {args.max_steps}, {args.games} games, late: searches over their budget, "
+          f"preempted: decisions late only because the thread wasn't running)")
+
+
+if __name__ == '__main__':
+    main()
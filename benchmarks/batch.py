@@ -0,0 +1,50 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch import BatchWorld
+from inputs import UP, DOWN, LEFT, RIGHT, SPACE
+
+
+# Steps per second of the batch simulator (batch.py) for a growing number of games
+# (tests/test_batch.py checks that it plays exactly like World)
+#
+#   python benchmarks/batch.py
+#   python benchmarks/batch.py --games 1 100 1000 10000 --steps 500
+
+ACTIONS = np.array([0, UP, DOWN, LEFT, RIGHT, SPACE, UP | SPACE, DOWN | SPACE])
+
+
+def measure(games, steps, seed):
+    batch = BatchWorld(games, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = ACTIONS[rng.integers(0, len(ACTIONS), (steps, games))]
+    start = time.perf_counter()
+    for t in range(steps):
+        batch.step(actions[t])
+        # a crashed game starts over, like a training loop would do
+        if batch.done.any():
+            batch.reset(batch.done)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch simulator: steps per second")
+    parser.add_argument('--games', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'games':>8} {'ms/step':>10} {'game steps/s':>14}")
+    for games in args.games:
+        elapsed = measure(games, args.steps, args.seed)
+        print(f"{games:>8} {elapsed / args.steps * 1000:>10.3f} {games * args.steps / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import random
+import argparse
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collision import SpatialGrid, overlaps, near_mask
+
+
+# Compares the spatial grid used by Alien.update_all with the old brute force check
+# (every alien against every bullet) and times both for a growing number of sprites.
+# (tests/test_collision.py checks that all three find exactly the same pairs)
+#
+#   python benchmarks/collision.py
+#   python benchmarks/collision.py --counts 100 1000 --width 480 --height 360
+
+ALIEN = 16
+BULLET = 8
+
+
+def make_boxes(rng, count, width, height, size):
+    return [(rng.uniform(-size, width), rng.randint(0, height - size)) for _ in range(count)]
+
+
+# the check Alien.update_all used to do: each alien copies the bullets and tests all of them
+# the first bullet that overlaps is used up together with the alien
+def brute_force(aliens, bullets):
+    bullets = list(bullets)
+    pairs = []
+    for i, (ax, ay) in enumerate(aliens):
+        for bullet in bullets.copy():
+            bx, by = bullet[1]
+            if overlaps(ax, ay, ALIEN, ALIEN, bx, by, BULLET, BULLET):
+                bullets.remove(bullet)
+                pairs.append((i, bullet[0]))
+                break
+    return pairs
+
+
+def grid_pairs(aliens, bullets, grid):
+    grid.clear()
+    for j, (bx, by) in bullets:
+        grid.insert(j, bx, by, BULLET, BULLET)
+    pairs = []
+    for i, (ax, ay) in enumerate(aliens):
+        for index, j in grid.query(ax, ay, ALIEN, ALIEN):
+            grid.remove(index)
+            pairs.append((i, j))
+            break
+    return pairs
+
+
+# the numpy pools do the same with near_mask + a smaller pair matrix
+def array_pairs(aliens, bullets):
+    ax = np.array([a[0] for a in aliens], dtype=np.float64)
+    ay = np.array([a[1] for a in aliens], dtype=np.float64)
+    bx = np.array([b[1][0] for b in bullets], dtype=np.float64)
+    by = np.array([b[1][1] for b in bullets], dtype=np.float64)
+    rows = np.flatnonzero(near_mask(ax, ay, ALIEN, ALIEN, bx, by, BULLET, BULLET))
+    rx = ax[rows][:, None]
+    ry = ay[rows][:, None]
+    hits = (rx < bx + BULLET) & (bx < rx + ALIEN) & (ry < by + BULLET) & (by < ry + ALIEN)
+    used = np.zeros(len(bullets), dtype=bool)
+    pairs = []
+    for k in np.flatnonzero(hits.any(axis=1)).tolist():
+        free = hits[k] & ~used
+        if free.any():
+            j = int(free.argmax())
+            used[j] = True
+            pairs.append((int(rows[k]), j))
+    return pairs
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="alien/bullet collision: brute force vs spatial grid")
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 3000],
+                        help="number of aliens and of bullets")
+    # the real screen is 120x90, more sprites need a bigger playfield to stay realistic
+    parser.add_argument('--width', type=int, default=960)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    grid = SpatialGrid()
+    print(f"{'sprites':>8} {'pairs':>6} {'brute ms':>10} {'grid ms':>10} {'arrays ms':>10}")
+    for count in args.counts:
+        aliens = make_boxes(rng, count, args.width, args.height, ALIEN)
+        bullets = list(enumerate(make_boxes(rng, count, args.width, args.height, BULLET)))
+
+        pairs = len(brute_force(aliens, bullets))
+
+        # brute force is O(n^2), don't wait forever for it
+        brute = best_time(lambda: brute_force(aliens, bullets), 1 if count > 1000 else args.repeat)
+        gridded = best_time(lambda: grid_pairs(aliens, bullets, grid), args.repeat)
+        arrays = best_time(lambda: array_pairs(aliens, bullets), args.repeat)
+        print(f"{count:>8} {pairs:>6} {brute * 1000:>10.3f} {gridded * 1000:>10.3f} {arrays * 1000:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import gc
+import json
+import math
+import time
+import argparse
+import platform
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sprites
+from sprites import Star, Bullet, Alien, Explosion, Coin, Player
+from world import World
+from inputs import Inputs, UP, DOWN, SPACE
+
+
+# Frame time of every update_all / draw_all and of a whole World.step (what Game.update runs)
+# with 10, 100, 1k and 10k sprites per class. Runs without a window and with a fixed seed.
+#
+#   python benchmarks/frames.py                                  -> bench_frames.json
+#   python benchmarks/frames.py --arrays                         -> same with the numpy pools
+#   python benchmarks/frames.py --compare baseline.json          -> exit 1 if something got slower
+#
+# draw_all goes through a pyxel that does nothing, so only the python side of drawing is measured.
+
+CLASSES = (Star, Bullet, Alien, Explosion, Coin)
+
+
+# stands in for pyxel while timing draw_all
+class NullPyxel:
+    def __init__(self):
+        self.calls = 0
+
+    def blt(self, *args, **kwargs):
+        self.calls += 1
+
+
+def make_world(count, seed, vectorized):
+    # the playfield grows with the number of sprites so they don't all pile up
+    scale = max(1.0, math.sqrt(count / 10))
+    world = World(width=int(120 * scale), height=int(90 * scale), seed=seed, vectorized=vectorized)
+    world.state = "Playing"
+    # raise the pool budgets (max_live) so every pool can really hold that many sprites
+    for cls in CLASSES:
+        cls.max_live = count
+    return world
+
+
+# fill the pool back up to count sprites at random places on the screen
+def populate(cls, count, world):
+    rng = world.random
+    while len(cls.sprites) < count:
+        cls.spawn(rng.uniform(0, world.width - cls.width), rng.randint(0, world.height - cls.height))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def measure(step, refill, frames, warmup, alloc_frames):
+    # refill is done outside of the timer, so every frame sees the same number of sprites
+    for _ in range(warmup):
+        refill()
+        step()
+
+    times = []
+    for _ in range(frames):
+        refill()
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+
+    # allocations are counted in a separate pass, tracemalloc slows everything down
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    for _ in range(alloc_frames):
+        refill()
+        gc.collect()
+        tracemalloc.reset_peak()
+        before_bytes = tracemalloc.get_traced_memory()[0]
+        before_blocks = sys.getallocatedblocks()
+        step()
+        blocks.append(sys.getallocatedblocks() - before_blocks)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before_bytes)
+    tracemalloc.stop()
+
+    return {
+        'mean_ms': sum(times) / len(times) * 1000,
+        'p50_ms': percentile(times, 50) * 1000,
+        'p99_ms': percentile(times, 99) * 1000,
+        'max_ms': max(times) * 1000,
+        # bytes allocated on top of what was there before the frame (peak)
+        'alloc_kib': sum(peaks) / len(peaks) / 1024,
+        # memory blocks still alive after the frame (should stay around 0)
+        'net_blocks': sum(blocks) / len(blocks),
+    }
+
+
+def cases(count, seed, vectorized):
+    # (name, refill, step) for every path that gets timed
+    for cls in CLASSES:
+        world = make_world(count, seed, vectorized)
+
+        def refill(cls=cls, world=world):
+            world.state = "Playing"
+            populate(cls, count, world)
+            # aliens are tested against a full pool of bullets
+            if cls is Alien:
+                populate(Bullet, count, world)
+
+        yield f"{cls.__name__}.update_all", refill, cls.update_all
+
+    for cls in CLASSES:
+        world = make_world(count, seed, vectorized)
+        populate(cls, count, world)
+        yield f"{cls.__name__}.draw_all", lambda: None, cls.draw_all
+
+    world = make_world(count, seed, vectorized)
+    Player.player.x = world.width // 2 - Player.width
+
+    def refill_all(world=world):
+        world.state = "Playing"
+        for cls in CLASSES:
+            populate(cls, count, world)
+
+    frame = [0]
+
+    def step(world=world):
+        # the ship goes up and down and shoots every 4 frames
+        frame[0] += 1
+        held = UP if frame[0] // 30 % 2 else DOWN
+        world.step(Inputs(held, SPACE if frame[0] % 4 == 0 else 0))
+
+    yield "World.step", refill_all, step
+
+
+def run(args):
+    results = {}
+    real_pyxel = sprites.pyxel
+    sprites.pyxel = NullPyxel()
+    budgets = {cls: cls.max_live for cls in CLASSES}
+    try:
+        for count in args.counts:
+            for name, refill, step in cases(count, args.seed, args.arrays):
+                stats = measure(step, refill, args.frames, args.warmup, args.alloc_frames)
+                results.setdefault(name, {})[str(count)] = stats
+                print(f"{name:<22} {count:>6}  mean {stats['mean_ms']:8.3f}  p50 {stats['p50_ms']:8.3f}  "
+                      f"p99 {stats['p99_ms']:8.3f}  max {stats['max_ms']:8.3f} ms  "
+                      f"alloc {stats['alloc_kib']:8.1f} KiB  blocks {stats['net_blocks']:+.0f}")
+    finally:
+        sprites.pyxel = real_pyxel
+        for cls, max_live in budgets.items():
+            cls.max_live = max_live
+    return results
+
+
+# every case / count whose metric got worse than baseline * threshold
+def compare(results, baseline, metric, threshold):
+    regressions = []
+    for name, counts in results.items():
+        for count, stats in counts.items():
+            old = baseline.get(name, {}).get(count)
+            if old is None or old[metric] <= 0:
+                continue
+            ratio = stats[metric] / old[metric]
+            if ratio > threshold:
+                regressions.append((name, count, old[metric], stats[metric], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="frame time of every update_all / draw_all path")
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help="sprites per class")
+    parser.add_argument('--frames', type=int, default=200, help="timed frames per case")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--alloc-frames', type=int, default=10, help="frames traced for allocations")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--arrays', action='store_true', help="use the numpy pools (Sprite.vectorized)")
+    parser.add_argument('--output', default='bench_frames.json')
+    parser.add_argument('--compare', metavar='BASELINE', help="json written by an earlier run")
+    parser.add_argument('--metric', default='p50_ms', choices=['mean_ms', 'p50_ms', 'p99_ms', 'max_ms'])
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="flag a regression when metric > baseline * threshold")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'arrays': args.arrays,
+            'seed': args.seed,
+            'frames': args.frames,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.metric, args.threshold)
+        for name, count, old, new, ratio in regressions:
+            print(f"REGRESSION {name} @ {count}: {args.metric} {old:.3f} -> {new:.3f} ms (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression over x{args.threshold} on {args.metric}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from leaderboard import Leaderboard
+from savestore import SaveStore
+
+
+# Query latency of the leaderboard (leaderboard.py) while the table grows: runs are
+# inserted in batches like at game over, and after every size the queries are timed.
+# With the indexes every query should take about the same time at 1k and at 1M runs;
+# the "scan" column is the same top-10 query forced to read the whole table, for comparison.
+# Before timing, the cached top and the indexed queries are checked against the scan.
+#
+#   python benchmarks/leaderboard.py
+#   python benchmarks/leaderboard.py --sizes 1000 10000 100000 1000000 --players 5000
+
+
+def timed(function, repeat):
+    # median of repeat calls, in microseconds
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def fill(board, rng, count, players, batch, clock):
+    # count runs, batch runs per transaction -> seconds spent inserting
+    start = time.perf_counter()
+    for done in range(0, count, batch):
+        for _ in range(min(batch, count - done)):
+            clock[0] += 1
+            # scores like the game's: most runs are short, a few go far
+            score = int(rng.expovariate(1 / 15))
+            board.record(f"P{rng.randrange(players)}", score, score // 10 + 1, score * 60, at=clock[0])
+        board.flush()
+    return time.perf_counter() - start
+
+
+def check(board, rng, players):
+    scan = board.query('SELECT name, score, at FROM runs NOT INDEXED ORDER BY score DESC, at LIMIT 10')
+    assert board.top(10) == scan, "cached top differs from the table"
+    assert board.top(board.cached + 1)[:10] == scan, "indexed top differs from the table"
+    name = f"P{rng.randrange(players)}"
+    best = board.query('SELECT MAX(score) FROM runs NOT INDEXED WHERE name = ?', (name,))[0][0]
+    assert board.best(name) == best, f"best of {name} differs from the table"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="leaderboard query latency vs table size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 300000])
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=1000, help="runs per insert transaction")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    clock = [1.7e9]
+    with tempfile.TemporaryDirectory() as folder:
+        board = Leaderboard(os.path.join(folder, 'leaderboard.db'), cabinet='bench',
+                            legacy=SaveStore(os.path.join(folder, 'saves'), os.path.join(folder, 'none.csv')))
+        print(f"{'runs':>9} {'insert/s':>10} {'top10 cache':>12} {'top50':>8} {'top since':>10} "
+              f"{'best':>8} {'players':>8} {'scan':>10}   (us)")
+        size = 0
+        for target in sorted(args.sizes):
+            elapsed = fill(board, rng, target - size, args.players, args.batch, clock)
+            rate = (target - size) / elapsed
+            size = target
+            check(board, rng, args.players)
+
+            # the last 10% of the runs
+            since = clock[0] - size // 10
+            names = [f"P{rng.randrange(args.players)}" for _ in range(args.repeat)]
+            cache = timed(lambda: board.top(10), args.repeat)
+            top = timed(lambda: board.top(50), args.repeat)
+            recent = timed(lambda: board.top(10, since=since), args.repeat)
+            best = timed(lambda: board.best(names[rng.randrange(len(names))]), args.repeat)
+            top_players = timed(lambda: board.top_players(10), args.repeat)
+            scan = timed(lambda: board.query(
+                'SELECT name, score, at FROM runs NOT INDEXED ORDER BY score DESC, at LIMIT 10'),
+                max(args.repeat // 50, 3))
+            print(f"{size:>9} {rate:>10,.0f} {cache:>12.1f} {top:>8.1f} {recent:>10.1f} "
+                  f"{best:>8.1f} {top_players:>8.1f} {scan:>10.1f}")
+        board.close()
+
+
+if __name__ == '__main__':
+    main()
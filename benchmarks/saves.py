@@ -0,0 +1,87 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+import importlib.util
+
+
+# Cold start and memory of loading the save slots, the old way (pandas + load.csv)
+# against the save store (savestore.py). Every run is a fresh python process, so the
+# time includes importing what's needed, like it does when the game starts.
+#
+#   python benchmarks/saves.py
+#   python benchmarks/saves.py --runs 20
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what Game.setup used to do
+PANDAS = '''
+import pandas as pd
+savefile = pd.read_csv('load.csv')
+save_dict = {k:v for k,v in zip(savefile.index, list(zip(savefile['Name'], savefile['Score'])))}
+'''
+
+STORE = '''
+from savestore import SaveStore
+save_dict = SaveStore().load()
+'''
+
+# runs the code above and prints how long it took and the peak memory of the process
+# (VmHWM starts over at exec, ru_maxrss can keep the parent's peak)
+CHILD = '''
+import time, resource, json, sys
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open('/proc/self/status') as f:
+        peak = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+except OSError:
+    pass
+print(json.dumps({'ms': elapsed * 1000, 'maxrss_kib': peak}))
+'''
+
+
+def measure(code, folder, runs):
+    times = []
+    memory = []
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', CHILD, code], cwd=folder, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        times.append(result['ms'])
+        memory.append(result['maxrss_kib'])
+    return statistics.median(times), statistics.median(memory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="loading the saves: pandas vs save store")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copy(os.path.join(ROOT, 'load.csv'), folder)
+        # the first load migrates load.csv, time the loads after that
+        subprocess.run([sys.executable, '-c', STORE], cwd=folder, check=True,
+                       env=dict(os.environ, PYTHONPATH=ROOT))
+
+        print(f"{'':<12} {'load ms':>10} {'peak RSS MiB':>14}")
+        if importlib.util.find_spec('pandas') is None:
+            print(f"{'pandas':<12} {'(pandas is not installed)':>25}")
+        else:
+            ms, rss = measure(PANDAS, folder, args.runs)
+            print(f"{'pandas':<12} {ms:>10.1f} {rss / 1024:>14.1f}")
+
+        ms, rss = measure(STORE, folder, args.runs)
+        print(f"{'save store':<12} {ms:>10.1f} {rss / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
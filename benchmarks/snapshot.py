@@ -0,0 +1,174 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import World
+from inputs import Inputs, UP, DOWN, SPACE, KEY_M
+from sprites import POOLS, Player, Sprite
+from snapshot import take, restore, Rewind
+
+
+# Full-world snapshots (snapshot.py), without a window:
+# 1. exact: a scripted game is snapshotted every `every` steps, played on, then restored and
+#    played again with the same keys, both runs must match on every step (score, state, every
+#    sprite). Also with the snapshot going from the object pools into the arrays and back.
+# 2. rewind: every snapshot of a game is pushed, popping them back must give the same bytes.
+# 3. cost: take, restore and Rewind.push per step, the size of a snapshot and what the rewind
+#    buffer holds per step, on a normal game and on full pools.
+#
+#   python benchmarks/snapshot.py
+#   python benchmarks/snapshot.py --steps 5000 --every 250
+
+
+def inputs(world, rng):
+    # shoots and wanders, starts again after a game over
+    if world.state == "Start":
+        return Inputs(pressed=SPACE)
+    if world.state == "End":
+        return Inputs(pressed=KEY_M)
+    held = rng.choice((0, UP, DOWN, UP, DOWN, 0))
+    return Inputs(held=held, pressed=SPACE if rng.random() < 0.3 else 0)
+
+
+def sprites_of(cls):
+    sprites = cls.sprites
+    if Sprite.vectorized:
+        n = len(sprites)
+        return list(zip(sprites.x[:n].tolist(), sprites.y[:n].tolist(), sprites.frame[:n].tolist(),
+                        sprites.animation_frame[:n].tolist()))
+    return [(sprite.x, sprite.y, sprite.frame, sprite.animation_frame) for sprite in sprites]
+
+
+def fingerprint(world):
+    player = Player.player
+    return (world.state, world.score, world.level, world.frame_count,
+            (player.x, player.y, player.frame), [sprites_of(cls) for cls in POOLS])
+
+
+def play(world, keys):
+    trace = []
+    for key in keys:
+        world.step(key)
+        trace.append(fingerprint(world))
+    return trace
+
+
+def exact(steps, every, horizon, vectorized, seed):
+    # -> snapshots checked, same mode and other mode
+    world = World(seed=seed, vectorized=vectorized)
+    rng = random.Random(seed)
+    checked = 0
+    for step in range(steps):
+        if step % every == every - 1:
+            data = take(world)
+            # the keys of the next steps, decided on the way (they depend on the state)
+            keys = []
+            trace = []
+            for _ in range(horizon):
+                keys.append(inputs(world, rng))
+                world.step(keys[-1])
+                trace.append(fingerprint(world))
+            after = take(world)
+
+            restore(world, data)
+            assert play(world, keys) == trace, f"step {step}: restored game went another way"
+            assert take(world) == after
+
+            # the same snapshot in a world with the other kind of pools
+            other = World(seed=seed + 1, vectorized=not vectorized)
+            restore(other, data)
+            assert play(other, keys) == trace, f"step {step}: restored in the other pools it went another way"
+            world.setup()
+            restore(world, after)
+            checked += 1
+        world.step(inputs(world, rng))
+    return checked
+
+
+def rewound(steps, frames, seed):
+    world = World(seed=seed)
+    rng = random.Random(seed)
+    rewind = Rewind(frames=frames)
+    kept = []
+    for _ in range(steps):
+        data = take(world)
+        rewind.push(data)
+        kept.append(data)
+        world.step(inputs(world, rng))
+    held = len(rewind)
+    for data in reversed(kept[-held:]):
+        assert rewind.pop() == data, "rewind gave back another snapshot"
+    assert rewind.pop() is None
+    return held
+
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def cost(steps, vectorized, seed, full):
+    # -> (take us, restore us, push us, snapshot bytes, bytes per step in the rewind buffer)
+    world = World(seed=seed, vectorized=vectorized)
+    rng = random.Random(seed)
+    rewind = Rewind(frames=steps)
+    takes = []
+    restores = []
+    pushes = []
+    sizes = []
+    budgets = [cls.max_live for cls in POOLS]
+    try:
+        for _ in range(steps):
+            world.step(inputs(world, rng))
+            if full:
+                # every pool at its budget
+                for cls in POOLS:
+                    cls.max_live = 64
+                    while len(cls.sprites) < cls.max_live:
+                        cls.spawn(rng.uniform(0, world.width), rng.randint(0, world.height - 8))
+            data = take(world)
+            takes.append(timed(lambda: take(world), 5))
+            restores.append(timed(lambda: restore(world, data), 5))
+            pushes.append(timed(lambda: rewind.push(data)))
+            sizes.append(len(data))
+    finally:
+        for cls, budget in zip(POOLS, budgets):
+            cls.max_live = budget
+    return (statistics.median(takes), statistics.median(restores), statistics.median(pushes),
+            statistics.mean(sizes), rewind.size / len(rewind))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="full-world snapshots: exactness, rewind, cost")
+    parser.add_argument('--steps', type=int, default=3000)
+    parser.add_argument('--every', type=int, default=300, help="steps between two checked snapshots")
+    parser.add_argument('--horizon', type=int, default=200, help="steps played after every snapshot")
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    for vectorized in (False, True):
+        checked = exact(args.steps, args.every, args.horizon, vectorized, args.seed)
+        print(f"{'arrays' if vectorized else 'objects'}: {checked} snapshots restored exactly "
+              f"(same pools and the other pools, {args.horizon} steps each)")
+    held = rewound(args.steps, 300, args.seed)
+    print(f"rewind: {held} snapshots popped back byte for byte")
+
+    print()
+    print(f"{'pools':>8} {'sprites':>8} {'take us':>8} {'restore us':>11} {'push us':>8} "
+          f"{'bytes':>7} {'rewind B/step':>14}")
+    for vectorized in (False, True):
+        for full in (False, True):
+            take_us, restore_us, push_us, size, held = cost(min(args.steps, 900), vectorized, args.seed, full)
+            print(f"{'arrays' if vectorized else 'objects':>8} {'full' if full else 'game':>8} {take_us:>8.1f} "
+                  f"{restore_us:>11.1f} {push_us:>8.1f} {size:>7.0f} {held:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from world import World
+from inputs import Inputs, UP, DOWN, SPACE, KEY_M
+from spectate import StateEncoder, StateDecoder, Broadcaster, Spectator
+import sprites
+
+
+# The spectator stream (spectate.py), without a window:
+# 1. a scripted game is encoded frame by frame and decoded again: the bytes per frame
+#    (DELTA vs sending the whole KEY every frame) and the encode / decode time.
+# 2. the same game published on a real socket to a fast spectator and a slow one (small receive
+#    buffer, sleeps on every message): frames received and dropped, and the publish time.
+# (tests/test_spectate.py checks that the decoders rebuild the game on every frame)
+#
+#   python benchmarks/spectate.py
+#   python benchmarks/spectate.py --arrays --frames 20000
+
+
+# stands in for pyxel, nothing is drawn
+class NullPyxel:
+    def blt(self, *args, **kwargs):
+        pass
+
+
+def inputs(world, rng):
+    # shoots and wanders, starts again after a game over
+    if world.state == "Start":
+        return Inputs(pressed=SPACE)
+    if world.state == "End":
+        return Inputs(pressed=KEY_M)
+    held = rng.choice((0, UP, DOWN, UP, DOWN, 0))
+    return Inputs(held=held, pressed=SPACE if rng.random() < 0.3 else 0)
+
+
+def roundtrip(frames, vectorized, seed):
+    world = World(seed=seed, vectorized=vectorized)
+    rng = random.Random(seed)
+    encoder = StateEncoder()
+    decoder = StateDecoder()
+    deltas = []
+    keys = []
+    encode = []
+    decode = []
+    for frame in range(frames):
+        world.step(inputs(world, rng))
+
+        start = time.perf_counter()
+        delta = encoder.update(world)
+        encode.append(time.perf_counter() - start)
+        key = encoder.keyframe()
+        deltas.append(len(delta))
+        keys.append(len(key))
+
+        start = time.perf_counter()
+        decoder.decode(key if frame == 0 else delta)
+        decode.append(time.perf_counter() - start)
+    return deltas, keys, encode, decode
+
+
+def published(frames, vectorized, seed, pause, slow_sleep):
+    world = World(seed=seed, vectorized=vectorized)
+    rng = random.Random(seed)
+    broadcaster = Broadcaster(port=0, checksum=True)
+    fast = Spectator(port=broadcaster.port, timeout=10)
+    slow = Spectator(port=broadcaster.port, timeout=10, receive_buffer=2048)
+    got = {}
+    errors = []
+
+    def watch(name, spectator, sleep):
+        got[name] = 0
+        try:
+            for _ in spectator.states():
+                got[name] += 1
+                if sleep:
+                    time.sleep(sleep)
+        except (ValueError, OSError) as error:
+            errors.append(f"{name}: {error}")
+
+    threads = [threading.Thread(target=watch, args=('fast', fast, 0)),
+               threading.Thread(target=watch, args=('slow', slow, slow_sleep))]
+    for thread in threads:
+        thread.start()
+
+    times = []
+    for _ in range(frames):
+        world.step(inputs(world, rng))
+        start = time.perf_counter()
+        broadcaster.publish(world)
+        times.append(time.perf_counter() - start)
+        time.sleep(pause)
+    dropped = {address: subscriber.dropped for subscriber in broadcaster.subscribers
+               for address in [subscriber.address]}
+    report = broadcaster.report()
+    broadcaster.close()
+    for thread in threads:
+        thread.join()
+    checked = (fast.decoder.checked, slow.decoder.checked)
+    return report, got, checked, errors, times, sorted(dropped.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="spectator stream: bytes and time per frame")
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--arrays', action='store_true', help="use the numpy pools (Sprite.vectorized)")
+    parser.add_argument('--socket-frames', type=int, default=1500)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    real_pyxel = sprites.pyxel
+    sprites.pyxel = NullPyxel()
+    try:
+        deltas, keys, encode, decode = roundtrip(args.frames, args.arrays, args.seed)
+        print(f"{args.frames} frames encoded and decoded")
+        print(f"{'':>8} {'mean B':>8} {'p99 B':>7} {'max B':>7}")
+        for name, sizes in (('DELTA', deltas), ('KEY', keys)):
+            p99 = sorted(sizes)[len(sizes) * 99 // 100]
+            print(f"{name:>8} {statistics.mean(sizes):>8.1f} {p99:>7} {max(sizes):>7}")
+        print(f"DELTA is {statistics.mean(deltas) / statistics.mean(keys):.0%} of a KEY every frame, "
+              f"{statistics.mean(deltas) * 30 / 1024:.2f} KiB/s at 30 frames/s")
+        print(f"encode {statistics.mean(encode) * 1e6:.1f} us/frame (max {max(encode) * 1e6:.0f}), "
+              f"decode {statistics.mean(decode) * 1e6:.1f} us/frame")
+
+        print()
+        report, got, checked, errors, times, dropped = published(args.socket_frames, args.arrays, args.seed,
+                                                                  pause=0.001, slow_sleep=0.01)
+        print(report)
+        print(f"received: fast {got['fast']}, slow {got['slow']} (checksums ok: fast {checked[0]}, "
+              f"slow {checked[1]}), dropped per subscriber {dropped}")
+        print(f"publish {statistics.mean(times) * 1e6:.1f} us/frame, max {max(times) * 1e6:.0f} us")
+        for error in errors:
+            print("ERROR", error)
+        return 1 if errors else 0
+    finally:
+        sprites.pyxel = real_pyxel
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sprites
+from sprites import Bullet, Alien, Explosion, Coin, Player, Sprite
+from world import World
+
+
+# Discrete vs continuous (swept) collisions, Sprite.continuous:
+# 1. how many head-on bullet/alien and ship/alien meetings each one catches as the levels
+#    (and the alien speeds) go up. The discrete test misses the ones where the pair closes
+#    more than its overlap window in one frame (24 px for a bullet and an alien).
+# 2. the time of Alien.update_all + Coin.update_all per frame with both, for a growing
+#    number of aliens, so the cost of the swept tests can be compared.
+#
+#   python benchmarks/swept.py
+#   python benchmarks/swept.py --arrays --levels 1 10 20 30 --counts 8 64 256
+
+
+# stands in for pyxel, nothing is drawn
+class NullPyxel:
+    def blt(self, *args, **kwargs):
+        pass
+
+
+def make_world(level, continuous, vectorized, seed=0):
+    world = World(seed=seed, vectorized=vectorized, stars=False, continuous=continuous)
+    world.state = "Playing"
+    world.level = level
+    return world
+
+
+def head_on(level, continuous, vectorized, trials, seed):
+    # -> (bullet hits, ship crashes) out of trials each, every one of them should be caught
+    world = make_world(level, continuous, vectorized, seed)
+    rng = world.random
+    hits = 0
+    crashes = 0
+    for _ in range(trials):
+        # a bullet at the height of an alien coming at it, the ship out of the way at the top
+        world.setup()
+        world.state = "Playing"
+        world.level = level
+        Player.player.x = Player.player.px = 2
+        Player.player.y = Player.player.py = 0
+        y = rng.randint(40, world.height - Alien.height)
+        Bullet.spawn(rng.uniform(0, 30), y + rng.randint(0, Alien.height - Bullet.height))
+        Alien.spawn(world.width + rng.uniform(0, 30), y)
+        for _ in range(200):
+            Bullet.update_all()
+            Alien.update_all()
+            if len(Alien.sprites) == 0 or len(Bullet.sprites) == 0:
+                break
+        if len(Alien.sprites) == 0 and len(Bullet.sprites) == 0:
+            hits += 1
+
+        # an alien coming at the ship
+        world.setup()
+        world.state = "Playing"
+        world.level = level
+        y = rng.randint(0, world.height - Player.height)
+        Player.player.x = Player.player.px = rng.uniform(2, 30)
+        Player.player.y = Player.player.py = y
+        Alien.spawn(world.width + rng.uniform(0, 30), y + rng.randint(-4, 4))
+        for _ in range(200):
+            Alien.update_all()
+            if world.state == "End" or len(Alien.sprites) == 0:
+                break
+        if world.state == "End":
+            crashes += 1
+    return hits, crashes
+
+
+def frame_time(level, count, continuous, vectorized, frames, seed):
+    # median ms of Alien.update_all + Coin.update_all with count aliens, 5 bullets and 8 coins
+    world = make_world(level, continuous, vectorized, seed)
+    rng = world.random
+    budgets = (Alien.max_live, Coin.max_live)
+    Alien.max_live = count
+    Player.player.x, Player.player.y = 20, world.height // 2
+    Player.player.px, Player.player.py = 18, world.height // 2 - 2
+
+    def refill():
+        # a crash ends the game and leaves an explosion, start over from a clean frame
+        world.state = "Playing"
+        Explosion.setup()
+        while len(Alien.sprites) < count:
+            Alien.spawn(rng.uniform(0, world.width), rng.randint(0, world.height - Alien.height))
+        while len(Bullet.sprites) < Bullet.max_live:
+            Bullet.spawn(rng.uniform(0, world.width), rng.randint(0, world.height - Bullet.height))
+        while len(Coin.sprites) < 8:
+            Coin.spawn(rng.uniform(0, world.width), rng.randint(0, world.height - Coin.height))
+
+    times = []
+    try:
+        for i in range(frames + 20):
+            refill()
+            start = time.perf_counter()
+            Alien.update_all()
+            Coin.update_all()
+            if i >= 20:
+                times.append(time.perf_counter() - start)
+    finally:
+        Alien.max_live, Coin.max_live = budgets
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="discrete vs swept collisions: misses and frame time")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 20, 30, 40])
+    parser.add_argument('--counts', type=int, nargs='+', default=[8, 64, 256], help="aliens on screen")
+    parser.add_argument('--trials', type=int, default=500, help="head-on meetings per level")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--arrays', action='store_true', help="use the numpy pools (Sprite.vectorized)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    real_pyxel = sprites.pyxel
+    sprites.pyxel = NullPyxel()
+    try:
+        print(f"head-on meetings caught (of {args.trials})")
+        print(f"{'level':>6} {'bullet discrete':>16} {'bullet swept':>13} {'ship discrete':>14} {'ship swept':>11}")
+        for level in args.levels:
+            discrete = head_on(level, False, args.arrays, args.trials, args.seed)
+            swept = head_on(level, True, args.arrays, args.trials, args.seed)
+            print(f"{level:>6} {discrete[0]:>16} {swept[0]:>13} {discrete[1]:>14} {swept[1]:>11}")
+
+        print()
+        print("Alien.update_all + Coin.update_all, median ms per frame")
+        print(f"{'level':>6} {'aliens':>7} {'discrete':>10} {'swept':>10} {'ratio':>7}")
+        for level in (min(args.levels), max(args.levels)):
+            for count in args.counts:
+                discrete = frame_time(level, count, False, args.arrays, args.frames, args.seed)
+                swept = frame_time(level, count, True, args.arrays, args.frames, args.seed)
+                print(f"{level:>6} {count:>7} {discrete:>10.3f} {swept:>10.3f} {swept / discrete:>7.2f}")
+    finally:
+        sprites.pyxel = real_pyxel
+        Sprite.continuous = False
+
+
+if __name__ == '__main__':
+    main()
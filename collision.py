@@ -0,0 +1,189 @@
+## ------------- LIBRARY -------------- ##
+# numpy is imported by near_mask, the only part that needs it (the game starts faster without it)
+
+
+### ----------------------------------- ###
+### ------------ COLLISION ------------ ###
+### ----------------------------------- ###
+
+# same rectangle test the sprites always used (touching edges don't count)
+def overlaps(ax, ay, aw, ah, bx, by, bw, bh):
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+# distance between the two centers is less than the radius
+def centers_close(ax, ay, aw, ah, bx, by, bw, bh, radius):
+    return ((ax + aw // 2) - (bx + bw // 2))**2 + ((ay + ah // 2) - (by + bh // 2))**2 < radius**2
+
+
+## ----- Uniform grid (broad phase) ----- ##
+# the screen is cut into square cells, every box is put in the cells it touches
+# a query only looks at the boxes in the cells around it instead of all of them
+# the grid is rebuilt once per frame with clear() + insert()
+class SpatialGrid:
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        # (cell x, cell y) -> ids of the boxes inside that cell
+        self.cells = {}
+        # id -> item, box and whether it's still there
+        self.items = []
+        self.boxes = []
+        self.alive = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def clear(self):
+        self.cells.clear()
+        self.items.clear()
+        self.boxes.clear()
+        self.alive.clear()
+
+    def _cell_range(self, x, y, w, h):
+        size = self.cell_size
+        return (int(x // size), int((x + w) // size),
+                int(y // size), int((y + h) // size))
+
+    def insert(self, item, x, y, w, h):
+        index = len(self.items)
+        self.items.append(item)
+        self.boxes.append((x, y, w, h))
+        self.alive.append(True)
+
+        x0, x1, y0, y1 = self._cell_range(x, y, w, h)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                ids = cells.get((cx, cy))
+                if ids is None:
+                    cells[(cx, cy)] = [index]
+                else:
+                    ids.append(index)
+        return index
+
+    def remove(self, index):
+        # the id stays in its cells, queries just skip it
+        self.alive[index] = False
+
+    def candidates(self, x, y, w, h):
+        # ids of every live box sharing a cell with (x, y, w, h), in insertion order
+        x0, x1, y0, y1 = self._cell_range(x, y, w, h)
+        cells = self.cells
+        alive = self.alive
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                ids = cells.get((cx, cy))
+                if ids:
+                    found.update(ids)
+        return sorted(i for i in found if alive[i])
+
+    def query(self, x, y, w, h):
+        # (id, item) of every live box that really overlaps (x, y, w, h), in insertion order
+        boxes = self.boxes
+        items = self.items
+        for i in self.candidates(x, y, w, h):
+            bx, by, bw, bh = boxes[i]
+            if overlaps(x, y, w, h, bx, by, bw, bh):
+                yield i, items[i]
+
+
+# vectorized broad phase for the numpy pools (Sprite.vectorized)
+# True for every box of the first group that shares a cell with a box of the second group
+# cell_size has to be at least as big as the boxes so the 4 corners cover every cell
+def near_mask(ax, ay, aw, ah, bx, by, bw, bh, cell_size=16):
+    import numpy as np
+    if len(ax) == 0 or len(bx) == 0:
+        return np.zeros(len(ax), dtype=bool)
+
+    def keys(x, y):
+        return (np.floor_divide(x, cell_size).astype(np.int64) << 32) + np.floor_divide(y, cell_size).astype(np.int64)
+
+    occupied = np.unique(np.concatenate((keys(bx, by), keys(bx + bw, by),
+                                         keys(bx, by + bh), keys(bx + bw, by + bh))))
+    near = np.zeros(len(ax), dtype=bool)
+    for x, y in ((ax, ay), (ax + aw, ay), (ax, ay + ah), (ax + aw, ay + ah)):
+        near |= np.isin(keys(x, y), occupied)
+    return near
+
+
+## ----- Swept tests (continuous collision) ----- ##
+# the tests above only look at where the boxes are at the end of the frame: when two of them
+# move toward each other by more than their width in one frame they can go through each other
+# (an alien at level 5 and a bullet close 10 px per frame, a bullet is 8 px wide)
+# these look at the whole move instead: both go in a straight line from where they were
+# (x0, y0) to where they are (x1, y1) during the frame, True if they touched at any moment.
+# where they are at the end counts too, so every pair the tests above find is found here as well
+
+def swept_overlaps(ax0, ay0, ax1, ay1, aw, ah, bx0, by0, bx1, by1, bw, bh):
+    if overlaps(ax1, ay1, aw, ah, bx1, by1, bw, bh):
+        return True
+    # b seen from a goes from p0 to p1, the boxes overlap while -bw < px < aw and -bh < py < ah
+    # -> the part of the frame (t from 0 to 1) when that's true on both axes
+    enter = float('-inf')
+    leave = float('inf')
+    for p0, p1, low, high in ((bx0 - ax0, bx1 - ax1, -bw, aw), (by0 - ay0, by1 - ay1, -bh, ah)):
+        move = p1 - p0
+        if move == 0:
+            if not low < p0 < high:
+                return False
+            continue
+        t0 = (low - p0) / move
+        t1 = (high - p0) / move
+        if t0 > t1:
+            t0, t1 = t1, t0
+        enter = max(enter, t0)
+        leave = min(leave, t1)
+    return enter < leave and enter < 1 and leave > 0
+
+
+def swept_centers_close(ax0, ay0, ax1, ay1, aw, ah, bx0, by0, bx1, by1, bw, bh, radius):
+    if centers_close(ax1, ay1, aw, ah, bx1, by1, bw, bh, radius):
+        return True
+    # center of b seen from the center of a, at the start and at the end of the frame
+    x0 = (bx0 + bw // 2) - (ax0 + aw // 2)
+    y0 = (by0 + bh // 2) - (ay0 + ah // 2)
+    dx = (bx1 + bw // 2) - (ax1 + aw // 2) - x0
+    dy = (by1 + bh // 2) - (ay1 + ah // 2) - y0
+    # the moment they were the closest
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else min(max(-(x0 * dx + y0 * dy) / length, 0.0), 1.0)
+    x = x0 + dx * t
+    y = y0 + dy * t
+    return x * x + y * y < radius**2
+
+
+# the same two for the numpy pools, on whole arrays at once (broadcasting like any numpy
+# expression, ex: aliens as a column against bullets as a row -> aliens x bullets)
+def swept_overlaps_mask(ax0, ay0, ax1, ay1, aw, ah, bx0, by0, bx1, by1, bw, bh):
+    import numpy as np
+    enter = float('-inf')
+    leave = float('inf')
+    for p0, p1, low, high in ((bx0 - ax0, bx1 - ax1, -bw, aw), (by0 - ay0, by1 - ay1, -bh, ah)):
+        move = p1 - p0
+        still = move == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (low - p0) / move
+            t1 = (high - p0) / move
+        # an axis without movement is either inside the whole frame or never
+        inside = (low < p0) & (p0 < high)
+        enter = np.maximum(enter, np.where(still, np.where(inside, -np.inf, np.inf), np.minimum(t0, t1)))
+        leave = np.minimum(leave, np.where(still, np.where(inside, np.inf, -np.inf), np.maximum(t0, t1)))
+    now = (ax1 < bx1 + bw) & (bx1 < ax1 + aw) & (ay1 < by1 + bh) & (by1 < ay1 + ah)
+    return now | ((enter < leave) & (enter < 1) & (leave > 0))
+
+
+def swept_centers_close_mask(ax0, ay0, ax1, ay1, aw, ah, bx0, by0, bx1, by1, bw, bh, radius):
+    import numpy as np
+    x0 = (bx0 + bw // 2) - (ax0 + aw // 2)
+    y0 = (by0 + bh // 2) - (ay0 + ah // 2)
+    x1 = (bx1 + bw // 2) - (ax1 + aw // 2)
+    y1 = (by1 + bh // 2) - (ay1 + ah // 2)
+    dx = x1 - x0
+    dy = y1 - y0
+    length = dx * dx + dy * dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.where(length > 0, -(x0 * dx + y0 * dy) / length, 0.0), 0.0, 1.0)
+    x = x0 + dx * t
+    y = y0 + dy * t
+    return (x1 * x1 + y1 * y1 < radius**2) | (x * x + y * y < radius**2)
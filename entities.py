@@ -0,0 +1,98 @@
+## ------------- LIBRARY -------------- ##
+import numpy as np
+
+
+### ----------------------------------- ###
+### ---------- ENTITY ARRAYS ---------- ###
+### ----------------------------------- ###
+
+# array-backed pool for one sprite class (struct of arrays)
+# instead of one python object per sprite, every field is a numpy array
+# and slot i of each array belongs to the same sprite
+# the live sprites are always packed in [0, len) in spawn order
+class EntityArrays:
+    def __init__(self, capacity=64):
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        # how far the sprite goes left every frame (negative -> goes right)
+        self.vx = np.zeros(capacity, dtype=np.float64)
+        self.frame = np.zeros(capacity, dtype=np.int64)
+        self.animation_frame = np.zeros(capacity, dtype=np.int64)
+        # False -> sprite is dead and will be removed on the next compact()
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        # double the size of every array, keeping what is already there
+        capacity = len(self.x) * 2
+        for name in ('x', 'y', 'vx', 'frame', 'animation_frame', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def append(self, x, y, vx=0.0):
+        if self.count == len(self.x):
+            self._grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.frame[i] = 0
+        self.animation_frame[i] = 0
+        self.alive[i] = True
+        self.count += 1
+
+    def advance(self, period=1, loop=True):
+        # same as calling update() on every sprite:
+        # move, pick the animation frame from the current frame, next frame
+        n = self.count
+        self.x[:n] -= self.vx[:n]
+        if loop:
+            np.remainder(self.frame[:n], period, out=self.animation_frame[:n])
+        else:
+            self.animation_frame[:n] = self.frame[:n]
+        self.frame[:n] += 1
+
+    def kill(self, i):
+        self.alive[i] = False
+
+    def kill_oldest(self):
+        alive = self.alive[:self.count]
+        if alive.any():
+            self.alive[int(alive.argmax())] = False
+
+    def compact(self):
+        # drop every dead sprite, the order of the live ones stays the same
+        n = self.count
+        keep = self.alive[:n]
+        if keep.all():
+            return
+        m = int(keep.sum())
+        for name in ('x', 'y', 'vx', 'frame', 'animation_frame'):
+            values = getattr(self, name)
+            values[:m] = values[:n][keep]
+        self.alive[:m] = True
+        self.alive[m:n] = False
+        self.count = m
+
+    def load(self, x, y, vx, frame, animation_frame):
+        # every sprite at once (snapshot.py), anything with the buffer protocol or a list
+        n = len(x)
+        while len(self.x) < n:
+            self._grow()
+        self.x[:n] = x
+        self.y[:n] = y
+        self.vx[:n] = vx
+        self.frame[:n] = frame
+        self.animation_frame[:n] = animation_frame
+        self.alive[:n] = True
+        self.alive[n:self.count] = False
+        self.count = n
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
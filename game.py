@@ -1,357 +1,151 @@
 ## ------------- LIBRARY -------------- ##
+import time
+# when the game started, before the imports (--startup-report)
+STARTED = time.perf_counter()
+
 import pyxel
-from collections import deque
+import argparse
+import atexit
 import random
-import pandas as pd
-
-
-### ----------------------------------- ###
-### ------------- SPRITES ------------- ###
-### ----------------------------------- ###
-
-# parent of all sprite object here
-class Sprite:
-    def __init__(self):
-        pass
-
-    @classmethod
-    def setup(cls):
-        # deque -> double ended que
-        # like a list but quicker append and pop operations from both ends of the container
-        cls.sprites = deque()
-
-    # @classmethod
-    # def update_all(cls):
-    #     for sprite in cls.sprites:
-    #         sprite.update()
-
-    @classmethod
-    def draw_all(cls):
-        for sprite in cls.sprites:
-            sprite.draw()
-
-
-## ----- Background Stars ------ ##
-class Star(Sprite):
-    frame = 0
-    count = 0
-    width = 8
-    height = 8
-
-    def __init__(self, x, y) -> None:
-        self.x = x
-        self.y = y
-
-        self.frame = 0
-        # initializing animation frame to put the star
-        self.animation_frame = 0
-    
-    def update(self):
-        # to make the frame move backwards
-        self.x -= 2
-        # // 9 -> the speed of the star animation
-        # % 3 -> the amount of star animation (3 shapes)
-        self.animation_frame = self.frame // 9 % 3
-        # move to the next frame
-        self.frame += 1
-
-    def draw(self):
-        # Copy the region of size (w, h) from (u, v) of the image bank img (0-2) to (x, y). 
-        # If negative value is set for w and/or h, it will reverse horizontally and/or vertically. 
-        # If colkey is specified, treated as transparent color.
-        pyxel.blt(x=self.x, y=self.y, img=0,
-                  u=0, v=Star.height*self.animation_frame, w=Star.width, h=Star.height, colkey=1)
-    
-    @classmethod
-    def append(cls):
-        # cls is like self but for classmethod
-
-        # for even entry in our deque
-        if cls.count % 2 == 0:
-            # appending (to the deque) a location for stars in random range
-            # from top to half
-            cls.sprites.append(
-                cls(x=pyxel.width, y=random.randint(0, (pyxel.height - cls.height) // 2)))
-        # for odd entry
-        else:
-            # from half to bottom
-            cls.sprites.append(
-                cls(x=pyxel.width, y=random.randint((pyxel.height - cls.height) // 2, pyxel.height - cls.height)))
-        cls.count += 1
-
-    @classmethod
-    def update_all(cls):
-        # after every 3 frame we append
-        if cls.frame % 3 == 0:
-            cls.append()
-        # for every location we append to deque, update it -> add a star
-        for sprite in cls.sprites.copy():
-            sprite.update()
-            # if it's inside the screen range, we pop the star (put it in screen)
-            if sprite.x < -cls.width:
-                cls.sprites.popleft()
-
-        cls.frame += 1
-
-
-## ----- Spaceship Bullet ----- ##
-class Bullet(Sprite):
-    width = 8
-    height = 8
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.frame = 0
-        self.animation_frame = 0
-    
-    def update(self):
-        # how fast the bullet goes
-        self.x += 4
-        # how many animation frame
-        self.animation_frame = self.frame % 1
-        # to change the frame one at a time
-        self.frame += 1
-    
-    def draw(self):
-        pyxel.blt(x = self.x, y = self.y, img = 0, u = 8,
-                    v = Bullet.height*self.animation_frame, w = Bullet.width, h = Bullet.height, colkey= 0)
-
-    @classmethod
-    def append(cls,x, y):
-        # how many bullets can appear in the screen 
-        if len(cls.sprites) < 5:
-            cls.sprites.append(cls(x,y))
-    
-    @classmethod
-    def update_all(cls):
-        for sprite in cls.sprites.copy():
-            sprite.update()
-            if sprite.x > pyxel.width:
-                cls.sprites.popleft()
-
-
-## ----- Alien inside UFO (Enemy) ----- ##
-class Alien(Sprite):
-    width = 16
-    height = 16
-    frame = 0
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-
-        # how fast the alien go
-        self.vx = (1.7 * random.random() + Game.level)
-        self.frame = 0
-        self.animation_frame = 0
-    
-    def update(self):
-        # go left
-        self.x -= self.vx
-        # change the animation of the alien
-        self.animation_frame = self.frame // 5 % 2
-        self.frame += 1
-    
-    def draw(self):
-        # Copy the region of size (w, h) from (u, v) of the image bank img (0-2) to (x, y). 
-        # If negative value is set for w and/or h, it will reverse horizontally and/or vertically. 
-        # If colkey is specified, treated as transparent color.
-        pyxel.blt(x = int(self.x), y = self.y, img = 0,
-                  u = 16, v = Alien.height*self.animation_frame, w = Alien.width, h = Alien.height, colkey=0)
-    
-    @classmethod
-    def append(cls):
-        # append in random starting position
-        # pyxel.width -> the very last frame of the game (right)
-        cls.sprites.append(
-            cls(pyxel.width, random.randint(0, pyxel.height - cls.height)))
-
-    @classmethod
-    def update_all(cls):
-        if (cls.frame + 1) % 17 == 0:
-            cls.append()
-        for sprite in cls.sprites.copy():
-            sprite.update()
-            if sprite.x < -cls.width:
-                cls.sprites.remove(sprite)
-                continue
-            
-            # if bullet touched the alien, remove both
-            # add explosion sprite
-            for bullet in Bullet.sprites.copy():
-                if sprite.x < bullet.x + Bullet.width and bullet.x < sprite.x + cls.width and sprite.y < bullet.y + Bullet.height and bullet.y < sprite.y + cls.height:
-                    cls.sprites.remove(sprite)
-                    Bullet.sprites.remove(bullet)
-                    Explosion.append(sprite.x, sprite.y)
-                    break
-            
-            player_center_x = Player.player.x + Player.width // 2
-            player_center_y = Player.player.y + Player.height // 2
-            sprite_center_x = sprite.x + cls.width // 2
-            sprite_center_y = sprite.y + cls.height // 2
-
-            if (player_center_x - sprite_center_x)**2 + (player_center_y - sprite_center_y)**2 < 10**2:
-                Game.state = "End"
-                if sprite in cls.sprites:
-                    cls.sprites.remove(sprite)
-                Explosion.append(sprite.x, sprite.y)
-
-        cls.frame += Game.level
-
-
-## ----- Exploding Alien / Player ----- ##
-class Explosion(Sprite):
-    count = 0
-    width = 16
-    height = 16
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.frame = 0
-        self.animation_frame = 0
-
-    def update(self):
-        # change explosion animation (2 frames)
-        self.animation_frame = self.frame // 2
-        self.frame += 1
-
-    def draw(self):
-        pyxel.blt(x=self.x, y=self.y, img=0,
-                u=32, v=Explosion.height*self.animation_frame, w=Explosion.width, h=Explosion.height, colkey=0)
-
-    @classmethod
-    def append(cls, x, y):
-        cls.sprites.append(cls(x=x, y=y))
-
-    @classmethod
-    def update_all(cls):
-        for sprite in cls.sprites.copy():
-            sprite.update()
-            if sprite.animation_frame > 2:
-                cls.sprites.popleft()
-        
-
-
-## ------ Moneyyyy (Score) ----- ##
-class Coin(Sprite):
-    width = 8
-    height = 8
-    frame = 0
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = 1.5 
-        self.frame = 0
-        self.animation_frame = 0
-
-    def update(self):
-        # go left
-        self.x -= self.vx
-        # change coin animation (4 frames)
-        self.animation_frame = self.frame // 3 % 4
-        self.frame += 1
-
-    def draw(self):
-        pyxel.blt(x=int(self.x), y=self.y, img=0,
-                  u=48, v=Coin.height*self.animation_frame, w=Coin.width, h=Coin.height, colkey=0)
-
-    @classmethod
-    def append(cls):
-        cls.sprites.append(
-            cls(pyxel.width, random.randint(0, pyxel.height - cls.height)))
-
-    @classmethod
-    def update_all(cls):
-        # 40 -> not too much coins
-        if cls.frame % 40 == 0:
-            cls.append()
-        for sprite in cls.sprites.copy():
-            sprite.update()
-            if sprite.x < -cls.width:
-                cls.sprites.remove(sprite)
-                continue
-
-            if sprite.x < Player.player.x + Player.width and Player.player.x < sprite.x + cls.width and sprite.y < Player.player.y + Player.height and Player.player.y < sprite.y + cls.height:
-                if Game.state == "Playing":
-                    Game.score += 1
-                cls.sprites.remove(sprite)
-                continue
-
-        cls.frame += 1
+import struct
+from collections import deque
 
+from sprites import Star, Bullet, Alien, Explosion, Coin, Player
+from world import World
+from inputs import Inputs, UP, DOWN, LEFT, RIGHT, SPACE, KEY_M, KEY_S, KEY_L, RETURN
+from profiler import Profiler, StartupReport
+from memory import GCManager, AllocationReport
+from starfield import Starfield
+from timestep import FixedTimestep
+from replay import Recorder
+from snapshot import take, restore, Rewind
+from ui import UILayer
+
+
+# pyxel key -> bit in Inputs
+KEYS = {
+    pyxel.KEY_UP: UP,
+    pyxel.KEY_DOWN: DOWN,
+    pyxel.KEY_LEFT: LEFT,
+    pyxel.KEY_RIGHT: RIGHT,
+    pyxel.KEY_SPACE: SPACE,
+    pyxel.KEY_M: KEY_M,
+    pyxel.KEY_S: KEY_S,
+    pyxel.KEY_L: KEY_L,
+    pyxel.KEY_RETURN: RETURN,
+}
 
 
-### ----------------------------------- ###
-### ------------- PLAYER -------------- ###
-### ----------------------------------- ###
-
-class Player:
-    width = 16
-    height = 16
-
-    def __init__(self, x, y) -> None:
-        self.x = x
-        self.y = y
-        self.frame = 0
-        self.animation_frame = 0
-    
-    @classmethod # bound to the class rather than its object
-    def update(cls):
-        cls.player.animation_frame = cls.player.frame // 3 % 2
-        cls.player.frame += 1
-
-        # min and max so it does not go past the screen 
-        if pyxel.btn(pyxel.KEY_UP):
-            cls.player.y = max(cls.player.y -2, 0)
-        
-        if pyxel.btn(pyxel.KEY_DOWN):
-            cls.player.y = min(cls.player.y + 2, pyxel.height - cls.height)
-        
-        if pyxel.btn(pyxel.KEY_LEFT):
-            cls.player.x = max(cls.player.x -2, 2)
-        
-        if pyxel.btn(pyxel.KEY_RIGHT):
-            cls.player.x = min(cls.player.x + 2, pyxel.width //2)
-        
-        # btnp -> button pressed -> not continuous
-        if pyxel.btnp(pyxel.KEY_SPACE):
-            # from where do the bullet appears (x,y)
-            # cls.width - 8 -> so it comes from behind the body of the spaceship
-            # cls.height //2 -> too low | -8 -> too high | //2 -> perfectly middle
-            Bullet.append(cls.player.x + cls.width - 8, 
-                            cls.player.y + cls.height // 2 -8 //2)
-            
-
-    @classmethod
-    def draw(cls):
-        pyxel.blt(x = cls.player.x, y = cls.player.y, img = 1, u = 0, v = cls.height * cls.player.animation_frame,
-                    w = cls.width, h = cls.height, colkey=0)
-     
-    @classmethod
-    def setup(cls, x, y):
-        cls.player = cls(x,y)
-
 ### ----------------------------------- ###
 ### --------------- GAME -------------- ###
 ### ----------------------------------- ###
 
+# pyxel front end: reads the keys, steps the World and draws it
+# all the game rules are in world.py / sprites.py
+# [F1] profiler on/off (with its overlay) | [F2] save the profile now
+# [F5] quicksave | [F9] quickload | hold [BACKSPACE] to rewind (snapshot.py, not while recording)
+# [F3] autopilot on/off: the ship plays itself (autopilot.py), its runs don't go on the leaderboard
+# the world steps at a fixed rate (timestep.py), frames are drawn at fps (or skipped when late)
+# the saves and the leaderboard are opened after the first frame (load_saves)
+# the garbage collector runs at the end of frames that have time left, or on a pause / game over
+# --spectate: every frame that stepped is sent to the spectators (spectate.py), never waiting for them
 class Game:
-    def __init__(self):
+    def __init__(self, vectorized=False, profile=False, star_sprites=False, leak_check=False,
+                 rate=30, fps=30, max_steps=4, record=None, startup_report=False, continuous=False,
+                 gc_auto=False, alloc_report=False, spectate=None, spectate_checksums=False, rewind=10,
+                 autopilot=None):
+        # every part of the start is timed, printed once the saves are loaded if startup_report
+        Game.startup = StartupReport(STARTED)
+        Game.show_startup = startup_report
+        Game.startup.mark("imports")
+
         # size of the screen
-        pyxel.init(width=120, height=90, title="Space Adventure")
+        pyxel.init(width=120, height=90, title="Space Adventure", fps=fps)
+        Game.startup.mark("pyxel.init")
         pyxel.load(filename="assets/res.pyxres")
-
-        self.setup()
+        Game.startup.mark("assets (res.pyxres)")
+
+        self.setup(vectorized, star_sprites, leak_check, record, continuous)
+        Game.timestep = FixedTimestep(rate=rate, max_steps=max_steps)
+        # a snapshot of the world before every step of the last `rewind` seconds, and the quicksave
+        Game.rewind = Rewind(frames=rewind * rate) if rewind > 0 else None
+        # (snapshot, run) -> the quickload goes back into the game it was taken in
+        Game.quicksave = None
+        # every game played is a run with its own number, one that ended goes on the leaderboard once
+        # (rewinding or quickloading past its game over and crashing again is still the same run)
+        Game.run = 0
+        Game.recorded_run = None
+        Game.fps = fps
+        Game.frame_start = time.perf_counter()
+
+        # what the setup made lives until the end, the collector doesn't need to look at it again
+        Game.memory = GCManager()
+        Game.memory.on_collect = self.gc_collected
+        Game.memory.freeze()
+        if not gc_auto:
+            Game.memory.manage()
+        # debug: what every frame allocates (tracemalloc)
+        Game.allocations = AllocationReport() if alloc_report else None
+        # every frame's sprites to the spectators on a local port (spectate.py)
+        Game.spectators = None
+        if spectate is not None:
+            from spectate import Broadcaster
+            Game.spectators = Broadcaster(port=spectate, checksum=spectate_checksums)
+        # the ship plays itself (attract mode, soak tests), `autopilot` ms of search per frame
+        # Game.pilot is made the first time it's turned on, Game.autopilot is it while it's on
+        Game.pilot = None
+        Game.autopilot = None
+        Game.autopilot_budget = 4.0 if autopilot is None else autopilot
+        if autopilot is not None:
+            self.toggle_autopilot()
+
+        if profile:
+            Game.profiler.enable()
+        # whatever was recorded is saved when the game is closed
+        atexit.register(self.export_profile)
+        if Game.recorder is not None:
+            atexit.register(Game.recorder.close)
+        atexit.register(lambda: print(Game.timestep.report()))
+        atexit.register(lambda: print(Game.memory.report()))
+        if Game.allocations is not None:
+            atexit.register(lambda: print(Game.allocations.report()))
+        if Game.spectators is not None:
+            atexit.register(Game.spectators.close)
+            atexit.register(lambda: print(Game.spectators.report()))
         pyxel.run(self.update, self.draw)
 
 
-    def setup(self):
-        Game.state = 'Start'
-        Game.score = 0
-        Game.level = 1
+    def setup(self, vectorized=False, star_sprites=False, leak_check=False, record=None, continuous=False):
+        # background: baked scrolling layers, or one Star sprite per star like before
+        Game.starfield = None if star_sprites else Starfield(pyxel.width, pyxel.height)
+        Game.startup.mark("starfield")
+        # a recording needs the seed to play the game again
+        seed = random.randrange(1 << 62) if record else None
+        Game.world = World(width=pyxel.width, height=pyxel.height, seed=seed, vectorized=vectorized,
+                           stars=star_sprites, leak_check=leak_check, continuous=continuous)
+        Game.startup.mark("world + sprites")
+        # every step's keys go to the file (written when the game closes)
+        Game.recorder = Recorder(record, Game.world) if record else None
+        Game.inputs = Inputs()
+        # the presses of frames that ran no step yet, one Inputs per frame, oldest first:
+        # the next steps take one frame each, so two keys pressed on frames without a step
+        # (M then S) aren't merged into one step (the second one would be lost)
+        Game.pending = deque(maxlen=8)
+
+        # every stage of a frame that the profiler times
+        Game.profiler = Profiler(
+            targets=[(World, 'step'),
+                     (Star, 'update_all'), (Bullet, 'update_all'), (Alien, 'update_all'),
+                     (Explosion, 'update_all'), (Coin, 'update_all'), (Player, 'update'),
+                     (Game, 'draw_screen'), (Starfield, 'draw'),
+                     (Star, 'draw_all'), (Bullet, 'draw_all'), (Alien, 'draw_all'),
+                     (Explosion, 'draw_all'), (Coin, 'draw_all'), (Player, 'draw'),
+                     (Game, 'write_save'), (Game, 'record_run')],
+            counted=[Star, Bullet, Alien, Explosion, Coin],
+            # time spent in garbage collections (GCManager.on_collect), sending to the spectators,
+            # taking the rewind snapshots and in the autopilot's search
+            # (the search doesn't step the pools, the stages above don't count it)
+            extra=['gc', 'spectate', 'snapshot', 'autopilot'])
 
         # for saving
         Game.pname = ""
@@ -359,255 +153,579 @@ class Game:
         Game.save_state = 0
         Game.load_state = False
 
-        # load save file
+        # every finished run, and the save slots too, opened by load_saves
         # ex: {0 : [name, score], 1: [name, score]}
-        savefile = pd.read_csv('load.csv')
-        Game.save_dict = {k:v for k,v in zip(savefile.index, list(zip(savefile['Name'], savefile['Score'])))}
-
+        Game.leaderboard = None
+        Game.saves = None
+        Game.save_dict = {}
+        # saves are written by a background thread, save_ticket -> the last one asked for
+        Game.writer = None
+        Game.save_ticket = 0
+        # frame when the last save was on disk (to show "Saved!" for a while)
+        Game.saved_frame = None
+        # goes up every time a slot changes, so the menus showing the slots are drawn again
+        Game.saves_version = 0
+
+        self.setup_ui()
+        Game.startup.mark("ui layers")
+
+
+    # the save slots and the leaderboard (sqlite3, the file, the writer thread) aren't needed
+    # to draw the title screen: they're opened right after the first frame,
+    # or before if something needs them ([L] on the title screen)
+    def load_saves(self):
+        if Game.leaderboard is not None:
+            return
+        from savestore import SaveWriter
+        from leaderboard import Leaderboard
+
+        # the old slots (saves/ or load.csv) are copied in the first time
+        Game.leaderboard = Leaderboard()
+        Game.saves = Game.leaderboard
+        Game.save_dict = Game.saves.load()
+        Game.saves_version += 1
+        Game.writer = SaveWriter(Game.saves)
+        # the saves still in the queue are written when the game closes, then the file is closed
+        atexit.register(Game.leaderboard.close)
+        atexit.register(Game.writer.close)
+
+        Game.startup.mark("saves + leaderboard")
+        if Game.show_startup:
+            print(Game.startup.report())
+        # the leaderboard, its connection and the writer thread stay too
+        Game.memory.freeze()
+
+    # snapshot of the keys the game uses this frame
+    def read_inputs(self):
+        held = 0
+        pressed = 0
+        for key, bit in KEYS.items():
+            if pyxel.btn(key):
+                held |= bit
+            if pyxel.btnp(key):
+                pressed |= bit
+        return Inputs(held, pressed, pyxel.input_text)
+
+
+    def export_profile(self):
+        if Game.profiler.frames > 0:
+            Game.profiler.export("profile")
+
+
+    def gc_collected(self, generation, ms):
+        Game.profiler.add('gc', ms)
 
-        # initialize x and y of the spaceship
-        Player.setup(x = 5 , y = 50)
-
-        # initialize deque
-        Star.setup()
-        Bullet.setup()
-        Alien.setup()
-        Explosion.setup()
-        Coin.setup()
-    
 
     def update(self):
-        ## START PLAYING - NEW OR LOAD
-        # new game
-        if pyxel.btnp(pyxel.KEY_SPACE) and Game.state == 'Start':
-            Game.state = "Playing"
-            Game.start_frame_count = pyxel.frame_count
+        Game.frame_start = time.perf_counter()
+        if Game.leaderboard is None and Game.startup.first_frame is not None:
+            self.load_saves()
+
+        # profiler keys, not part of the game itself
+        if pyxel.btnp(pyxel.KEY_F1):
+            Game.profiler.toggle()
+        if pyxel.btnp(pyxel.KEY_F2):
+            self.export_profile()
+        # quicksave / quickload, the whole world in memory
+        if pyxel.btnp(pyxel.KEY_F5):
+            self.quick_save()
+        if pyxel.btnp(pyxel.KEY_F9):
+            self.quick_load()
+        if pyxel.btnp(pyxel.KEY_F3):
+            self.toggle_autopilot()
+        if Game.profiler.enabled:
+            Game.profiler.next_frame()
+
+        # this frame's keys (the menus in draw_screen read them)
+        inputs = Game.inputs = self.read_inputs()
+        if inputs.pressed or inputs.text:
+            Game.pending.append(inputs)
+        held = inputs.held
+
+        # 0 steps when the frame came early, several after a slow one
+        steps = Game.timestep.advance()
+        # [BACKSPACE] held -> the steps go back in time instead, one snapshot each
+        rewinding = self.can_rewind() and pyxel.btn(pyxel.KEY_BACKSPACE)
+        for i in range(steps):
+            if rewinding:
+                self.rewind_step()
+                continue
+            # the presses of the oldest frame not played yet (a press only counts for one step),
+            # the keys held now
+            if Game.pending:
+                pressed = Game.pending.popleft()
+                inputs = Inputs(held, pressed.pressed, pressed.text)
+            else:
+                inputs = Inputs(held)
+            # the autopilot plays instead of the keys (not in the menus), the frame's budget shared by the steps
+            if Game.autopilot is not None:
+                start = time.perf_counter()
+                inputs = Game.autopilot.inputs(Game.world, Game.autopilot_budget / steps) or inputs
+                Game.profiler.add('autopilot', (time.perf_counter() - start) * 1000)
+            self.step(inputs)
+        if steps:
+            # the presses made while going back in time aren't played afterwards
+            if rewinding:
+                Game.pending.clear()
+            # what the steps changed goes to the spectators (nothing changed on a frame without steps)
+            if Game.spectators is not None:
+                start = time.perf_counter()
+                Game.spectators.publish(Game.world)
+                Game.profiler.add('spectate', (time.perf_counter() - start) * 1000)
+
+
+    # one fixed step of the game
+    def step(self, inputs):
         # load saved game -> go to the load menu
-        if (pyxel.btnp(pyxel.KEY_L)) and (Game.state == 'Start') and (len(Game.save_dict) > 0):
-            Game.state = "Load Menu"
-        
-        # when game is playing -> update all
-        if Game.state == "Playing":
-            Star.update_all()
-            Bullet.update_all()
-            Alien.update_all()
-            Explosion.update_all()
-            Coin.update_all()
-            Player.update()
-        
-        # when game is paused (on menu) -> let stars continue
-        if Game.state == "Pause":
-            Star.update_all()   
+        if (inputs.pressed & KEY_L) and (Game.world.state == 'Start'):
+            self.load_saves()
+            if len(Game.save_dict) > 0:
+                Game.world.state = "Load Menu"
 
-        # when the game is over -> let stars continue and left exploded spaceship there
-        if Game.state == "End":
-            Star.update_all()
-            Explosion.update_all()
+        state = Game.world.state
+        # the world as it is before this step, to come back to it ([BACKSPACE])
+        if state == "Playing" and Game.rewind is not None and Game.recorder is None:
+            start = time.perf_counter()
+            Game.rewind.push(take(Game.world))
+            Game.profiler.add('snapshot', (time.perf_counter() - start) * 1000)
+
+        if Game.recorder is None:
+            Game.world.step(inputs)
+        else:
+            Game.recorder.step(inputs)
+            Game.world.step(inputs)
+            Game.recorder.stepped()
+        # the ship just crashed -> the run goes on the leaderboard (not the autopilot's)
+        if Game.world.state == "End" and state != "End" and Game.autopilot is None:
+            self.record_run()
+        # a new game, the rewind doesn't go back into the last one
+        if state == "Start" and Game.world.state == "Playing":
+            Game.run += 1
+            if Game.rewind is not None:
+                Game.rewind.clear()
+        # paused, game over or a menu: nothing moves, a good time for a full collection
+        if Game.world.state != state and Game.world.state != "Playing":
+            Game.memory.transition()
+        # the stars keep going while playing, paused or after the game over
+        if Game.starfield is not None and Game.world.state in ("Playing", "Pause", "End"):
+            Game.starfield.update()
+        self.update_save_status()
+
+
+    ## ----- Snapshots of the whole world (snapshot.py) ----- ##
+    # a recording only has the keys, a world put back from a snapshot couldn't be played again
+    def can_rewind(self):
+        return (Game.rewind is not None and Game.recorder is None and len(Game.rewind) > 0
+                and Game.world.state in ("Playing", "End"))
+
+    def rewind_step(self):
+        data = Game.rewind.pop()
+        if data is None:
+            return
+        restore(Game.world, data)
+        # the stars go back too
+        if Game.starfield is not None:
+            Game.starfield.frame -= 1
+
+    def quick_save(self):
+        if Game.world.state in ("Playing", "Pause"):
+            Game.quicksave = (take(Game.world), Game.run)
+
+    def quick_load(self):
+        if Game.quicksave is None or Game.recorder is not None:
+            return
+        if Game.world.state in ("Playing", "Pause", "End"):
+            data, Game.run = Game.quicksave
+            restore(Game.world, data)
+            Game.world.state = "Playing"
+            if Game.rewind is not None:
+                Game.rewind.clear()
+
+    ## ----- The ship playing itself (autopilot.py) ----- ##
+    # made the first time it's turned on, the report of every decision it took is printed at the end
+    def toggle_autopilot(self):
+        if Game.autopilot is not None:
+            Game.autopilot = None
+            return
+        if Game.pilot is None:
+            from autopilot import Autopilot
+            Game.pilot = Autopilot(budget_ms=Game.autopilot_budget)
+            atexit.register(lambda: print(Game.pilot.report()))
+        Game.autopilot = Game.pilot
+
+    # the world saved with a slot -> False for the old slots (only the score) or while recording
+    def load_world(self, index):
+        if Game.recorder is not None:
+            return False
+        data = Game.saves.load_world(index)
+        if data is None:
+            return False
+        try:
+            restore(Game.world, data)
+        except (ValueError, struct.error):
+            return False
+        if Game.rewind is not None:
+            Game.rewind.clear()
+        return True
+
+
+    # "Saved!" is only shown once the writer says the slot is really on disk
+    def update_save_status(self):
+        if Game.save_ticket and Game.writer.done(Game.save_ticket):
+            Game.save_ticket = 0
+            Game.saved_frame = Game.world.frame_count
 
 
     def draw(self):
         pyxel.cls(0)
+        self.draw_screen()
+        if Game.profiler.enabled:
+            self.draw_profiler()
+        Game.timestep.rendered()
+        if Game.startup.first_frame is None:
+            Game.startup.frame_drawn()
+        if Game.allocations is not None:
+            Game.allocations.frame()
+        # what is left of the frame's time can go to the garbage collector
+        Game.memory.idle((Game.frame_start + 1 / Game.fps - time.perf_counter()) * 1000)
+
+
+    # ms per stage (averaged over the last 30 frames) and sprites per class, on top of the game
+    def draw_profiler(self):
+        times, counts = Game.profiler.average(30)
+        stages = Game.profiler.stages
+        pyxel.rect(0, 0, pyxel.width, 56, 0)
+        pyxel.text(1, 1, f"step {times[0]:.2f} draw {times[stages.index('Game.draw_screen')]:.2f} ms", 10)
+
+        # the 5 slowest stages (the totals are already on the first line)
+        line = 8
+        slowest = sorted(range(1, len(stages)), key=lambda i: -times[i])
+        for i in [i for i in slowest if stages[i] != 'Game.draw_screen'][:5]:
+            name = stages[i].replace('update_all', 'upd').replace('draw_all', 'drw')
+            pyxel.text(1, line, f"{name} {times[i]:.2f}", 7)
+            line += 6
+
+        pyxel.text(1, line, " ".join(f"{cls.__name__[0]}{int(n)}" for cls, n in
+                                     zip(Game.profiler.counted, counts)), 11)
+        # fixed steps run vs frames drawn since the start
+        timestep = Game.timestep
+        pyxel.text(1, line + 6, f"sim {timestep.steps} drawn {timestep.frames} lost {timestep.dropped}", 6)
+        # garbage collections since the start and the longest one
+        stats = Game.memory.stats.values()
+        pyxel.text(1, line + 12, f"gc {sum(s[0] for s in stats)} max {max(s[2] for s in stats):.2f} ms", 6)
+
+
+    # queue the save slot that changed, the writer thread puts it on disk
+    def write_save(self):
+        self.load_saves()
+        Game.save_dict[Game.saveindex] = [Game.pname, Game.world.score]
+        Game.saves_version += 1
+        Game.writer.error = None
+        # the whole world goes with it, loading the slot puts the game back exactly there
+        Game.save_ticket = Game.writer.save(Game.saveindex, Game.pname, Game.world.score, take(Game.world))
+        Game.saved_frame = None
+
+
+    # the run is queued (the top on screen changes right away), the writer thread inserts it
+    # with anything an earlier flush left behind: the frame never waits for sqlite
+    # (the leaderboard is open since the first frame)
+    def record_run(self):
+        world = Game.world
+        if Game.recorded_run == Game.run:
+            return
+        Game.recorded_run = Game.run
+        Game.leaderboard.record(Game.pname or "Pilot", world.score, world.level,
+                                world.frame_count - world.start_frame_count)
+        Game.writer.write_runs()
+
+
+    def draw_stars(self):
+        if Game.starfield is None:
+            Star.draw_all()
+        else:
+            Game.starfield.draw()
+
+
+    # the screens and the HUD are cached layers (ui.py): drawn into their own image once,
+    # and again only when what they show changes (the key given to draw)
+    def setup_ui(self):
+        size = (pyxel.width, pyxel.height)
+        Game.ui = {
+            'Start': UILayer(*size, self.render_start),
+            'Playing': UILayer(*size, self.render_hud),
+            'Pause': UILayer(*size, self.render_pause),
+            'Save Slots': UILayer(*size, self.render_save_slots),
+            'Save Name': UILayer(*size, self.render_save_name),
+            'Load Menu': UILayer(*size, self.render_load_menu),
+            'End': UILayer(*size, self.render_end),
+        }
+
+
+    # "Saving..." / "Saved!" / "Save failed!" in the HUD -> (x, text, colour) or None
+    def save_status(self):
+        if Game.save_ticket:
+            return (83, "Saving...", 13)
+        if Game.saved_frame is not None and Game.world.frame_count - Game.saved_frame < 60:
+            if Game.writer.error is None:
+                return (91, "Saved!", 10)
+            return (71, "Save failed!", 8)
+        return None
+
+
+    def draw_screen(self):
+        world = Game.world
+        inputs = Game.inputs
+        ui = Game.ui
 
         # when the app first started - logo + instructions to start
-        if Game.state == 'Start':
-            # space
-            pyxel.blt(x = 25, y =15, img = 0,
-                    u = 0, v = 66, w = 67, h = 16, colkey=0)
-            
-            # adventure
-            pyxel.blt(x = 28, y =30, img = 0,
-                    u = 0, v = 86, w = 62, h = 8, colkey=0)
-            
-            # instruction 
-            pyxel.text(8, 60, "Press [Space] key to start.", 15)
-
-            # check for load
-            if len(Game.save_dict) > 0:
-                pyxel.text(17, 70, "Press [L] key to load.", 15)
+        if world.state == 'Start':
+            best = None if Game.leaderboard is None else Game.leaderboard.version
+            ui['Start'].draw(key=(len(Game.save_dict) > 0, best))
 
 
         # when the game is playing 
-        elif Game.state == 'Playing':
-            Star.draw_all()
+        elif world.state == 'Playing':
+            self.draw_stars()
             Bullet.draw_all()
             Alien.draw_all()
             Explosion.draw_all()
             Coin.draw_all()
 
             Player.draw()
-            pyxel.text(1, pyxel.height - 14, f"[M] Menu", 13)
-            pyxel.text(1, pyxel.height - 7, f"Score: {Game.score}", 12)
-
-            if pyxel.btnp(pyxel.KEY_M):
-                Game.state = 'Pause'
-            
-            if (Game.score != 0) and (Game.score % 10 == 0):
-                Game.level = int((Game.score / 10) + 1)
-
-                pyxel.blt(x = 20, y=30, img=0,
-                  u=0, v=96, w=72, h=16, colkey=0)
-                
-                pyxel.text(40, 50, f"Level {Game.level}", 14)
+            ui['Playing'].draw(key=(world.score, self.save_status(), world.leveling_up(), world.level,
+                                    Game.autopilot is not None))
 
 
         # when the game is paused - logo + instruction to save or go back
-        elif Game.state == "Pause":
-            Star.draw_all()
-
-            # space
-            pyxel.blt(x = 25,y =15, img = 0,
-                    u = 0, v = 66, w = 67, h = 16, colkey=0)
-            
-            # adventure
-            pyxel.blt(x = 28, y =30, img = 0,
-                    u = 0, v = 86, w = 62, h = 8, colkey=0)
-            
-            # instruction 
-            pyxel.text(32, 50, "[S] save game", 11)
-            pyxel.text(35, 60, "[M] go back", 11)
-
-            # resume playing
-            if pyxel.btnp(pyxel.KEY_M):
-                Game.state = "Playing"
-
-            # go to save menu
-            if pyxel.btnp(pyxel.KEY_S):
-                Game.state = "Save Menu"
+        elif world.state == "Pause":
+            self.draw_stars()
+            ui['Pause'].draw()
         
 
         ## save menu for new game (not loaded)
         # FIRST screen - select save slot
-        elif (Game.state == "Save Menu") and (Game.load_state == False) and (Game.save_state == 0):
-            pyxel.text(25, 20, "Select Save Slot", 11)
-
-            line = 30
-            order = 1
-            # go through the saved data and show it in order
-            for i, data in list(zip(Game.save_dict.keys(), Game.save_dict.values())):
-                # number [1-5]
-                pyxel.text(30, line, "[" + str(order) + "]", 7)
-                # name
-                pyxel.text(50, line, data[0], 14)
-                # score
-                pyxel.text(80, line, str(data[1]), 12)
-                # index & line space (y axis)
-                order += 1
-                line += 10
-
-            # if the data is less than 5, we just want to show the number, to indicate the player can create a new save or rewrite the old ones
-            if order <= 5:
-                pyxel.text(30, line, "[" + str(order) + "]", 7)
-                order += 1
-                line += 10
+        elif (world.state == "Save Menu") and (Game.load_state == False) and (Game.save_state == 0):
+            ui['Save Slots'].draw(key=(Game.saves_version,))
 
             # listen to the user input, to record which save slot they want to save the game
-            if pyxel.input_text:
+            if inputs.text:
                 try:
-                    if int(pyxel.input_text[0]) in [1,2,3,4,5]:
-                        Game.saveindex = int(pyxel.input_text[0])-1
+                    if int(inputs.text[0]) in [1,2,3,4,5]:
+                        Game.saveindex = int(inputs.text[0])-1
                         Game.save_state = 2
                 except ValueError:
                     pass
         
         # SECOND screen - to insert name
-        elif (Game.state == "Save Menu") and (Game.load_state == False) and (Game.save_state == 2):
-            # instructions
-            pyxel.text(35, 20, "Insert Name", 11)
-            pyxel.text(27, 60, "[Enter] to save", 11)
-
+        elif (world.state == "Save Menu") and (Game.load_state == False) and (Game.save_state == 2):
             # listen to the keyboard inputs for player's name (Game.pname)
-            if pyxel.input_text:
+            if inputs.text:
                 if len(Game.pname) <= 10:
-                    Game.pname += pyxel.input_text[0]
+                    Game.pname += inputs.text[0]
                 else:
                     pass
-            pyxel.text(35, 30, Game.pname, 9)
+            ui['Save Name'].draw(key=(Game.pname,))
 
             # ENTER key to save the name and score in the specified index/save slot
-            if pyxel.btnp(pyxel.KEY_RETURN) and Game.save_state == 2:
-                pyxel.text(45, 50, "Saved!", 10)
-
-                Game.save_dict[Game.saveindex] = [Game.pname, Game.score]
-
-                df = pd.DataFrame(Game.save_dict.values(), columns=['Name', 'Score'])
-                df.to_csv('load.csv', index=False)
+            if (inputs.pressed & RETURN) and Game.save_state == 2:
+                self.write_save()
 
                 Game.save_state = 1
             
             # continue playing after saving
             if Game.save_state == 1:
-                Game.state = "Playing"
+                world.state = "Playing"
                 Game.save_state = 0
                 Game.pname = ""
     
 
         # load screen - when player choose to load previous saved game
-        elif Game.state == "Load Menu":
-            pyxel.text(25, 20, "Select Load File", 11)
-
-            line = 30
-            order = 1
-            # go through the saved data and show it in order
-            for i, data in list(zip(Game.save_dict.keys(), Game.save_dict.values())):
-                pyxel.text(30, line, "[" + str(order) + "]", 7)
-                pyxel.text(50, line, data[0], 14)
-                pyxel.text(80, line, str(data[1]), 12)
-                order += 1
-                line += 10
+        elif world.state == "Load Menu":
+            ui['Load Menu'].draw(key=(Game.saves_version,))
             
             # it listens to key input with this
             if pyxel.btnp(pyxel.KEY_P):
                 print("P")
             
             # listen to keyboard inputs to see which save slot the player wants to load
-            if pyxel.input_text:
+            if inputs.text:
                 try:
-                    if int(pyxel.input_text[0]) in list(range(1, order)):
-                        Game.saveindex = int(pyxel.input_text[0]) -1
+                    # the number shown is the slot's, like in the save menu (slots can be empty in between)
+                    if int(inputs.text[0]) - 1 in Game.save_dict:
+                        Game.saveindex = int(inputs.text[0]) - 1
                         Game.pname = Game.save_dict[Game.saveindex][0]
-                        Game.score = Game.save_dict[Game.saveindex][1]
+                        # the world as it was saved, or a new one with the score for the old slots
+                        if not self.load_world(Game.saveindex):
+                            world.score = Game.save_dict[Game.saveindex][1]
+                            world.start_frame_count = world.frame_count
 
-                        Game.state = "Playing"
-                        Game.start_frame_count = pyxel.frame_count
+                        world.state = "Playing"
                         Game.load_state = True
+                        # a loaded slot is played as a new run
+                        Game.run += 1
                         
                 except ValueError:
                     pass
         
 
         # save menu for loaded game
-        elif (Game.state == "Save Menu") and (Game.load_state == True):
-            pyxel.text(45, 50, "Saved!", 10)
-
-            Game.save_dict[Game.saveindex] = [Game.pname, Game.score]
-
-            df = pd.DataFrame(Game.save_dict.values(), columns=['Name', 'Score'])
-            df.to_csv('load.csv', index=False)
+        elif (world.state == "Save Menu") and (Game.load_state == True):
+            self.write_save()
 
             Game.save_state = 1
             
             # continue playing
             if Game.save_state == 1:
-                Game.state = "Playing"
+                world.state = "Playing"
                 Game.save_state = False
 
         
         # game over screen
-        elif Game.state == "End":
-            Star.draw_all()
-            Explosion.append(Player.player.x, Player.player.y)
+        elif world.state == "End":
+            self.draw_stars()
             Explosion.draw_all()
-            # final score
-            pyxel.text(1, pyxel.height - 7, f"Final Score: {Game.score}", 12)
-            # game over
-            pyxel.blt(x = 28, y =25, img = 1,
-                    u = 16, v = 48, w = 79, h = 79, colkey=0)
-            
-            # to restart the game
-            pyxel.text(20, 60, "Press [M] to restart", 9)
-            if pyxel.btnp(pyxel.KEY_M):
-                Game.state = "Start"
+            ui['End'].draw(key=(world.score,))
+
+
+    ## ----- what the cached layers show ----- ##
+    def render_logo(self, image):
+        # space
+        image.blt(25, 15, 0, 0, 66, 67, 16, 0)
+        # adventure
+        image.blt(28, 30, 0, 0, 86, 62, 8, 0)
+
+
+    def render_start(self, image):
+        self.render_logo(image)
+
+        # instruction 
+        image.text(8, 60, "Press [Space] key to start.", 15)
+
+        # check for load
+        if len(Game.save_dict) > 0:
+            image.text(17, 70, "Press [L] key to load.", 15)
+
+        # best run so far (from the leaderboard's cache, once it's open)
+        best = [] if Game.leaderboard is None else Game.leaderboard.top(1)
+        if best:
+            name, score, _ = best[0]
+            image.text(1, pyxel.height - 7, f"Best: {name} {score}", 10)
+
+
+    def render_hud(self, image):
+        world = Game.world
+        if Game.autopilot is None:
+            image.text(1, pyxel.height - 14, f"[M] Menu", 13)
+        else:
+            image.text(1, pyxel.height - 14, "Autopilot [F3]", 13)
+        image.text(1, pyxel.height - 7, f"Score: {world.score}", 12)
+
+        # saving in the background
+        status = self.save_status()
+        if status is not None:
+            x, text, colour = status
+            image.text(x, pyxel.height - 7, text, colour)
+
+        if world.leveling_up():
+            image.blt(20, 30, 0, 0, 96, 72, 16, 0)
+            image.text(40, 50, f"Level {world.level}", 14)
+
+
+    def render_pause(self, image):
+        self.render_logo(image)
+
+        # instruction 
+        image.text(32, 50, "[S] save game", 11)
+        image.text(35, 60, "[M] go back", 11)
+
+
+    # number, name and score of every save slot, from y = 30 -> the line after the last one
+    # (the number is the slot's own, the one saving and loading go to, even with empty slots in between)
+    def render_slots(self, image):
+        line = 30
+        for index, data in sorted(Game.save_dict.items()):
+            # number [1-5]
+            image.text(30, line, "[" + str(index + 1) + "]", 7)
+            # name
+            image.text(50, line, data[0], 14)
+            # score
+            image.text(80, line, str(data[1]), 12)
+            # line space (y axis)
+            line += 10
+        return line
+
+
+    def render_save_slots(self, image):
+        image.text(25, 20, "Select Save Slot", 11)
+        line = self.render_slots(image)
+
+        # if the data is less than 5, we just want to show the number of the first empty slot, to indicate the player can create a new save or rewrite the old ones
+        free = [index for index in range(5) if index not in Game.save_dict]
+        if free:
+            image.text(30, line, "[" + str(free[0] + 1) + "]", 7)
+
+
+    def render_save_name(self, image):
+        # instructions
+        image.text(35, 20, "Insert Name", 11)
+        image.text(27, 60, "[Enter] to save", 11)
+        image.text(35, 30, Game.pname, 9)
+
+
+    def render_load_menu(self, image):
+        image.text(25, 20, "Select Load File", 11)
+        self.render_slots(image)
+
+
+    def render_end(self, image):
+        # final score
+        image.text(1, pyxel.height - 7, f"Final Score: {Game.world.score}", 12)
+        # game over
+        image.blt(28, 25, 1, 16, 48, 79, 79, 0)
+        
+        # to restart the game
+        image.text(20, 60, "Press [M] to restart", 9)
 
 
 if __name__ == '__main__':
-    Game()
+    parser = argparse.ArgumentParser(description="Space Adventure")
+    parser.add_argument('--arrays', action='store_true',
+                        help="keep sprites in numpy arrays (faster with a lot of sprites)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every stage of a frame from the start ([F1] toggles it in game)")
+    parser.add_argument('--star-sprites', action='store_true',
+                        help="draw the background with one sprite per star instead of the baked layers")
+    parser.add_argument('--leak-check', action='store_true',
+                        help="stop the game if a sprite pool keeps growing (debug)")
+    parser.add_argument('--rate', type=int, default=30,
+                        help="game steps per second, the speed of the game (default 30)")
+    parser.add_argument('--fps', type=int, default=30,
+                        help="frames drawn per second at most (default 30)")
+    parser.add_argument('--max-steps', type=int, default=4,
+                        help="most steps run to catch up before a frame is drawn (default 4)")
+    parser.add_argument('--record', metavar='FILE',
+                        help="record the seed and every step's keys to FILE (play it back with replay.py)")
+    parser.add_argument('--continuous', action='store_true',
+                        help="swept collisions: fast aliens can't go through bullets or the ship")
+    parser.add_argument('--gc-auto', action='store_true',
+                        help="let python collect garbage whenever it wants (by default only between frames)")
+    parser.add_argument('--alloc-report', action='store_true',
+                        help="print what every frame allocates, by function, every 300 frames (slow)")
+    parser.add_argument('--spectate', type=int, nargs='?', const=8765, metavar='PORT',
+                        help="send every frame's sprites to spectators on a local port (default 8765, see spectate.py)")
+    parser.add_argument('--spectate-checksums', action='store_true',
+                        help="add a checksum of the whole state to every spectator frame, so they can check it")
+    parser.add_argument('--rewind', type=int, default=10, metavar='SECONDS',
+                        help="how far back [BACKSPACE] can rewind, 0 -> no snapshots (default 10)")
+    parser.add_argument('--autopilot', type=float, nargs='?', const=4.0, metavar='MS',
+                        help="the ship plays itself, with MS of lookahead per frame (default 4, [F3] toggles it)")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print how long the imports, assets, setup, first frame and saves took")
+    args = parser.parse_args()
+
+    Game(vectorized=args.arrays, profile=args.profile, star_sprites=args.star_sprites,
+         leak_check=args.leak_check, rate=args.rate, fps=args.fps, max_steps=args.max_steps,
+         record=args.record, startup_report=args.startup_report,
+         continuous=args.continuous, gc_auto=args.gc_auto, alloc_report=args.alloc_report,
+         spectate=args.spectate, spectate_checksums=args.spectate_checksums, rewind=args.rewind,
+         autopilot=args.autopilot)
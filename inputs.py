@@ -0,0 +1,27 @@
+## ------------- LIBRARY -------------- ##
+from collections import namedtuple
+
+
+### ----------------------------------- ###
+### -------------- INPUTS ------------- ###
+### ----------------------------------- ###
+
+# every key the game reads is one bit, so a whole frame of input fits in an int
+UP = 1 << 0
+DOWN = 1 << 1
+LEFT = 1 << 2
+RIGHT = 1 << 3
+SPACE = 1 << 4
+KEY_M = 1 << 5
+KEY_S = 1 << 6
+KEY_L = 1 << 7
+RETURN = 1 << 8
+
+# one frame of input, handed to World.step
+# held -> keys that are down (pyxel.btn)
+# pressed -> keys that went down this frame (pyxel.btnp)
+# text -> characters typed this frame (pyxel.input_text), used by the menus
+Inputs = namedtuple('Inputs', ['held', 'pressed', 'text'], defaults=[0, 0, ""])
+
+# nothing pressed
+NO_INPUT = Inputs()
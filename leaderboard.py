@@ -0,0 +1,247 @@
+## ------------- LIBRARY -------------- ##
+import sys
+import time
+import heapq
+import sqlite3
+import argparse
+import platform
+import threading
+
+from savestore import SaveStore
+
+
+### ----------------------------------- ###
+### ------------ LEADERBOARD ---------- ###
+### ----------------------------------- ###
+
+# every run that ended, in one local SQLite file (hundreds of thousands of rows is fine):
+#   board = Leaderboard()
+#   at game over: board.record(name, score, level, frames); board.flush()
+#   board.top(10) -> [(name, score, at)]     best runs, highest first
+#   board.best(name) -> best score of a player (None if they never played)
+#   board.top_players(10) -> [(name, best, at)]
+#
+# every query reads an index, never the whole table:
+#   runs_score   (score DESC, at)  -> top runs, the oldest first when scores are equal
+#   runs_at      (at)              -> recent runs, top runs since a date
+#   players      (name)            -> one row per player with their best score, kept up to date
+#                                     on every insert, so a player's best is one lookup
+#   players_best (best DESC, at)   -> top players
+# runs are inserted in batches (one transaction, one sync for all of them)
+#
+# the save slots live in the same file, so it can be given to SaveWriter like a SaveStore:
+#   load() -> {slot: [name, score]}, save(slot, name, score, world)
+#   load_world(slot) -> the snapshot of the whole world saved with it (None for the old slots)
+# the slots of savestore.py (or load.csv) are copied in the first time
+PATH = 'leaderboard.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    cabinet TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC, at);
+CREATE INDEX IF NOT EXISTS runs_at ON runs (at);
+
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    best INTEGER NOT NULL,
+    at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_best ON players (best DESC, at);
+
+CREATE TABLE IF NOT EXISTS slots (
+    slot INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    world BLOB
+);
+'''
+# PRAGMA user_version of a file with the schema above:
+# 1 -> the old slots are copied in, 2 -> the slots have the whole world (snapshot.py)
+VERSION = 2
+
+INSERT_RUN = 'INSERT INTO runs (name, score, level, frames, cabinet, at) VALUES (?, ?, ?, ?, ?, ?)'
+# a player's row only changes when the run beats their best
+UPSERT_PLAYER = '''
+INSERT INTO players (name, best, at) VALUES (?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET best = excluded.best, at = excluded.at
+WHERE excluded.best > players.best
+'''
+
+
+class Leaderboard:
+    # how many of the best runs are kept in memory (the ones shown on screen)
+    cached = 10
+
+    def __init__(self, path=PATH, cabinet=None, legacy=None):
+        self.path = path
+        # which machine the runs were played on (several cabinets can be merged later)
+        self.cabinet = cabinet or platform.node() or 'local'
+        # the save writer thread also uses the connection
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = FULL')
+        self.setup(legacy or SaveStore())
+
+        # runs recorded but not inserted yet (flush), they stay there until the insert is committed
+        # record() only takes pending_lock, never the connection's: the frame doesn't wait for a flush
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        # one flush at a time (the writer thread and query() can both flush)
+        self.flushing = threading.Lock()
+        # min-heap of the best runs: (score, -at, name), the worst of them on top
+        # -at -> of two equal scores the newer one goes first
+        self.heap = []
+        self.load_cache()
+        # goes up every time the cached top changes (to draw it again)
+        self.version = 0
+
+    def setup(self, legacy):
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+            version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            if version < 1:
+                # the five slots of the save store (it copies load.csv first if it has to)
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO slots (slot, name, score) VALUES (?, ?, ?)',
+                    [(slot, name, int(score)) for slot, (name, score) in legacy.load().items()])
+            if version < 2:
+                # a file made before the slots kept the world
+                columns = [row[1] for row in self.connection.execute('PRAGMA table_info(slots)')]
+                if 'world' not in columns:
+                    self.connection.execute('ALTER TABLE slots ADD COLUMN world BLOB')
+            if version < VERSION:
+                self.connection.execute(f'PRAGMA user_version = {VERSION}')
+
+    def load_cache(self):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT score, at, name FROM runs ORDER BY score DESC, at LIMIT ?', (self.cached,)).fetchall()
+        self.heap = [(score, -at, name) for score, at, name in rows]
+        heapq.heapify(self.heap)
+
+    ## ----- Runs ----- ##
+    def record(self, name, score, level=1, frames=0, at=None):
+        at = time.time() if at is None else at
+        with self.pending_lock:
+            self.pending.append((name, int(score), int(level), int(frames), self.cabinet, at))
+
+        # the top on screen changes right away, even before the run is on disk
+        entry = (int(score), -at, name)
+        if len(self.heap) < self.cached:
+            heapq.heappush(self.heap, entry)
+            self.version += 1
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+            self.version += 1
+
+    def flush(self):
+        # every pending run in one transaction
+        # sqlite3.Error -> nothing was written, the runs are still pending for the next flush
+        with self.flushing:
+            with self.pending_lock:
+                runs = self.pending[:]
+            if not runs:
+                return
+            with self.lock, self.connection:
+                self.connection.executemany(INSERT_RUN, runs)
+                self.connection.executemany(UPSERT_PLAYER, [(name, score, at) for name, score, _, _, _, at in runs])
+            # (the runs recorded during the insert are after these)
+            with self.pending_lock:
+                del self.pending[:len(runs)]
+
+    def query(self, sql, parameters=()):
+        # queries see the runs still pending too
+        self.flush()
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def top(self, k=10, since=None):
+        # the best k runs -> [(name, score, at)], highest first
+        if since is None and k <= self.cached:
+            return [(name, score, -at) for score, at, name in sorted(self.heap, reverse=True)[:k]]
+        if since is None:
+            return self.query('SELECT name, score, at FROM runs ORDER BY score DESC, at LIMIT ?', (k,))
+        return self.query('SELECT name, score, at FROM runs WHERE at >= ? ORDER BY score DESC, at LIMIT ?',
+                          (since, k))
+
+    def recent(self, k=10):
+        return self.query('SELECT name, score, at FROM runs ORDER BY at DESC LIMIT ?', (k,))
+
+    def best(self, name):
+        rows = self.query('SELECT best FROM players WHERE name = ?', (name,))
+        return rows[0][0] if rows else None
+
+    def top_players(self, k=10):
+        # every player once, with their best run -> [(name, best, at)]
+        return self.query('SELECT name, best, at FROM players ORDER BY best DESC, at LIMIT ?', (k,))
+
+    def count(self):
+        return self.query('SELECT COUNT(*) FROM runs')[0][0]
+
+    ## ----- Save slots (same interface as SaveStore) ----- ##
+    def load(self):
+        # ex: {0 : [name, score], 1: [name, score]}
+        with self.lock:
+            rows = self.connection.execute('SELECT slot, name, score FROM slots ORDER BY slot').fetchall()
+        return {slot: [name, score] for slot, name, score in rows}
+
+    def load_world(self, index):
+        with self.lock:
+            row = self.connection.execute('SELECT world FROM slots WHERE slot = ?', (index,)).fetchone()
+        return None if row is None else row[0]
+
+    def save(self, index, name, score, world=None):
+        # called by the SaveWriter thread, sqlite3.Error is turned into the OSError it expects
+        try:
+            with self.lock, self.connection:
+                self.connection.execute('INSERT OR REPLACE INTO slots (slot, name, score, world) VALUES (?, ?, ?, ?)',
+                                        (index, name, int(score), world))
+        except sqlite3.Error as error:
+            raise OSError(f"could not save slot {index + 1}: {error}") from error
+
+    def write_runs(self):
+        # called by the SaveWriter thread, like save()
+        try:
+            self.flush()
+        except sqlite3.Error as error:
+            raise OSError(f"could not write {len(self.pending)} runs: {error}") from error
+
+    def close(self):
+        # the runs still queued (a flush failed) get one last try
+        try:
+            self.flush()
+        except sqlite3.Error as error:
+            print(f"leaderboard: {len(self.pending)} runs lost: {error}", file=sys.stderr)
+        with self.lock:
+            self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="show the leaderboard")
+    parser.add_argument('--path', default=PATH)
+    parser.add_argument('--top', type=int, default=10, help="best runs")
+    parser.add_argument('--players', action='store_true', help="best run of every player instead")
+    parser.add_argument('--player', help="best score of one player")
+    args = parser.parse_args()
+
+    board = Leaderboard(args.path)
+    if args.player is not None:
+        print(board.best(args.player))
+    else:
+        rows = board.top_players(args.top) if args.players else board.top(args.top)
+        for rank, (name, score, at) in enumerate(rows, 1):
+            print(f"{rank:>3}. {name:<12} {score:>6}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(at))}")
+    board.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+## ------------- LIBRARY -------------- ##
+import gc
+import os
+import time
+import tracemalloc
+from collections import Counter
+
+
+### ----------------------------------- ###
+### ---------- GC MANAGEMENT ---------- ###
+### ----------------------------------- ###
+
+# CPython's cyclic GC runs whenever enough objects were allocated, in the middle of a frame
+# if that's where the count is reached. This takes that decision over:
+#   memory = GCManager()
+#   memory.freeze()           # after the setup: what's alive now is never scanned again
+#   memory.manage()           # automatic collections off
+#   end of every frame:       memory.idle(slack_ms)   # collects only if it fits in the time left
+#   pause / game over / menu: memory.transition()     # full collection, nobody sees the hitch
+# the young generations are small, so a collection of them takes a bounded time;
+# the full one only runs in the slack when its last run was short enough, or on a transition.
+# if there's never any slack a generation is still collected once it's `safety` times over its
+# threshold (the oldest first: gen2 means a full collection), so memory can't grow forever.
+# every collection (ours or automatic) is timed: stats, report(), on_collect(generation, ms)
+class GCManager:
+    def __init__(self, safety=20, clock=time.perf_counter):
+        self.safety = safety
+        self.clock = clock
+        self.managed = False
+        # called after every collection with (generation, ms), ex: to give it to the profiler
+        self.on_collect = None
+
+        # generation -> [collections, total ms, longest ms]
+        self.stats = {generation: [0, 0.0, 0.0] for generation in range(3)}
+        # how long a collection of each generation takes (moving average), to know if it fits
+        self.cost = [0.05, 0.2, 2.0]
+        # collections done without slack because the count went too high
+        self.forced = 0
+        self.started = None
+        gc.callbacks.append(self.timed)
+
+    def timed(self, phase, info):
+        # gc.callbacks: called right before and right after every collection
+        if phase == 'start':
+            self.started = self.clock()
+            return
+        if self.started is None:
+            return
+        ms = (self.clock() - self.started) * 1000
+        self.started = None
+        generation = info['generation']
+        stats = self.stats[generation]
+        stats[0] += 1
+        stats[1] += ms
+        stats[2] = max(stats[2], ms)
+        self.cost[generation] = 0.8 * self.cost[generation] + 0.2 * ms
+        if self.on_collect is not None:
+            self.on_collect(generation, ms)
+
+    def freeze(self):
+        # modules, classes, assets, the sprite pools and their free lists: everything alive now
+        # stays alive, move it out of the generations the collections go through
+        gc.collect()
+        gc.freeze()
+
+    def manage(self):
+        gc.disable()
+        self.managed = True
+
+    def release(self):
+        gc.enable()
+        self.managed = False
+
+    def idle(self, slack_ms):
+        # end of a frame, slack_ms until the next one should start
+        if not self.managed:
+            return
+        threshold = gc.get_threshold()
+        count = gc.get_count()
+        # too long without a collection: the oldest generation that's that far over, slack or not
+        # (count[1] only goes up with gen0 collections and count[2] with gen1 ones, so the forced
+        # gen0 collections are what eventually force gen1, and those a full one)
+        for generation in (2, 1, 0):
+            if count[generation] >= threshold[generation] * self.safety and slack_ms < self.cost[generation]:
+                self.forced += 1
+                gc.collect(generation)
+                return
+
+        # the oldest generation that is due and fits in the time left
+        # (a collection of a generation also goes through the younger ones)
+        for generation in (2, 1, 0):
+            if count[generation] >= threshold[generation] and self.cost[generation] < slack_ms:
+                gc.collect(generation)
+                return
+
+    def transition(self):
+        # the game just stopped moving (pause, game over, a menu): a full collection now
+        if self.managed:
+            gc.collect()
+
+    def close(self):
+        if self.managed:
+            self.release()
+        if self.timed in gc.callbacks:
+            gc.callbacks.remove(self.timed)
+
+    def report(self):
+        # ex: "gc gen0 120 (max 0.08 ms) gen1 11 (max 0.21 ms) gen2 3 (max 1.90 ms) forced 0"
+        parts = [f"gen{generation} {count} (max {longest:.2f} ms)"
+                 for generation, (count, _, longest) in self.stats.items()]
+        return f"gc {' '.join(parts)} forced {self.forced}"
+
+
+### ----------------------------------- ###
+### -------- ALLOCATION REPORT -------- ###
+### ----------------------------------- ###
+
+# debug: what the frames allocate, with tracemalloc (slow, only with --alloc-report)
+# every `sample` frames the traces are grouped by line and compared with the last time, the new
+# blocks still alive are counted for the function that allocated them ("Alien.update_all",
+# "Game.draw_screen") and divided by the frames in between. A snapshot every frame would cost
+# more than the frame itself, the peak doesn't: every frame the highest memory use above what was
+# left at its end is kept (the short-lived objects, which the comparison can't see)
+#   allocations = AllocationReport(every=300)
+#   end of every frame: allocations.frame()   # prints the report every `every` frames
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class AllocationReport:
+    def __init__(self, every=300, top=10, sample=30):
+        self.every = every
+        self.top = top
+        self.sample = sample
+        # (filename, line) -> "Class.method" for the game's own files, built before tracing
+        # starts so the table itself isn't counted
+        self.owners = {}
+        for name in sorted(os.listdir(ROOT)):
+            if name.endswith('.py'):
+                self.index(os.path.join(ROOT, name))
+        self.frames = 0
+        self.reset()
+        tracemalloc.start()
+        self.previous = self.group()
+
+    def reset(self):
+        # owner -> new blocks / bytes since the last report
+        self.blocks = Counter()
+        self.sizes = Counter()
+        # KiB used during the frame on top of what was left at its end, per frame
+        self.transient = []
+
+    def group(self):
+        # (filename, line) -> (blocks, bytes) alive right now, the report's own ones left out
+        grouped = {}
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            frame = stat.traceback[0]
+            if frame.filename not in (tracemalloc.__file__, __file__):
+                grouped[(frame.filename, frame.lineno)] = (stat.count, stat.size)
+        return grouped
+
+    def index(self, filename):
+        # every line of the file -> the function (with its class) it's in
+        try:
+            with open(filename) as f:
+                code = compile(f.read(), filename, 'exec')
+        except (OSError, SyntaxError, ValueError):
+            return
+        stack = [code]
+        while stack:
+            code = stack.pop()
+            name = getattr(code, 'co_qualname', code.co_name)
+            # the outer code first, then what is defined inside it takes its own lines back
+            for _, _, line in code.co_lines():
+                if line is not None:
+                    self.owners[(filename, line)] = name
+            stack.extend(const for const in code.co_consts if hasattr(const, 'co_lines'))
+
+    def owner(self, filename, line):
+        return self.owners.get((filename, line)) or f"{os.path.basename(filename)}:{line}"
+
+    def frame(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.transient.append((peak - current) / 1024)
+        self.frames += 1
+
+        if self.frames % self.sample == 0:
+            grouped = self.group()
+            for key, (count, size) in grouped.items():
+                before = self.previous.get(key, (0, 0))
+                if count > before[0]:
+                    owner = self.owner(*key)
+                    self.blocks[owner] += count - before[0]
+                    self.sizes[owner] += size - before[1]
+            self.previous = grouped
+        # tracemalloc's own work above isn't part of the next frame
+        tracemalloc.reset_peak()
+
+        if self.frames % self.every == 0:
+            print(self.report())
+            self.reset()
+
+    def report(self):
+        frames = max(len(self.transient), 1)
+        lines = [f"allocations, last {len(self.transient)} frames: "
+                 f"{sum(self.transient) / frames:.1f} KiB short-lived per frame (max {max(self.transient, default=0):.1f})",
+                 f"  {'new blocks still alive':<36} {'per frame':>10} {'KiB/frame':>10}"]
+        for owner, count in self.blocks.most_common(self.top):
+            lines.append(f"  {owner:<36} {count / frames:>10.2f} {self.sizes[owner] / frames / 1024:>10.3f}")
+        return "\n".join(lines)
+
+    def close(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,176 @@
+## ------------- LIBRARY -------------- ##
+import csv
+import json
+import time
+
+
+### ----------------------------------- ###
+### ------------- PROFILER ------------ ###
+### ----------------------------------- ###
+
+# times every stage of a frame (update_all, draw_all, saving...) into a ring buffer
+# the stages are timed by swapping the real methods for timed ones in enable()
+# and putting the real ones back in disable(), so when it's off nothing is left in the way
+class Profiler:
+    def __init__(self, targets, counted, capacity=600, extra=()):
+        # targets -> [(class, method name)], each one becomes a stage "Class.method"
+        self.targets = targets
+        self.stages = [f"{owner.__name__}.{name}" for owner, name in targets]
+        # extra -> stages that aren't a method, their time is given to add() (ex: "gc")
+        self.stages += list(extra)
+        # counted -> sprite classes whose pool size is saved every frame
+        self.counted = counted
+
+        # one row per frame, the oldest row is overwritten when it's full
+        # (made the first time the profiler is turned on, numpy isn't loaded before that)
+        self.capacity = capacity
+        self.times = None
+        self.counts = None
+        # how many frames were recorded so far (row = frames % capacity)
+        self.frames = 0
+
+        self.enabled = False
+        # (owner, name) -> what was in the class __dict__ before enable()
+        self.originals = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        if self.times is None:
+            import numpy as np
+            self.times = np.zeros((self.capacity, len(self.stages)), dtype=np.float64)
+            self.counts = np.zeros((self.capacity, len(self.counted)), dtype=np.int64)
+        for column, (owner, name) in enumerate(self.targets):
+            self.originals[(owner, name)] = owner.__dict__.get(name)
+            setattr(owner, name, self._timed(owner, name, column))
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        for (owner, name), original in self.originals.items():
+            if original is None:
+                # it was inherited (like Sprite.draw_all), just remove the timed one
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.originals.clear()
+        self.enabled = False
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def _timed(self, owner, name, column):
+        times = self.times
+        clock = time.perf_counter
+
+        # classmethods -> already bound to the class, keep it that way
+        method = getattr(owner, name)
+        if getattr(method, '__self__', None) is owner:
+            def timed_classmethod(*args, **kwargs):
+                start = clock()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    times[self.frames % self.capacity, column] += (clock() - start) * 1000
+            return staticmethod(timed_classmethod)
+
+        def timed_method(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[self.frames % self.capacity, column] += (clock() - start) * 1000
+        return timed_method
+
+    def add(self, stage, ms):
+        # time spent in an extra stage during this frame
+        if self.enabled:
+            self.times[self.frames % self.capacity, self.stages.index(stage)] += ms
+
+    def next_frame(self):
+        # called once at the start of every frame, before anything is timed
+        self.frames += 1
+        row = self.frames % self.capacity
+        self.times[row] = 0
+        for i, cls in enumerate(self.counted):
+            self.counts[row, i] = len(cls.sprites)
+
+    def recorded(self):
+        # rows of the buffer that hold real frames, oldest first
+        n = min(self.frames, self.capacity)
+        rows = [(self.frames - n + 1 + i) % self.capacity for i in range(n)]
+        return self.times[rows], self.counts[rows]
+
+    def average(self, frames=30):
+        # ms per stage and sprites per class, averaged over the last frames
+        import numpy as np
+        times, counts = self.recorded()
+        if len(times) == 0:
+            return np.zeros(len(self.stages)), np.zeros(len(self.counted))
+        return times[-frames:].mean(axis=0), counts[-frames:].mean(axis=0)
+
+    def export_csv(self, path):
+        times, counts = self.recorded()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + [f"{stage} ms" for stage in self.stages] +
+                            [cls.__name__ for cls in self.counted])
+            first = self.frames - len(times) + 1
+            for i, (row, count) in enumerate(zip(times.tolist(), counts.tolist())):
+                writer.writerow([first + i] + [round(t, 4) for t in row] + count)
+
+    def export_json(self, path):
+        times, counts = self.recorded()
+        with open(path, 'w') as f:
+            json.dump({
+                'first_frame': self.frames - len(times) + 1,
+                'stages': self.stages,
+                'sprites': [cls.__name__ for cls in self.counted],
+                'times_ms': times.round(4).tolist(),
+                'counts': counts.tolist(),
+            }, f)
+
+    def export(self, path="profile"):
+        # profile.csv + profile.json
+        self.export_csv(f"{path}.csv")
+        self.export_json(f"{path}.json")
+
+
+### ----------------------------------- ###
+### ---------- STARTUP REPORT --------- ###
+### ----------------------------------- ###
+
+# how long every part of the start took, from the first line of game.py to the first frame
+# (and the work left for after it):
+#   startup = StartupReport(started)     # started = time.perf_counter() before the imports
+#   startup.mark("imports")              # time since the previous mark
+#   print(startup.report())
+class StartupReport:
+    def __init__(self, started):
+        self.started = started
+        self.last = started
+        # [(phase, ms)] in order
+        self.phases = []
+        # ms from the start to the end of the first frame
+        self.first_frame = None
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def frame_drawn(self):
+        self.mark("first frame")
+        self.first_frame = (self.last - self.started) * 1000
+
+    def report(self):
+        lines = ["startup:"]
+        for phase, ms in self.phases:
+            lines.append(f"  {phase:<24} {ms:>8.1f} ms")
+            if phase == "first frame":
+                lines.append(f"  {'= time to first frame':<24} {self.first_frame:>8.1f} ms")
+        return "\n".join(lines)
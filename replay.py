@@ -0,0 +1,229 @@
+## ------------- LIBRARY -------------- ##
+import sys
+import time
+import struct
+import argparse
+
+from world import World
+from inputs import Inputs
+
+
+### ----------------------------------- ###
+### -------------- REPLAY ------------- ###
+### ----------------------------------- ###
+
+# a whole session in a small file: the seed of the World and, for every step,
+# the keys it got. The same seed + the same keys -> the same game, so a session
+# from the field can be played again without a window, as fast as possible:
+#   python game.py --record session.rec
+#   python replay.py session.rec
+#
+# file: header, then records until END
+#   header -> MAGIC | version (1 byte) | seed (8 bytes) | width, height (2 bytes each) | flags (1 byte)
+#   RUN    -> count, keys      the same keys for count steps in a row (run-length encoding)
+#   TEXT   -> length, utf-8    characters typed on the next step (menus)
+#   SYNC   -> state, score, start frame
+#             what the front end changed between two steps (the menus, loading a save)
+#   END    -> steps, score, state    how the session ended, checked by the replay
+# numbers are varints, strings are a varint length + utf-8
+# keys = held | pressed << KEY_BITS (the bits of inputs.py)
+MAGIC = b'SARP'
+# 2 -> spawns from the scheduler (recordings made before play out differently)
+VERSION = 2
+HEADER = struct.Struct('<4sBqHHB')
+KEY_BITS = 9
+
+RUN = 1
+TEXT = 2
+SYNC = 3
+END = 4
+
+# header flags
+STARS = 1
+CONTINUOUS = 2
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_string(out, text):
+    encoded = text.encode('utf-8')
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+class Reader:
+    def __init__(self, data, position=0):
+        self.data = data
+        self.position = position
+
+    def byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def varint(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def string(self):
+        length = self.varint()
+        text = self.data[self.position:self.position + length].decode('utf-8')
+        self.position += length
+        return text
+
+
+## ----- Recording ----- ##
+# the front end calls step() right before every World.step, and close() at the end
+class Recorder:
+    def __init__(self, path, world):
+        self.path = path
+        self.world = world
+        flags = (STARS if world.stars else 0) | (CONTINUOUS if world.continuous else 0)
+        self.data = bytearray(HEADER.pack(MAGIC, VERSION, world.seed, world.width, world.height, flags))
+        # the run not written yet: keys and how many steps
+        self.keys = None
+        self.count = 0
+        self.steps = 0
+        # the world as the last step left it, to see what the front end changed since
+        self.seen = None
+        self.closed = False
+
+    def step(self, inputs):
+        world = self.world
+        now = (world.state, world.score, world.start_frame_count)
+        if self.seen is not None and now != self.seen:
+            self.flush_run()
+            self.data.append(SYNC)
+            write_string(self.data, world.state)
+            write_varint(self.data, world.score)
+            write_varint(self.data, world.start_frame_count)
+
+        if inputs.text:
+            self.flush_run()
+            self.data.append(TEXT)
+            write_string(self.data, inputs.text)
+
+        keys = inputs.held | inputs.pressed << KEY_BITS
+        if keys != self.keys:
+            self.flush_run()
+            self.keys = keys
+        self.count += 1
+        self.steps += 1
+
+    def stepped(self):
+        # called right after World.step
+        world = self.world
+        self.seen = (world.state, world.score, world.start_frame_count)
+
+    def flush_run(self):
+        if self.count:
+            self.data.append(RUN)
+            write_varint(self.data, self.count)
+            write_varint(self.data, self.keys)
+        self.count = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush_run()
+        self.data.append(END)
+        write_varint(self.data, self.steps)
+        write_varint(self.data, self.world.score)
+        write_string(self.data, self.world.state)
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        self.closed = True
+
+
+## ----- Playing back ----- ##
+class Recording:
+    def __init__(self, data):
+        magic, version, self.seed, self.width, self.height, flags = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Space Adventure recording (or an unknown version)")
+        self.stars = bool(flags & STARS)
+        self.continuous = bool(flags & CONTINUOUS)
+        self.data = data
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def events(self):
+        # ('step', Inputs) / ('sync', (state, score, start frame)) / ('end', (steps, score, state))
+        reader = Reader(self.data, HEADER.size)
+        mask = (1 << KEY_BITS) - 1
+        text = ""
+        while True:
+            kind = reader.byte()
+            if kind == RUN:
+                count = reader.varint()
+                keys = reader.varint()
+                for _ in range(count):
+                    yield 'step', Inputs(keys & mask, keys >> KEY_BITS, text)
+                    text = ""
+            elif kind == TEXT:
+                text = reader.string()
+            elif kind == SYNC:
+                yield 'sync', (reader.string(), reader.varint(), reader.varint())
+            elif kind == END:
+                yield 'end', (reader.varint(), reader.varint(), reader.string())
+                return
+            else:
+                raise ValueError(f"bad record type {kind} at byte {reader.position - 1}")
+
+    def play(self, vectorized=False):
+        # runs the whole session headless -> (world, steps, expected (steps, score, state))
+        # the events are decoded first so only World.step is timed
+        events = list(self.events())
+        world = World(width=self.width, height=self.height, seed=self.seed,
+                      vectorized=vectorized, stars=self.stars, continuous=self.continuous)
+        steps = 0
+        expected = None
+        start = time.perf_counter()
+        for kind, value in events:
+            if kind == 'step':
+                world.step(value)
+                steps += 1
+            elif kind == 'sync':
+                world.state, world.score, world.start_frame_count = value
+            else:
+                expected = value
+        elapsed = time.perf_counter() - start
+        return world, steps, elapsed, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="play a recorded session again without a window")
+    parser.add_argument('path')
+    parser.add_argument('--arrays', action='store_true', help="sprites in numpy arrays")
+    parser.add_argument('--repeat', type=int, default=1, help="play it this many times (timing)")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.path)
+    ok = True
+    for _ in range(args.repeat):
+        world, steps, elapsed, expected = recording.play(vectorized=args.arrays)
+        got = (steps, world.score, world.state)
+        fps = steps / elapsed if elapsed > 0 else float('inf')
+        print(f"{steps} steps in {elapsed:.3f} s ({fps:.0f} steps/s)  score {world.score}  state {world.state}")
+        if got != expected:
+            print(f"MISMATCH: recorded {expected}, replayed {got}")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
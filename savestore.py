@@ -0,0 +1,184 @@
+## ------------- LIBRARY -------------- ##
+import os
+import csv
+import struct
+import threading
+
+
+### ----------------------------------- ###
+### ------------ SAVE STORE ----------- ###
+### ----------------------------------- ###
+
+# one small binary file per save slot: saves/slot1.dat ... saves/slot5.dat
+# magic (2 bytes) | name length (1 byte) | name (32 bytes, utf-8) | score (8 bytes)
+RECORD = struct.Struct('<2sB32sq')
+MAGIC = b'SA'
+
+
+class SaveStore:
+    def __init__(self, path='saves', legacy='load.csv', slots=5):
+        self.path = path
+        # old pandas save file, copied into the slots the first time
+        self.legacy = legacy
+        self.slots = slots
+
+    def slot_path(self, index):
+        # index 0 -> slot1.dat (the menus show slots from 1)
+        return os.path.join(self.path, f"slot{index + 1}.dat")
+
+    def load(self):
+        # ex: {0 : [name, score], 1: [name, score]}
+        if not os.path.isdir(self.path):
+            self.migrate()
+
+        saves = {}
+        for index in range(self.slots):
+            record = self.read_slot(index)
+            if record is not None:
+                saves[index] = record
+        return saves
+
+    def read_slot(self, index):
+        try:
+            with open(self.slot_path(index), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # a slot that isn't a full record is treated as empty
+        if len(data) != RECORD.size:
+            return None
+        magic, length, name, score = RECORD.unpack(data)
+        if magic != MAGIC:
+            return None
+        return [name[:length].decode('utf-8', errors='replace'), score]
+
+    def save(self, index, name, score, world=None):
+        # the slot files only keep the name and the score, not the world (see leaderboard.py)
+        os.makedirs(self.path, exist_ok=True)
+        write_record(self.slot_path(index), name, score)
+
+    def migrate(self):
+        # Name,Score rows of load.csv -> slot 1, 2, ... (load.csv itself is left alone)
+        # the slots are written in a temporary folder that is renamed at the end,
+        # so a crash halfway just means the migration runs again next time
+        if not os.path.exists(self.legacy):
+            os.makedirs(self.path, exist_ok=True)
+            return
+        temporary = self.path + '.tmp'
+        os.makedirs(temporary, exist_ok=True)
+        with open(self.legacy, newline='') as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                if index >= self.slots:
+                    break
+                write_record(os.path.join(temporary, os.path.basename(self.slot_path(index))),
+                             row['Name'], int(row['Score']))
+        os.replace(temporary, self.path)
+
+
+# only this one file is written, to a temporary file first and then renamed over the old one
+# -> a crash in the middle leaves the old slot as it was, never half a record
+def write_record(path, name, score):
+    encoded = name.encode('utf-8')[:32]
+    data = RECORD.pack(MAGIC, len(encoded), encoded, int(score))
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+    # the rename itself is only on disk once the folder is synced too (not possible on windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        folder = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(folder)
+        finally:
+            os.close(folder)
+
+
+## ----- Background writer ----- ##
+# saves are put in a queue and written by a thread, so the frame never waits for the disk
+# saving the same slot again before it was written only keeps the newest one
+#   ticket = writer.save(index, name, score, world)     # world -> snapshot.take(), or None
+#   writer.done(ticket) -> True once it's really on disk (or failed, see writer.error)
+# the leaderboard's runs go to disk on the same thread (the store is a Leaderboard):
+#   leaderboard.record(...); writer.write_runs()   # a failed flush -> writer.run_error, the runs stay queued
+class SaveWriter:
+    def __init__(self, store):
+        self.store = store
+        # slot -> (name, score, world), waiting to be written
+        self.pending = {}
+        self.condition = threading.Condition()
+        # every save gets a number, completed = every number up to it is written
+        self.tickets = 0
+        self.completed = 0
+        # last write that failed (OSError), None if all went well
+        self.error = None
+        # the store has runs to flush (write_runs), and the last flush that failed
+        self.runs = False
+        self.run_error = None
+        self.closing = False
+
+        self.thread = threading.Thread(target=self.run, name="save writer", daemon=True)
+        self.thread.start()
+
+    def save(self, index, name, score, world=None):
+        with self.condition:
+            self.tickets += 1
+            self.pending[index] = (name, score, world)
+            self.condition.notify()
+            return self.tickets
+
+    def write_runs(self):
+        with self.condition:
+            self.runs = True
+            self.condition.notify()
+
+    def done(self, ticket):
+        return ticket <= self.completed
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.runs and not self.closing:
+                    self.condition.wait()
+                if not self.pending and not self.runs and self.closing:
+                    return
+                # every ticket handed out so far is in this batch or was replaced by one in it
+                batch = self.pending
+                self.pending = {}
+                last = self.tickets
+                runs = self.runs
+                self.runs = False
+
+            for index, (name, score, world) in batch.items():
+                try:
+                    self.store.save(index, name, score, world)
+                except OSError as error:
+                    self.error = error
+            if runs:
+                # the runs that couldn't be written stay in the store's queue, the next flush takes them too
+                try:
+                    self.store.write_runs()
+                    self.run_error = None
+                except OSError as error:
+                    self.run_error = error
+
+            with self.condition:
+                self.completed = last
+                self.condition.notify_all()
+
+    def flush(self):
+        # wait until everything saved so far is on disk
+        with self.condition:
+            last = self.tickets
+            while self.completed < last:
+                self.condition.wait()
+
+    def close(self):
+        # write what's left and stop the thread (called when the game closes)
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
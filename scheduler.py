@@ -0,0 +1,116 @@
+## ------------- LIBRARY -------------- ##
+import os
+import json
+
+
+### ----------------------------------- ###
+### ---------- SPAWN SCHEDULER -------- ###
+### ----------------------------------- ###
+
+# when aliens and coins appear, in one place instead of a modulo on a counter per class
+# spawns are events at a tick (one tick per frame played), kept in a timing wheel:
+# a ring of slots, the event for tick t goes in slot t % size, so every frame only
+# looks at its own slot, however many events are waiting
+#   spawns = SpawnScheduler()
+#   spawns.repeat('alien', every=17, first=16)
+#   every frame: for kind, count in spawns.advance(): ...
+#   on a level up: spawns.level_up(level)   # adds the waves of that level
+#
+# waves are in assets/waves.json, for every level a list of bursts:
+#   {"type": "alien", "count": 4, "every": 5, "after": 30}
+#   -> 4 aliens, one every 5 frames, starting 30 frames after the level up
+# levels above the last one listed get the waves of the last one
+# budget -> most spawns of a kind in one frame, the rest wait for the next frames
+# (a burst landing on a regular spawn never makes two aliens appear at once)
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'waves.json')
+
+
+class Waves:
+    def __init__(self, levels=None, budget=None):
+        # level -> [(kind, count, every, after)]
+        self.levels = levels or {}
+        # kind -> most spawns per frame (1 if not listed)
+        self.budget = budget or {}
+
+    @classmethod
+    def load(cls, path=PATH):
+        with open(path) as f:
+            data = json.load(f)
+        levels = {int(level): [(wave['type'], wave['count'], wave.get('every', 1), wave.get('after', 0))
+                               for wave in waves]
+                  for level, waves in data.get('levels', {}).items()}
+        return cls(levels, data.get('budget', {}))
+
+    def at(self, level):
+        if level in self.levels:
+            return self.levels[level]
+        if self.levels and level > max(self.levels):
+            return self.levels[max(self.levels)]
+        return []
+
+    def longest(self):
+        # most frames between a level up and the last spawn of its waves
+        return max((after + (count - 1) * every for waves in self.levels.values()
+                    for _, count, every, after in waves), default=0)
+
+
+class SpawnScheduler:
+    def __init__(self, kinds=('alien', 'coin'), waves=None, size=64):
+        # the kinds spawned in this order on the same frame (the order the random numbers are used in)
+        self.kinds = kinds
+        self.waves = waves or Waves()
+        # size is a power of two -> slot = tick & mask
+        self.size = size
+        self.mask = size - 1
+        assert size & self.mask == 0, "the wheel size must be a power of two"
+        # slot -> [(tick, kind, every)], every > 0 -> it happens again every that many ticks
+        self.slots = [[] for _ in range(size)]
+        self.tick = 0
+        # kind -> spawns that are due but over the budget, done on the next frames
+        self.owed = {kind: 0 for kind in kinds}
+        for kind, _, _, _ in (wave for waves in self.waves.levels.values() for wave in waves):
+            if kind not in self.owed:
+                raise ValueError(f"unknown spawn type in the waves: {kind!r}")
+
+    def at(self, tick, kind, every=0):
+        # an event further than size ticks away waits in its slot until its tick comes
+        self.slots[tick & self.mask].append((tick, kind, every))
+
+    def repeat(self, kind, every, first=0):
+        self.at(first, kind, every)
+
+    def level_up(self, level):
+        for kind, count, every, after in self.waves.at(level):
+            for i in range(count):
+                self.at(self.tick + after + i * every, kind)
+
+    def advance(self):
+        # what to spawn this frame -> [(kind, count)] in the order of kinds
+        tick = self.tick
+        index = tick & self.mask
+        slot = self.slots[index]
+        if slot:
+            waiting = []
+            again = []
+            for event in slot:
+                when, kind, every = event
+                if when != tick:
+                    waiting.append(event)
+                    continue
+                self.owed[kind] += 1
+                if every:
+                    again.append((tick + every, kind, every))
+            self.slots[index] = waiting
+            for event in again:
+                self.at(*event)
+
+        spawns = []
+        budget = self.waves.budget
+        for kind in self.kinds:
+            owed = self.owed[kind]
+            if owed:
+                count = min(owed, budget.get(kind, 1))
+                self.owed[kind] = owed - count
+                spawns.append((kind, count))
+        self.tick += 1
+        return spawns
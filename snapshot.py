@@ -0,0 +1,227 @@
+## ------------- LIBRARY -------------- ##
+import zlib
+import struct
+from array import array
+from collections import deque
+
+from sprites import POOLS, Sprite, Star, Player
+
+
+### ----------------------------------- ###
+### ------------- SNAPSHOT ------------ ###
+### ----------------------------------- ###
+
+# the whole world in one small binary blob, and back:
+#   data = take(world)        # a few KiB, microseconds
+#   restore(world, data)      # the world is exactly where it was, the game goes on the same way
+# what's in it: state, score, level, frame counters, the random generator, the spawn scheduler
+# (its wheel and what it still owes), Star's counters, the ship, and every sprite of every pool
+# (x, y, speed, frame, animation frame) with the pool's high-water mark and overflows.
+# it works with both kinds of pools (a snapshot of the object pools can go back into the arrays)
+#
+# blob: HEADER | state (1 byte length, utf-8) | RANDOM | PLAYER | SCHEDULER | owed per kind |
+#       events (tick, kind, every) | per pool: POOL, then x, y, vx (doubles), frame, animation frame
+#       (int64), one column after the other
+# the columns are in the machine's byte order, like numpy's (a save isn't meant to leave the machine)
+MAGIC = b'SASS'
+VERSION = 1
+HEADER = struct.Struct('<4sBqiqq')
+# the Mersenne Twister's 624 words + its position, and the gaussian it keeps (flag, value)
+RANDOM = struct.Struct('<625IBd')
+PLAYER = struct.Struct('<ddddqq')
+# Star.clock, Star.count, scheduler tick, how many kinds, how many events
+SCHEDULER = struct.Struct('<qqqBI')
+POOL = struct.Struct('<Iqq')
+COLUMNS = 'dddqq'
+
+
+def take(world):
+    state = world.state.encode('utf-8')
+    _, words, gauss = world.random.getstate()
+    player = Player.player
+    spawns = world.spawns
+    kinds = spawns.kinds
+    events = array('q', [value for slot in spawns.slots for tick, kind, every in slot
+                         for value in (tick, kinds.index(kind), every)])
+
+    parts = [HEADER.pack(MAGIC, VERSION, world.score, world.level, world.frame_count, world.start_frame_count),
+             bytes((len(state),)), state,
+             RANDOM.pack(*words, gauss is not None, gauss or 0.0),
+             PLAYER.pack(player.x, player.y, player.px, player.py, player.frame, player.animation_frame),
+             SCHEDULER.pack(Star.clock, Star.count, spawns.tick, len(kinds), len(events) // 3),
+             array('q', [spawns.owed[kind] for kind in kinds]).tobytes(), events.tobytes()]
+
+    for cls in POOLS:
+        sprites = cls.sprites
+        if Sprite.vectorized:
+            n = len(sprites)
+            parts.append(POOL.pack(n, cls.high_water, cls.overflows))
+            parts += [sprites.x[:n].tobytes(), sprites.y[:n].tobytes(), sprites.vx[:n].tobytes(),
+                      sprites.frame[:n].tobytes(), sprites.animation_frame[:n].tobytes()]
+            continue
+        # (the pools are compacted at the end of every step, this is just in case)
+        live = [sprite for sprite in sprites if sprite.alive]
+        # only the aliens and coins have their own speed, the others move at the class speed
+        # (what the arrays keep for them too)
+        speeds = [sprite.vx for sprite in live] if 'vx' in cls.__slots__ else [cls.speed] * len(live)
+        parts.append(POOL.pack(len(live), cls.high_water, cls.overflows))
+        parts += [array('d', [sprite.x for sprite in live]).tobytes(),
+                  array('d', [sprite.y for sprite in live]).tobytes(),
+                  array('d', speeds).tobytes(),
+                  array('q', [sprite.frame for sprite in live]).tobytes(),
+                  array('q', [sprite.animation_frame for sprite in live]).tobytes()]
+    return b''.join(parts)
+
+
+def restore(world, data):
+    magic, version, score, level, frame_count, start_frame_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a Space Adventure snapshot (or an unknown version)")
+    position = HEADER.size
+    length = data[position]
+    state = bytes(data[position + 1:position + 1 + length]).decode('utf-8')
+    position += 1 + length
+
+    *words, has_gauss, gauss = RANDOM.unpack_from(data, position)
+    position += RANDOM.size
+    x, y, px, py, frame, animation_frame = PLAYER.unpack_from(data, position)
+    position += PLAYER.size
+    clock, count, tick, kinds, events = SCHEDULER.unpack_from(data, position)
+    position += SCHEDULER.size
+    owed = array('q', data[position:position + 8 * kinds])
+    position += 8 * kinds
+    wheel = array('q', data[position:position + 24 * events])
+    position += 24 * events
+
+    pools = []
+    for cls in POOLS:
+        n, high_water, overflows = POOL.unpack_from(data, position)
+        position += POOL.size
+        columns = []
+        for typecode in COLUMNS:
+            columns.append(array(typecode, data[position:position + 8 * n]))
+            position += 8 * n
+        pools.append((high_water, overflows, columns))
+
+    # everything is read before anything changes, a bad blob leaves the world as it was
+    spawns = world.spawns
+    if position != len(data):
+        raise ValueError("truncated or damaged snapshot")
+    if kinds != len(spawns.kinds):
+        raise ValueError("the snapshot has other spawn kinds than this world")
+
+    world.state = state
+    world.score = score
+    world.level = level
+    world.frame_count = frame_count
+    world.start_frame_count = start_frame_count
+    world.random.setstate((3, tuple(words), gauss if has_gauss else None))
+
+    player = Player.player
+    # the ship only ever moves by whole pixels
+    player.x, player.y, player.px, player.py = int(x), int(y), int(px), int(py)
+    player.frame = frame
+    player.animation_frame = animation_frame
+
+    Star.clock = clock
+    Star.count = count
+    spawns.tick = tick
+    spawns.owed = dict(zip(spawns.kinds, owed))
+    # every event back in its slot, in the same order
+    spawns.slots = [[] for _ in range(spawns.size)]
+    for i in range(0, len(wheel), 3):
+        spawns.at(wheel[i], spawns.kinds[wheel[i + 1]], wheel[i + 2])
+
+    for cls, (high_water, overflows, columns) in zip(POOLS, pools):
+        cls.high_water = high_water
+        cls.overflows = overflows
+        restore_pool(cls, *columns)
+    return world
+
+
+def restore_pool(cls, xs, ys, speeds, frames, animation_frames):
+    if Sprite.vectorized:
+        cls.sprites.load(xs, ys, speeds, frames, animation_frames)
+        return
+
+    # the sprites that are there now are reused first
+    sprites = cls.sprites
+    free = cls.free
+    free.extend(sprites)
+    sprites.clear()
+    own_speed = 'vx' in cls.__slots__
+    for x, y, speed, frame, animation_frame in zip(xs, ys, speeds, frames, animation_frames):
+        # not cls(x, y): reset() can draw a random speed, the generator is already restored
+        sprite = free.pop() if free else cls.__new__(cls)
+        sprite.x = x
+        sprite.y = y
+        sprite.frame = frame
+        sprite.animation_frame = animation_frame
+        sprite.alive = True
+        if own_speed:
+            sprite.vx = speed
+        sprites.append(sprite)
+
+
+### ----------------------------------- ###
+### -------------- REWIND ------------- ###
+### ----------------------------------- ###
+
+# the last `frames` snapshots, to go back in time one step at a time:
+#   rewind = Rewind(frames=300)     # 10 seconds at 30 steps per second
+#   before every step: rewind.push(take(world))
+#   going back: data = rewind.pop() (None when there's nothing left) -> restore(world, data)
+# every key_every snapshots one is kept whole (a KEY), the ones after it are only what differs from
+# it: zlib with the KEY as its dictionary, so what didn't change (the random generator's words,
+# the speeds, most of the sprites) costs a few bytes. Snapshots go away a whole KEY and its deltas
+# at a time, the buffer always holds at least `frames` of them and at most frames + key_every.
+class Rewind:
+    def __init__(self, frames=300, key_every=30, level=1):
+        self.frames = frames
+        self.key_every = key_every
+        self.level = level
+        # [[KEY, delta, delta, ...]], oldest first
+        self.groups = deque()
+        self.count = 0
+        # bytes held (what the snapshots take here, compressed)
+        self.size = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, data):
+        groups = self.groups
+        if not groups or len(groups[-1]) >= self.key_every:
+            groups.append([data])
+            entry = data
+        else:
+            compressor = zlib.compressobj(self.level, zdict=groups[-1][0])
+            entry = compressor.compress(data) + compressor.flush()
+            groups[-1].append(entry)
+        self.count += 1
+        self.size += len(entry)
+
+        while self.count - len(groups[0]) >= self.frames:
+            group = groups.popleft()
+            self.count -= len(group)
+            self.size -= sum(len(entry) for entry in group)
+
+    def pop(self):
+        # the newest snapshot, taken off the buffer
+        if not self.groups:
+            return None
+        group = self.groups[-1]
+        entry = group.pop()
+        self.count -= 1
+        self.size -= len(entry)
+        if not group:
+            # that was the KEY itself
+            self.groups.pop()
+            return entry
+        decompressor = zlib.decompressobj(zdict=group[0])
+        return decompressor.decompress(entry) + decompressor.flush()
+
+    def clear(self):
+        self.groups.clear()
+        self.count = 0
+        self.size = 0
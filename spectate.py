@@ -0,0 +1,538 @@
+## ------------- LIBRARY -------------- ##
+import sys
+import time
+import zlib
+import socket
+import struct
+import argparse
+
+from sprites import POOLS, Player, Sprite
+from replay import write_varint, write_string, Reader
+
+
+### ----------------------------------- ###
+### ------------- SPECTATE ------------ ###
+### ----------------------------------- ###
+
+# what is on screen, sent every frame to anyone listening on a local socket
+# (second screens, a logger...) without them having to look at the pixels:
+#   python game.py --spectate            # the game publishes on port 8765
+#   python spectate.py                   # a client that rebuilds the state and prints it
+#
+# the state of a frame: frame number, world state, score, level, the ship, and every sprite of
+# every pool (Star, Bullet, Alien, Explosion, Coin) as x, y, animation frame, in pixels as drawn.
+# (the baked starfield isn't sprites, only --star-sprites sends the stars)
+#
+# every sprite also carries how far it moved and how its animation changed the frame before,
+# both ends predict the next frame with it, and a frame only sends what was mispredicted:
+#   KEY   -> the whole state, with the predictions (what a new or late subscriber starts from)
+#   DELTA -> against the frame before, per pool:
+#              the sprites gone since (their index), the new ones at the end (spawns are appended,
+#              live sprites keep their order), then for the ones that stayed: runs of "as predicted"
+#              and, for the others, what changed
+#
+# message: kind (1 byte) | flags (1 byte) | body | crc32 of the KEY body (4 bytes, if CHECKSUM)
+#   KEY body   -> version | frame | state | score | level | ship | per pool: count, sprites
+#                 sprite = x, y, animation frame, dx, d animation (the predictions)
+#   DELTA body -> frame | changed (1 byte: STATE, SCORE, LEVEL) + their new values | ship change |
+#                 per pool: gone count, index gaps | new count, x, y, animation frame |
+#                 stayed: run of predicted, change, run of predicted, change...
+#   change     -> bits (MOVED, Y, ANIMATION) + x off the prediction, y change, animation frame
+# numbers are varints (replay.py), the signed ones zigzag encoded
+# on the socket: length (4 bytes) | message
+PORT = 8765
+VERSION = 1
+LENGTH = struct.Struct('<I')
+
+# kinds
+KEY = 1
+DELTA = 2
+# flags
+CHECKSUM = 1
+# what changed in a DELTA
+STATE = 1
+SCORE = 2
+LEVEL = 4
+# what changed for a sprite
+MOVED = 1
+Y = 2
+ANIMATION = 4
+
+NAMES = tuple(cls.__name__ for cls in POOLS)
+
+
+def zigzag(value):
+    # signed -> unsigned, small either way: 0, -1, 1, -2 -> 0, 1, 2, 3
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+# a sprite here is a list [x, y, animation frame, dx, d animation]
+# dx, d animation -> what changed on its last frame, the prediction for the next one
+class State:
+    __slots__ = ('frame', 'state', 'score', 'level', 'player', 'pools')
+
+    def __init__(self):
+        self.frame = 0
+        self.state = ""
+        self.score = 0
+        self.level = 0
+        self.player = [0, 0, 0, 0, 0]
+        self.pools = [[] for _ in POOLS]
+
+    def sprites(self):
+        # what is drawn -> (player (x, y, animation frame), {pool name: [(x, y, animation frame)]})
+        return (tuple(self.player[:3]),
+                {name: [tuple(sprite[:3]) for sprite in pool] for name, pool in zip(NAMES, self.pools)})
+
+
+def write_key(out, state):
+    out.append(VERSION)
+    write_varint(out, state.frame)
+    write_string(out, state.state)
+    write_varint(out, state.score)
+    write_varint(out, state.level)
+    write_sprite(out, state.player)
+    for pool in state.pools:
+        write_varint(out, len(pool))
+        for sprite in pool:
+            write_sprite(out, sprite)
+
+
+def write_sprite(out, sprite):
+    x, y, animation_frame, dx, danimation = sprite
+    write_varint(out, zigzag(x))
+    write_varint(out, zigzag(y))
+    write_varint(out, animation_frame)
+    write_varint(out, zigzag(dx))
+    write_varint(out, zigzag(danimation))
+
+
+def read_key(reader):
+    if reader.byte() != VERSION:
+        raise ValueError("unknown spectate version")
+    state = State()
+    state.frame = reader.varint()
+    state.state = reader.string()
+    state.score = reader.varint()
+    state.level = reader.varint()
+    state.player = read_sprite(reader)
+    for pool in state.pools:
+        for _ in range(reader.varint()):
+            pool.append(read_sprite(reader))
+    return state
+
+
+def read_sprite(reader):
+    return [unzigzag(reader.varint()), unzigzag(reader.varint()), reader.varint(),
+            unzigzag(reader.varint()), unzigzag(reader.varint())]
+
+
+def write_change(out, sprite, x, y, animation_frame):
+    # writes what's off the prediction (bits first), then sprite becomes the new frame's
+    # -> False if it was as predicted (nothing written)
+    off = x - sprite[0] - sprite[3]
+    bits = ((MOVED if off else 0) | (Y if y != sprite[1] else 0) |
+            (ANIMATION if animation_frame != sprite[2] + sprite[4] else 0))
+    if bits:
+        out.append(bits)
+        if bits & MOVED:
+            write_varint(out, zigzag(off))
+        if bits & Y:
+            write_varint(out, zigzag(y - sprite[1]))
+        if bits & ANIMATION:
+            write_varint(out, animation_frame)
+    sprite[3] = x - sprite[0]
+    sprite[4] = animation_frame - sprite[2]
+    sprite[0] = x
+    sprite[1] = y
+    sprite[2] = animation_frame
+    return bits != 0
+
+
+def read_change(reader, sprite):
+    bits = reader.byte()
+    x = sprite[0] + sprite[3]
+    y = sprite[1]
+    animation_frame = sprite[2] + sprite[4]
+    if bits & MOVED:
+        x += unzigzag(reader.varint())
+    if bits & Y:
+        y += unzigzag(reader.varint())
+    if bits & ANIMATION:
+        animation_frame = reader.varint()
+    sprite[3] = x - sprite[0]
+    sprite[4] = animation_frame - sprite[2]
+    sprite[0] = x
+    sprite[1] = y
+    sprite[2] = animation_frame
+
+
+def predicted(sprite):
+    sprite[0] += sprite[3]
+    sprite[2] += sprite[4]
+
+
+## ----- Encoding (the game) ----- ##
+# the live sprites of a pool -> [(x, y, animation frame, frame)]
+# frame (frames since it spawned) is only used to tell which sprites are still the same ones
+def capture(cls):
+    sprites = cls.sprites
+    if Sprite.vectorized:
+        n = len(sprites)
+        return list(zip([int(x) for x in sprites.x[:n].tolist()], [int(y) for y in sprites.y[:n].tolist()],
+                        sprites.animation_frame[:n].tolist(), sprites.frame[:n].tolist()))
+    return [(int(sprite.x), int(sprite.y), sprite.animation_frame, sprite.frame) for sprite in sprites]
+
+
+class StateEncoder:
+    def __init__(self, checksum=False):
+        self.checksum = checksum
+        # the state as the subscribers have it after the last message
+        self.state = State()
+        # frame of every sprite of self.state (pool -> list)
+        self.frames = [[] for _ in POOLS]
+        # KEY body of self.state, made when needed
+        self.key = None
+
+    def update(self, world):
+        # the world of this frame -> DELTA message against the last update
+        state = self.state
+        out = bytearray((DELTA, CHECKSUM if self.checksum else 0))
+        write_varint(out, world.frame_count)
+        state.frame = world.frame_count
+        changed = ((STATE if world.state != state.state else 0) | (SCORE if world.score != state.score else 0) |
+                   (LEVEL if world.level != state.level else 0))
+        out.append(changed)
+        if changed & STATE:
+            state.state = world.state
+            write_string(out, state.state)
+        if changed & SCORE:
+            state.score = world.score
+            write_varint(out, state.score)
+        if changed & LEVEL:
+            state.level = world.level
+            write_varint(out, state.level)
+
+        # the ship always writes its bits, even when there's nothing
+        player = Player.player
+        if not write_change(out, state.player, int(player.x), int(player.y), player.animation_frame):
+            out.append(0)
+
+        for index, cls in enumerate(POOLS):
+            self.frames[index] = self.write_pool(out, state.pools[index], self.frames[index], capture(cls))
+
+        self.key = None
+        if self.checksum:
+            out += struct.pack('<I', zlib.crc32(self.key_body()))
+        return bytes(out)
+
+    def write_pool(self, out, sprites, frames, captured):
+        # sprites (the last frame's) becomes this frame's -> the frames of the new list
+        # the ones still there are in the same order, a sprite is taken as the same one when it's
+        # at the same height and its frame didn't go back (a wrong guess only costs bytes)
+        gone = []
+        stayed = []
+        n = len(captured)
+        j = 0
+        for i, sprite in enumerate(sprites):
+            if j < n and captured[j][1] == sprite[1] and captured[j][3] >= frames[i]:
+                stayed.append(sprite)
+                j += 1
+            else:
+                gone.append(i)
+
+        write_varint(out, len(gone))
+        last = -1
+        for i in gone:
+            write_varint(out, i - last - 1)
+            last = i
+
+        added = captured[j:]
+        write_varint(out, len(added))
+        for x, y, animation_frame, _ in added:
+            write_varint(out, zigzag(x))
+            write_varint(out, zigzag(y))
+            write_varint(out, animation_frame)
+
+        run = 0
+        for sprite, (x, y, animation_frame, _) in zip(stayed, captured):
+            mark = len(out)
+            write_varint(out, run)
+            if write_change(out, sprite, x, y, animation_frame):
+                run = 0
+            else:
+                del out[mark:]
+                run += 1
+        if run:
+            write_varint(out, run)
+
+        sprites[:] = stayed + [[x, y, animation_frame, 0, 0] for x, y, animation_frame, _ in added]
+        return [row[3] for row in captured]
+
+    def key_body(self):
+        if self.key is None:
+            self.key = bytearray()
+            write_key(self.key, self.state)
+        return self.key
+
+    def keyframe(self):
+        # KEY message of the last update (for a subscriber starting now)
+        body = self.key_body()
+        out = bytearray((KEY, CHECKSUM if self.checksum else 0))
+        out += body
+        if self.checksum:
+            out += struct.pack('<I', zlib.crc32(body))
+        return bytes(out)
+
+
+## ----- Decoding (the spectators) ----- ##
+class StateDecoder:
+    def __init__(self):
+        # None until the first KEY
+        self.state = None
+        self.keyframes = 0
+        self.checked = 0
+
+    def decode(self, message):
+        # message -> State, ValueError if it can't be rebuilt or doesn't match its checksum
+        kind, flags = message[0], message[1]
+        end = len(message) - 4 if flags & CHECKSUM else len(message)
+        reader = Reader(message[:end], 2)
+        if kind == KEY:
+            self.state = read_key(reader)
+            self.keyframes += 1
+        elif kind == DELTA:
+            if self.state is None:
+                raise ValueError("DELTA before the first KEY")
+            self.read_delta(reader)
+        else:
+            raise ValueError(f"bad message kind {kind}")
+
+        if flags & CHECKSUM:
+            body = bytearray()
+            write_key(body, self.state)
+            if zlib.crc32(body) != struct.unpack_from('<I', message, end)[0]:
+                raise ValueError(f"frame {self.state.frame}: rebuilt state differs from the game's")
+            self.checked += 1
+        return self.state
+
+    def read_delta(self, reader):
+        state = self.state
+        state.frame = reader.varint()
+        changed = reader.byte()
+        if changed & STATE:
+            state.state = reader.string()
+        if changed & SCORE:
+            state.score = reader.varint()
+        if changed & LEVEL:
+            state.level = reader.varint()
+        read_change(reader, state.player)
+
+        for sprites in state.pools:
+            gone = set()
+            last = -1
+            for _ in range(reader.varint()):
+                last += reader.varint() + 1
+                gone.add(last)
+            stayed = [sprite for i, sprite in enumerate(sprites) if i not in gone]
+            added = [[unzigzag(reader.varint()), unzigzag(reader.varint()), reader.varint(), 0, 0]
+                     for _ in range(reader.varint())]
+
+            k = 0
+            while k < len(stayed):
+                run = reader.varint()
+                for sprite in stayed[k:k + run]:
+                    predicted(sprite)
+                k += run
+                if k == len(stayed):
+                    break
+                read_change(reader, stayed[k])
+                k += 1
+            sprites[:] = stayed + added
+
+
+## ----- Publishing ----- ##
+class Subscriber:
+    __slots__ = ('connection', 'address', 'pending', 'stale', 'dropped')
+
+    def __init__(self, connection, address):
+        self.connection = connection
+        self.address = address
+        # what's left of the last message (the socket took only part of it)
+        self.pending = b''
+        # True -> missed a frame (or just came), the next one it gets is a KEY
+        self.stale = True
+        self.dropped = 0
+
+
+# the game calls publish(world) once per frame, it never waits:
+# the sockets don't block, a subscriber whose last message isn't fully sent yet just misses this
+# frame (and gets a KEY when it caught up), a small send buffer keeps a slow one from lagging far
+class Broadcaster:
+    def __init__(self, port=PORT, host='127.0.0.1', checksum=False, send_buffer=16384):
+        self.encoder = StateEncoder(checksum)
+        self.send_buffer = send_buffer
+        self.server = socket.create_server((host, port))
+        self.server.setblocking(False)
+        self.port = self.server.getsockname()[1]
+        self.subscribers = []
+
+        # frames published, bytes of every DELTA / KEY made, time spent making them
+        self.frames = 0
+        self.delta_bytes = 0
+        self.keyframes = 0
+        self.key_bytes = 0
+        self.encode_time = 0.0
+        # frames some subscriber didn't get
+        self.dropped = 0
+
+    def accept(self):
+        while True:
+            try:
+                connection, address = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            connection.setblocking(False)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+            self.subscribers.append(Subscriber(connection, address))
+
+    def publish(self, world):
+        self.accept()
+        # nobody watching -> nothing to encode (whoever comes starts from a KEY anyway)
+        if not self.subscribers:
+            return
+
+        start = time.perf_counter()
+        delta = self.encoder.update(world)
+        self.encode_time += time.perf_counter() - start
+        self.frames += 1
+        self.delta_bytes += len(delta)
+        key = None
+
+        for subscriber in list(self.subscribers):
+            if subscriber.pending:
+                self.send(subscriber, subscriber.pending)
+                if subscriber.pending:
+                    subscriber.stale = True
+                    subscriber.dropped += 1
+                    self.dropped += 1
+                    continue
+            if subscriber.stale:
+                if key is None:
+                    start = time.perf_counter()
+                    key = self.encoder.keyframe()
+                    self.encode_time += time.perf_counter() - start
+                    self.keyframes += 1
+                    self.key_bytes += len(key)
+                subscriber.stale = False
+                self.send(subscriber, LENGTH.pack(len(key)) + key)
+            else:
+                self.send(subscriber, LENGTH.pack(len(delta)) + delta)
+
+    def send(self, subscriber, data):
+        try:
+            sent = subscriber.connection.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            # gone (closed, reset)
+            self.remove(subscriber)
+            return
+        subscriber.pending = data[sent:]
+
+    def remove(self, subscriber):
+        subscriber.connection.close()
+        subscriber.pending = b''
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def close(self):
+        for subscriber in list(self.subscribers):
+            self.remove(subscriber)
+        self.server.close()
+
+    def report(self):
+        # ex: "spectate 1800 frames 96 B/frame (KEY 610 B x3) encode 41 us/frame, 1 watching, 0 dropped"
+        frames = max(self.frames, 1)
+        key = self.key_bytes / max(self.keyframes, 1)
+        return (f"spectate {self.frames} frames {self.delta_bytes / frames:.0f} B/frame "
+                f"(KEY {key:.0f} B x{self.keyframes}) encode {self.encode_time / frames * 1e6:.0f} us/frame, "
+                f"{len(self.subscribers)} watching, {self.dropped} dropped")
+
+
+## ----- Watching ----- ##
+#   for state in Spectator().states(): ...
+class Spectator:
+    def __init__(self, host='127.0.0.1', port=PORT, timeout=None, receive_buffer=None):
+        # receive_buffer -> a small one makes a slow spectator miss frames sooner (benchmarks)
+        self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if receive_buffer is not None:
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.connection.settimeout(timeout)
+        self.connection.connect((host, port))
+        self.decoder = StateDecoder()
+        self.buffer = bytearray()
+        self.received = 0
+
+    def messages(self):
+        buffer = self.buffer
+        while True:
+            while len(buffer) >= LENGTH.size:
+                length, = LENGTH.unpack_from(buffer)
+                if len(buffer) < LENGTH.size + length:
+                    break
+                message = bytes(buffer[LENGTH.size:LENGTH.size + length])
+                del buffer[:LENGTH.size + length]
+                yield message
+            data = self.connection.recv(65536)
+            if not data:
+                return
+            self.received += len(data)
+            buffer += data
+
+    def states(self):
+        for message in self.messages():
+            yield self.decoder.decode(message)
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="watch a game started with --spectate")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--frames', type=int, default=0, help="stop after this many frames (0 -> until the game closes)")
+    parser.add_argument('--every', type=int, default=30, help="print one line every this many frames")
+    args = parser.parse_args()
+
+    spectator = Spectator(args.host, args.port)
+    frames = 0
+    try:
+        for state in spectator.states():
+            frames += 1
+            if frames % args.every == 0:
+                counts = " ".join(f"{name[0]}{len(pool)}" for name, pool in zip(NAMES, state.pools))
+                print(f"frame {state.frame} {state.state} score {state.score} level {state.level} "
+                      f"ship {state.player[0]},{state.player[1]} {counts}  "
+                      f"{spectator.received / frames:.0f} B/frame")
+            if frames == args.frames:
+                break
+    except ValueError as error:
+        print(f"BAD STREAM: {error}")
+        return 1
+    finally:
+        spectator.close()
+    decoder = spectator.decoder
+    checked = f", {decoder.checked} checked against the game's checksum" if decoder.checked else ""
+    print(f"{frames} frames, {decoder.keyframes} KEY, {spectator.received} bytes{checked}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
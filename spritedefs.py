@@ -0,0 +1,48 @@
+## ------------- LIBRARY -------------- ##
+import os
+import json
+
+
+### ----------------------------------- ###
+### -------- SPRITE DEFINITIONS ------- ###
+### ----------------------------------- ###
+
+# what every sprite looks like, from assets/sprites.json:
+#   "coin": {"img": 0, "u": 48, "v": 0, "w": 8, "h": 8, "colkey": 0, "divisor": 3, "frames": 4, "speed": 1.5}
+# img, u, v -> where the first animation frame is in the image bank, the next ones are below it
+# divisor -> how many game frames each animation frame lasts, frames -> how many there are
+# loop -> false for animations played once (the sprite is gone after them)
+# speed -> how far it goes left every frame (negative -> goes right)
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'sprites.json')
+
+
+class SpriteDef:
+    def __init__(self, name, img, u, v, w, h, colkey=0, divisor=1, frames=1, loop=True, speed=0):
+        self.name = name
+        self.width = w
+        self.height = h
+        self.colkey = colkey
+        self.speed = speed
+        self.divisor = divisor
+        self.frames = frames
+        self.loop = loop
+
+        # one (img, u, v, w, h, colkey) per game frame of the animation:
+        #   pyxel.blt(x, y, *table[frame % period])
+        # instead of working out v from frame // divisor % frames on every draw
+        self.period = divisor * frames
+        self.table = tuple((img, u, v + h * (tick // divisor), w, h, colkey)
+                           for tick in range(self.period))
+
+    def __repr__(self):
+        return f"SpriteDef({self.name!r}, {self.width}x{self.height}, {self.frames} frames)"
+
+
+def load(path=PATH):
+    # name -> SpriteDef
+    with open(path) as f:
+        return {name: SpriteDef(name, **fields) for name, fields in json.load(f).items()}
+
+
+# loaded once, when the game starts
+DEFS = load()
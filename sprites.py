@@ -0,0 +1,805 @@
+## ------------- LIBRARY -------------- ##
+try:
+    import pyxel
+except ImportError:
+    # headless (world.py only) -> nothing is drawn, draw() is never called
+    pyxel = None
+# numpy (and entities.py) are only imported by the vectorized code, when it first runs:
+# the game with object pools starts without loading them
+
+from spritedefs import DEFS
+from collision import (SpatialGrid, overlaps, centers_close, near_mask, swept_overlaps, swept_centers_close,
+                       swept_overlaps_mask, swept_centers_close_mask)
+from inputs import UP, DOWN, LEFT, RIGHT, SPACE
+
+
+### ----------------------------------- ###
+### ------------- SPRITES ------------- ###
+### ----------------------------------- ###
+
+# the size, speed and animation of a class come from its definition (spritedefs.py):
+#   @defined_by('coin')
+#   class Coin(Sprite): ...
+def defined_by(name):
+    def apply(cls):
+        definition = DEFS[name]
+        cls.definition = definition
+        cls.width = definition.width
+        cls.height = definition.height
+        cls.speed = definition.speed
+        cls.period = definition.period
+        cls.loop = definition.loop
+        cls.table = definition.table
+        return cls
+    return apply
+
+
+# parent of all sprite object here
+class Sprite:
+    # no __dict__ per sprite, only these fields (every subclass declares its own __slots__ too)
+    __slots__ = ('x', 'y', 'frame', 'animation_frame', 'alive')
+
+    # the World the sprites live in (screen size, random numbers, score...), set by World.setup
+    world = None
+
+    # True -> every pool is kept in numpy arrays (EntityArrays) instead of
+    # a list of objects, so update_all moves a whole class at once
+    vectorized = False
+
+    # True -> collisions are tested along the whole move of the frame (collision.py swept tests)
+    # instead of only where the sprites end up, so fast aliens can't go through bullets or the ship
+    continuous = False
+
+    # set by @defined_by:
+    # how far the sprite goes left every frame
+    speed = 0
+    # animation_frame = frame % period -> index in table, which holds the
+    # (img, u, v, w, h, colkey) to draw for every frame of the animation
+    # loop False -> the animation is played once and the sprite is gone after it
+    period = 1
+    loop = True
+    table = ()
+
+    # budget: most sprites of this class alive at once, and what to do when one more is spawned
+    # "drop_newest" -> the new one is not spawned
+    # "drop_oldest" -> the oldest one is removed to make room
+    # "recycle" -> the oldest one is reused as the new one (no new object)
+    max_live = 256
+    overflow = "drop_oldest"
+
+    def __init__(self, x, y):
+        self.reset(x, y)
+
+    @classmethod
+    def setup(cls):
+        if Sprite.vectorized:
+            from entities import EntityArrays
+            cls.sprites = EntityArrays()
+        else:
+            # live sprites in spawn order, dead ones are taken out by compact()
+            cls.sprites = []
+        # dead sprites waiting to be reused by spawn() instead of making new ones
+        cls.free = []
+        # most sprites alive at once since setup, and how many spawns went over max_live
+        cls.high_water = 0
+        cls.overflows = 0
+
+    @classmethod
+    def new_speed(cls):
+        return cls.speed
+
+    @classmethod
+    def spawn(cls, x, y):
+        # over budget (sprites killed this frame still count until compact())
+        if len(cls.sprites) >= cls.max_live:
+            cls.overflows += 1
+            if cls.overflow == "drop_newest":
+                return
+            if cls.overflow == "recycle" and cls.recycle_oldest(x, y):
+                return
+            cls.kill_oldest()
+
+        if Sprite.vectorized:
+            cls.sprites.append(x, y, cls.new_speed())
+        elif cls.free:
+            sprite = cls.free.pop()
+            sprite.reset(x, y)
+            cls.sprites.append(sprite)
+        else:
+            cls.sprites.append(cls(x=x, y=y))
+
+    @classmethod
+    def kill_oldest(cls):
+        if Sprite.vectorized:
+            cls.sprites.kill_oldest()
+            return
+        for sprite in cls.sprites:
+            if sprite.alive:
+                sprite.alive = False
+                return
+
+    @classmethod
+    def recycle_oldest(cls, x, y):
+        # the oldest live sprite is moved to the end as the new one, False -> nothing alive to reuse
+        # (the arrays reuse their slots anyway, there it's the same as drop_oldest)
+        if Sprite.vectorized:
+            return False
+        sprites = cls.sprites
+        for i, sprite in enumerate(sprites):
+            if sprite.alive:
+                del sprites[i]
+                sprite.reset(x, y)
+                sprites.append(sprite)
+                return True
+        return False
+
+    @classmethod
+    def compact(cls):
+        # mark and compact: sprites are only marked dead (alive = False) while looping,
+        # then the live ones are moved to the front in one pass and the dead ones recycled
+        # so nothing is copied or removed from the middle of the list
+        sprites = cls.sprites
+        if Sprite.vectorized:
+            sprites.compact()
+        else:
+            free = cls.free
+            keep = 0
+            for sprite in sprites:
+                if sprite.alive:
+                    sprites[keep] = sprite
+                    keep += 1
+                else:
+                    free.append(sprite)
+            del sprites[keep:]
+
+        if len(sprites) > cls.high_water:
+            cls.high_water = len(sprites)
+
+    ## plain sprites (sprite_class) only go left at their speed and play their animation
+    def reset(self, x, y):
+        self.x = x
+        self.y = y
+        self.frame = 0
+        self.animation_frame = 0
+        self.alive = True
+
+    def update(self):
+        self.x -= self.speed
+        self.animation_frame = self.frame % self.period if self.loop else self.frame
+        self.frame += 1
+
+    def draw(self):
+        pyxel.blt(self.x, self.y, *self.table[self.animation_frame])
+
+    @classmethod
+    def update_all(cls):
+        # gone once out of the screen (either side) or at the end of a one-shot animation
+        right = cls.world.width
+        if Sprite.vectorized:
+            sprites = cls.sprites
+            sprites.advance(cls.period, cls.loop)
+            n = len(sprites)
+            alive = (sprites.x[:n] >= -cls.width) & (sprites.x[:n] <= right)
+            if not cls.loop:
+                alive &= sprites.animation_frame[:n] < cls.period
+            sprites.alive[:n] = alive
+            sprites.compact()
+            return
+
+        for sprite in cls.sprites:
+            sprite.update()
+            if sprite.x < -cls.width or sprite.x > right or sprite.animation_frame >= cls.period:
+                sprite.alive = False
+        cls.compact()
+
+    @classmethod
+    def draw_all(cls):
+        table = cls.table
+        if Sprite.vectorized:
+            sprites = cls.sprites
+            n = len(sprites)
+            for x, y, animation_frame in zip(sprites.x[:n].tolist(), sprites.y[:n].tolist(),
+                                             sprites.animation_frame[:n].tolist()):
+                pyxel.blt(x, y, *table[animation_frame])
+            return
+
+        for sprite in cls.sprites:
+            sprite.draw()
+
+
+## ----- Background Stars ------ ##
+@defined_by('star')
+class Star(Sprite):
+    __slots__ = ()
+    # frames since the start, to know when to append
+    clock = 0
+    count = 0
+    # about 22 fit on the screen, a new star just takes the place of the oldest one
+    max_live = 64
+    overflow = "recycle"
+
+    def reset(self, x, y) -> None:
+        self.x = x
+        self.y = y
+
+        self.frame = 0
+        # initializing animation frame to put the star
+        self.animation_frame = 0
+        self.alive = True
+    
+    def update(self):
+        # to make the frame move backwards (speed from assets/sprites.json)
+        self.x -= self.speed
+        # 3 shapes, 9 frames each (see the star in assets/sprites.json)
+        self.animation_frame = self.frame % Star.period
+        # move to the next frame
+        self.frame += 1
+
+    def draw(self):
+        # Copy the region of size (w, h) from (u, v) of the image bank img (0-2) to (x, y). 
+        # If negative value is set for w and/or h, it will reverse horizontally and/or vertically. 
+        # If colkey is specified, treated as transparent color.
+        pyxel.blt(self.x, self.y, *Star.table[self.animation_frame])
+    
+    @classmethod
+    def append(cls):
+        # cls is like self but for classmethod
+
+        # for even entry in our list
+        if cls.count % 2 == 0:
+            # appending (to the list) a location for stars in random range
+            # from top to half
+            cls.spawn(x=cls.world.width, y=cls.world.random.randint(0, (cls.world.height - cls.height) // 2))
+        # for odd entry
+        else:
+            # from half to bottom
+            cls.spawn(x=cls.world.width, y=cls.world.random.randint((cls.world.height - cls.height) // 2, cls.world.height - cls.height))
+        cls.count += 1
+
+    @classmethod
+    def update_all(cls):
+        # after every 3 frame we append
+        if cls.clock % 3 == 0:
+            cls.append()
+
+        if Sprite.vectorized:
+            # move every star, then drop the ones that left the screen
+            stars = cls.sprites
+            stars.advance(cls.period, cls.loop)
+            n = len(stars)
+            stars.alive[:n] = stars.x[:n] >= -cls.width
+            stars.compact()
+            cls.clock += 1
+            return
+
+        # for every star we appended, update it
+        for sprite in cls.sprites:
+            sprite.update()
+            # if it's out of the screen, we remove the star
+            if sprite.x < -cls.width:
+                sprite.alive = False
+        cls.compact()
+
+        cls.clock += 1
+
+
+## ----- Spaceship Bullet ----- ##
+@defined_by('bullet')
+class Bullet(Sprite):
+    __slots__ = ()
+    # how many bullets can appear in the screen, shooting more does nothing
+    max_live = 5
+    overflow = "drop_newest"
+
+    @classmethod
+    def setup(cls):
+        super().setup()
+        # broad phase for the aliens/bullets hits (many against many), rebuilt every frame by Alien.update_all
+        cls.grid = SpatialGrid()
+
+    def reset(self, x, y):
+        self.x = x
+        self.y = y
+        self.frame = 0
+        self.animation_frame = 0
+        self.alive = True
+    
+    def update(self):
+        # how fast the bullet goes (its speed is negative: it goes right)
+        self.x -= Bullet.speed
+        # how many animation frame
+        self.animation_frame = self.frame % Bullet.period
+        # to change the frame one at a time
+        self.frame += 1
+    
+    def draw(self):
+        pyxel.blt(self.x, self.y, *Bullet.table[self.animation_frame])
+
+    @classmethod
+    def append(cls,x, y):
+        # how many bullets can appear in the screen -> max_live
+        cls.spawn(x, y)
+    
+    @classmethod
+    def update_all(cls):
+        if Sprite.vectorized:
+            bullets = cls.sprites
+            bullets.advance(cls.period, cls.loop)
+            n = len(bullets)
+            bullets.alive[:n] = bullets.x[:n] <= cls.world.width
+            bullets.compact()
+            return
+
+        for sprite in cls.sprites:
+            sprite.update()
+            if sprite.x > cls.world.width:
+                sprite.alive = False
+        cls.compact()
+
+
+## ----- Alien inside UFO (Enemy) ----- ##
+@defined_by('alien')
+class Alien(Sprite):
+    __slots__ = ('vx',)
+    # a new alien every 17 frames (World.spawns), plus the waves of the level
+    spawn_interval = 17
+    # the ship explodes when the centers are closer than this
+    crash_radius = 10
+    # speed = speed_spread * random() + level
+    speed_spread = 1.7
+    max_live = 64
+    overflow = "drop_newest"
+
+    def reset(self, x, y):
+        self.x = x
+        self.y = y
+
+        # how fast the alien go
+        self.vx = Alien.new_speed()
+        self.frame = 0
+        self.animation_frame = 0
+        self.alive = True
+    
+    def update(self):
+        # go left
+        self.x -= self.vx
+        # change the animation of the alien
+        self.animation_frame = self.frame % Alien.period
+        self.frame += 1
+    
+    def draw(self):
+        # Copy the region of size (w, h) from (u, v) of the image bank img (0-2) to (x, y). 
+        # If negative value is set for w and/or h, it will reverse horizontally and/or vertically. 
+        # If colkey is specified, treated as transparent color.
+        pyxel.blt(int(self.x), self.y, *Alien.table[self.animation_frame])
+    
+    @classmethod
+    def new_speed(cls):
+        return cls.speed_spread * cls.world.random.random() + cls.world.level
+
+    @classmethod
+    def append(cls):
+        # append in random starting position
+        # world width -> the very last frame of the game (right)
+        cls.spawn(cls.world.width, cls.world.random.randint(0, cls.world.height - cls.height))
+
+    @classmethod
+    def update_all(cls):
+        if Sprite.vectorized:
+            cls.update_arrays()
+            return
+
+        if Sprite.continuous:
+            cls.update_swept()
+            return
+
+        # put every bullet in the grid once, each alien only looks at the bullets around it
+        bullets = Bullet.grid
+        bullets.clear()
+        for bullet in Bullet.sprites:
+            bullets.insert(bullet, bullet.x, bullet.y, Bullet.width, Bullet.height)
+        # there's only one ship: every alien is tested against it right away (no grid for one box),
+        # the crashes are handled after the hits like before
+        player = Player.player
+        crashed = []
+
+        for sprite in cls.sprites:
+            sprite.update()
+            if sprite.x < -cls.width:
+                sprite.alive = False
+                continue
+            
+            # if bullet touched the alien, remove both
+            # add explosion sprite
+            for index, bullet in bullets.query(sprite.x, sprite.y, cls.width, cls.height):
+                sprite.alive = False
+                bullet.alive = False
+                bullets.remove(index)
+                Explosion.append(sprite.x, sprite.y)
+                break
+
+            if centers_close(player.x, player.y, Player.width, Player.height,
+                             sprite.x, sprite.y, cls.width, cls.height, cls.crash_radius):
+                crashed.append(sprite)
+
+        for sprite in crashed:
+            cls.world.state = "End"
+            sprite.alive = False
+            Explosion.append(sprite.x, sprite.y)
+
+        cls.compact()
+        Bullet.compact()
+
+    @classmethod
+    def update_swept(cls):
+        # same as update_all, with the swept tests: everything went in a straight line this frame,
+        # a bullet from x + Bullet.speed, an alien from x + vx, the ship from (px, py)
+        # the bullet grid holds the box around the whole move of every bullet
+        bullets = Bullet.grid
+        bullets.clear()
+        for bullet in Bullet.sprites:
+            bullets.insert(bullet, min(bullet.x, bullet.x + Bullet.speed), bullet.y,
+                           Bullet.width + abs(Bullet.speed), Bullet.height)
+
+        # instead of a grid of the aliens (their boxes get wide at high levels), the ones whose move
+        # comes within crash reach of the ship's last move are kept aside for the crash test
+        player = Player.player
+        reach = cls.crash_radius + cls.width
+        left = min(player.x, player.px) - reach
+        right = max(player.x, player.px) + Player.width + reach
+        top = min(player.y, player.py) - reach
+        bottom = max(player.y, player.py) + Player.height + reach
+        near = []
+
+        for sprite in cls.sprites:
+            sprite.update()
+            x0 = sprite.x + sprite.vx
+            if x0 < -cls.width:
+                sprite.alive = False
+                continue
+            # gone after this frame, but it can still hit something on its way out
+            if sprite.x < -cls.width:
+                sprite.alive = False
+            moved = min(sprite.x, x0)
+            width = cls.width + abs(sprite.vx)
+            if moved < right and left < moved + width and sprite.y < bottom and top < sprite.y + cls.height:
+                near.append(sprite)
+
+            for index, bullet in bullets.query(moved, sprite.y, width, cls.height):
+                if not swept_overlaps(x0, sprite.y, sprite.x, sprite.y, cls.width, cls.height,
+                                      bullet.x + Bullet.speed, bullet.y, bullet.x, bullet.y,
+                                      Bullet.width, Bullet.height):
+                    continue
+                sprite.alive = False
+                bullet.alive = False
+                bullets.remove(index)
+                Explosion.append(sprite.x, sprite.y)
+                break
+
+        for sprite in near:
+            if swept_centers_close(player.px, player.py, player.x, player.y, Player.width, Player.height,
+                                   sprite.x + sprite.vx, sprite.y, sprite.x, sprite.y,
+                                   cls.width, cls.height, cls.crash_radius):
+                cls.world.state = "End"
+                sprite.alive = False
+                Explosion.append(sprite.x, sprite.y)
+
+        cls.compact()
+        Bullet.compact()
+
+    @classmethod
+    def update_arrays(cls):
+        import numpy as np
+        aliens = cls.sprites
+        bullets = Bullet.sprites
+        aliens.advance(cls.period, cls.loop)
+        n = len(aliens)
+        m = len(bullets)
+        ax = aliens.x[:n]
+        ay = aliens.y[:n]
+
+        # aliens that left the screen are removed without any other check
+        inside = ax >= -cls.width
+        aliens.alive[:n] = inside
+
+        bx = bullets.x[:m]
+        by = bullets.y[:m]
+        player = Player.player
+        if Sprite.continuous:
+            # every alien against every bullet (5 at most), along the whole move of the frame
+            # (the grid cells of near_mask can be smaller than the box of a fast alien's move)
+            # an alien that left the screen during this frame can still hit something on its way out
+            ax0 = ax + aliens.vx[:n]
+            moved = ax0 >= -cls.width
+            rows = np.flatnonzero(moved)
+            rx = ax[rows][:, None]
+            ry = ay[rows][:, None]
+            hits = swept_overlaps_mask(ax0[rows][:, None], ry, rx, ry, cls.width, cls.height,
+                                       bx + bullets.vx[:m], by, bx, by, Bullet.width, Bullet.height)
+            crashed = swept_centers_close_mask(player.px, player.py, player.x, player.y,
+                                               Player.width, Player.height,
+                                               ax0, ay, ax, ay, cls.width, cls.height,
+                                               cls.crash_radius) & moved
+        else:
+            # broad phase: only the aliens sharing a grid cell with a bullet
+            rows = np.flatnonzero(inside & near_mask(ax, ay, cls.width, cls.height,
+                                                     bx, by, Bullet.width, Bullet.height,
+                                                     Bullet.grid.cell_size))
+            # every pair of those aliens and the bullets that overlaps (rows x m)
+            rx = ax[rows][:, None]
+            ry = ay[rows][:, None]
+            hits = ((rx < bx + Bullet.width) & (bx < rx + cls.width) &
+                    (ry < by + Bullet.height) & (by < ry + cls.height))
+
+            player_center_x = player.x + Player.width // 2
+            player_center_y = player.y + Player.height // 2
+            crashed = ((player_center_x - (ax + cls.width // 2))**2 +
+                       (player_center_y - (ay + cls.height // 2))**2 < cls.crash_radius**2) & inside
+        # alien index -> its row in hits
+        hit_rows = {int(rows[k]): k for k in np.flatnonzero(hits.any(axis=1)).tolist()}
+
+        # only the few aliens that hit something go through python, in spawn order
+        for i in sorted(set(hit_rows) | set(np.flatnonzero(crashed).tolist())):
+            x = float(ax[i])
+            y = float(ay[i])
+            # a bullet can only destroy one alien, the first one in order
+            free = hits[hit_rows[i]] & bullets.alive[:m] if i in hit_rows else None
+            if free is not None and free.any():
+                aliens.kill(i)
+                bullets.kill(int(free.argmax()))
+                Explosion.append(x, y)
+            if crashed[i]:
+                cls.world.state = "End"
+                aliens.kill(i)
+                Explosion.append(x, y)
+
+        aliens.compact()
+        bullets.compact()
+
+
+## ----- Exploding Alien / Player ----- ##
+@defined_by('explosion')
+class Explosion(Sprite):
+    __slots__ = ()
+    count = 0
+    # one is added every frame on the game over screen, each one lasts 6 frames
+    max_live = 32
+    overflow = "drop_oldest"
+
+    def reset(self, x, y):
+        self.x = x
+        self.y = y
+        self.frame = 0
+        self.animation_frame = 0
+        self.alive = True
+
+    def update(self):
+        # played once (3 shapes, 2 frames each)
+        self.animation_frame = self.frame
+        self.frame += 1
+
+    def draw(self):
+        pyxel.blt(self.x, self.y, *Explosion.table[self.animation_frame])
+
+    @classmethod
+    def append(cls, x, y):
+        cls.spawn(x=x, y=y)
+
+    @classmethod
+    def update_all(cls):
+        if Sprite.vectorized:
+            explosions = cls.sprites
+            explosions.advance(cls.period, cls.loop)
+            n = len(explosions)
+            # the explosion is over after its 3 animation frames
+            explosions.alive[:n] = explosions.animation_frame[:n] < cls.period
+            explosions.compact()
+            return
+
+        for sprite in cls.sprites:
+            sprite.update()
+            if sprite.animation_frame >= cls.period:
+                sprite.alive = False
+        cls.compact()
+
+
+## ------ Moneyyyy (Score) ----- ##
+@defined_by('coin')
+class Coin(Sprite):
+    __slots__ = ('vx',)
+    # 40 -> not too much coins
+    spawn_interval = 40
+    max_live = 32
+    overflow = "drop_newest"
+
+    def reset(self, x, y):
+        self.x = x
+        self.y = y
+        self.vx = Coin.speed
+        self.frame = 0
+        self.animation_frame = 0
+        self.alive = True
+
+    def update(self):
+        # go left
+        self.x -= self.vx
+        # change coin animation (4 frames)
+        self.animation_frame = self.frame % Coin.period
+        self.frame += 1
+
+    def draw(self):
+        pyxel.blt(int(self.x), self.y, *Coin.table[self.animation_frame])
+
+    @classmethod
+    def append(cls):
+        cls.spawn(cls.world.width, cls.world.random.randint(0, cls.world.height - cls.height))
+
+    @classmethod
+    def update_all(cls):
+        if Sprite.vectorized:
+            cls.update_arrays()
+            return
+
+        # every coin is tested against the ship right away (one box, no grid)
+        continuous = Sprite.continuous
+        player = Player.player
+        if continuous:
+            # the box around the ship's last move (from px, py)
+            px, py = min(player.x, player.px), min(player.y, player.py)
+            pw, ph = Player.width + abs(player.x - player.px), Player.height + abs(player.y - player.py)
+        else:
+            px, py, pw, ph = player.x, player.y, Player.width, Player.height
+        for sprite in cls.sprites:
+            sprite.update()
+            if sprite.x < -cls.width:
+                sprite.alive = False
+                continue
+            if continuous:
+                # the box around its whole move (from x + vx) first, then the swept test
+                if not overlaps(px, py, pw, ph, min(sprite.x, sprite.x + sprite.vx), sprite.y,
+                                cls.width + abs(sprite.vx), cls.height):
+                    continue
+                if not swept_overlaps(player.px, player.py, player.x, player.y, Player.width, Player.height,
+                                      sprite.x + sprite.vx, sprite.y, sprite.x, sprite.y, cls.width, cls.height):
+                    continue
+            elif not overlaps(px, py, pw, ph, sprite.x, sprite.y, cls.width, cls.height):
+                continue
+            if cls.world.state == "Playing":
+                cls.world.score += 1
+            sprite.alive = False
+        cls.compact()
+
+    @classmethod
+    def update_arrays(cls):
+        coins = cls.sprites
+        coins.advance(cls.period, cls.loop)
+        n = len(coins)
+        cx = coins.x[:n]
+        cy = coins.y[:n]
+        player = Player.player
+
+        inside = cx >= -cls.width
+        if Sprite.continuous:
+            collected = inside & swept_overlaps_mask(player.px, player.py, player.x, player.y,
+                                                     Player.width, Player.height,
+                                                     cx + coins.vx[:n], cy, cx, cy, cls.width, cls.height)
+        else:
+            collected = (inside & (cx < player.x + Player.width) & (player.x < cx + cls.width) &
+                         (cy < player.y + Player.height) & (player.y < cy + cls.height))
+        if cls.world.state == "Playing":
+            cls.world.score += int(collected.sum())
+        coins.alive[:n] = inside & ~collected
+        coins.compact()
+
+
+
+### ----------------------------------- ###
+### ------------- PLAYER -------------- ###
+### ----------------------------------- ###
+
+@defined_by('player')
+class Player:
+    __slots__ = ('x', 'y', 'px', 'py', 'frame', 'animation_frame')
+    world = None
+
+    def __init__(self, x, y) -> None:
+        self.x = x
+        self.y = y
+        # where it was before its last move (the swept collisions, Sprite.continuous)
+        self.px = x
+        self.py = y
+        self.frame = 0
+        self.animation_frame = 0
+    
+    @classmethod # bound to the class rather than its object
+    def update(cls, inputs):
+        cls.player.animation_frame = cls.player.frame % cls.period
+        cls.player.frame += 1
+        cls.player.px = cls.player.x
+        cls.player.py = cls.player.y
+
+        # min and max so it does not go past the screen 
+        if inputs.held & UP:
+            cls.player.y = max(cls.player.y -2, 0)
+        
+        if inputs.held & DOWN:
+            cls.player.y = min(cls.player.y + 2, cls.world.height - cls.height)
+        
+        if inputs.held & LEFT:
+            cls.player.x = max(cls.player.x -2, 2)
+        
+        if inputs.held & RIGHT:
+            cls.player.x = min(cls.player.x + 2, cls.world.width //2)
+        
+        # pressed -> button pressed -> not continuous
+        if inputs.pressed & SPACE:
+            # from where do the bullet appears (x,y)
+            # cls.width - 8 -> so it comes from behind the body of the spaceship
+            # cls.height //2 -> too low | -8 -> too high | //2 -> perfectly middle
+            Bullet.append(cls.player.x + cls.width - 8, 
+                            cls.player.y + cls.height // 2 -8 //2)
+            
+
+    @classmethod
+    def draw(cls):
+        pyxel.blt(cls.player.x, cls.player.y, *cls.table[cls.player.animation_frame])
+     
+    @classmethod
+    def setup(cls, x, y):
+        cls.player = cls(x,y)
+
+
+# a sprite type that only needs its definition, no class of its own:
+#   Comet = sprite_class('comet')   # "comet" in assets/sprites.json
+#   Comet.setup(); Comet.spawn(x, y); Comet.update_all(); Comet.draw_all()
+def sprite_class(name, base=Sprite):
+    return defined_by(name)(type(name.title(), (base,), {'__slots__': ()}))
+
+
+### ----------------------------------- ###
+### ------------ POOL BUDGETS --------- ###
+### ----------------------------------- ###
+
+# every sprite class with a pool
+POOLS = (Star, Bullet, Alien, Explosion, Coin)
+
+
+# live count, high-water mark and budget of every pool
+def pool_stats():
+    return {cls.__name__: {'live': len(cls.sprites), 'high_water': cls.high_water,
+                           'max_live': cls.max_live, 'overflows': cls.overflows}
+            for cls in POOLS}
+
+
+# debug check: fails when a pool keeps growing
+# the smallest live count of every window of frames is kept, if it went up
+# windows times in a row the pool is leaking (a burst of sprites doesn't count)
+class LeakCheck:
+    def __init__(self, pools=POOLS, window=600, windows=5):
+        self.pools = pools
+        self.window = window
+        self.windows = windows
+        self.frame = 0
+        # class -> smallest count in the current window, and of the windows before
+        self.lowest = {cls: None for cls in pools}
+        self.history = {cls: [] for cls in pools}
+
+    def check(self):
+        for cls in self.pools:
+            count = len(cls.sprites)
+            lowest = self.lowest[cls]
+            if lowest is None or count < lowest:
+                self.lowest[cls] = count
+
+        self.frame += 1
+        if self.frame % self.window:
+            return
+
+        for cls in self.pools:
+            history = self.history[cls]
+            history.append(self.lowest[cls])
+            self.lowest[cls] = None
+            del history[:-(self.windows + 1)]
+            if len(history) > self.windows and all(a < b for a, b in zip(history, history[1:])):
+                raise AssertionError(f"{cls.__name__} pool keeps growing: {history} "
+                                     f"(lowest count of each {self.window} frames)")
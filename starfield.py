@@ -0,0 +1,74 @@
+## ------------- LIBRARY -------------- ##
+import pyxel
+import random
+
+from spritedefs import DEFS
+
+
+### ----------------------------------- ###
+### ------------ STARFIELD ------------ ###
+### ----------------------------------- ###
+
+# the background stars, baked once into images instead of one Star sprite per star
+# every layer is a strip (as wide as the screen or wider) with its 3 twinkle frames
+# stacked on top of each other, it scrolls left and wraps around:
+# 2 blits per layer per frame, however many stars there are
+class Starfield:
+    # (how far the layer goes left every frame, space between two stars)
+    # 2 px / 6 px -> same as the Star sprites (one every 3 frames going 2 px per frame)
+    LAYERS = ((2, 6), (1, 10))
+
+    # the star sprite (spritedefs.py): 3 shapes, each one lasting star.divisor frames
+    star = DEFS['star']
+
+    def __init__(self, width, height, layers=LAYERS, strip_width=None, seed=None):
+        self.width = width
+        self.height = height
+        # a wider strip -> the pattern repeats less often
+        self.strip_width = strip_width or width * 2
+        self.random = random.Random(seed)
+        self.frame = 0
+
+        # [(speed, image)] from the farthest layer to the closest one
+        self.layers = [(speed, self.bake(spacing)) for speed, spacing in sorted(layers)]
+
+    def bake(self, spacing):
+        strip = self.strip_width
+        image = pyxel.Image(strip, self.height * self.star.frames)
+        # colkey everywhere -> only the stars show up when the strip is drawn
+        image.cls(self.star.colkey)
+
+        # like Star.append: one star every spacing px, top half and bottom half in turn
+        star = self.star
+        size = star.height
+        stars = []
+        for count, x in enumerate(range(0, strip, spacing)):
+            if count % 2 == 0:
+                y = self.random.randint(0, (self.height - size) // 2)
+            else:
+                y = self.random.randint((self.height - size) // 2, self.height - size)
+            # each star starts on its own shape, so they don't all twinkle the same
+            stars.append((x, y, self.random.randrange(star.frames)))
+
+        for twinkle in range(star.frames):
+            top = self.height * twinkle
+            for x, y, phase in stars:
+                shape = (phase + twinkle) % star.frames
+                # a star on the right edge is also drawn on the left edge, so the strip wraps
+                for wrapped in (x, x - strip):
+                    image.blt(wrapped, top + y, *star.table[shape * star.divisor])
+        return image
+
+    def update(self):
+        self.frame += 1
+
+    def draw(self):
+        strip = self.strip_width
+        twinkle = self.frame // self.star.divisor % self.star.frames
+        v = self.height * twinkle
+        colkey = self.star.colkey
+        for speed, image in self.layers:
+            offset = self.frame * speed % strip
+            # the strip, then its beginning again right after it
+            pyxel.blt(-offset, 0, image, 0, v, strip, self.height, colkey)
+            pyxel.blt(strip - offset, 0, image, 0, v, strip, self.height, colkey)
@@ -0,0 +1,190 @@
+## ------------- LIBRARY -------------- ##
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from batch import BatchWorld
+from world import World
+from scheduler import Waves, PATH as WAVES
+from sprites import Alien, Coin
+from inputs import UP, DOWN, SPACE
+
+
+### ----------------------------------- ###
+### -------------- SWEEP -------------- ###
+### ----------------------------------- ###
+
+# plays a lot of games for every combination of the tuning knobs, without a window,
+# to see how they change the difficulty (how long games last, scores, levels reached)
+#   python sweep.py --alien-interval 13 17 21 --coin-interval 30 40 --games 100000
+#
+# the games of one combination are cut into chunks, every chunk is one BatchWorld run
+# by a worker process, and its totals are written to the output (one json line per chunk)
+# as soon as it's done. Only fixed-size histograms are kept, however many games are played.
+
+# tuning knob -> (class, attribute)
+KNOBS = {
+    'alien_interval': (Alien, 'spawn_interval'),
+    'alien_spread': (Alien, 'speed_spread'),
+    'coin_interval': (Coin, 'spawn_interval'),
+    'level_points': (World, 'level_points'),
+}
+
+# histogram sizes, the last bin also holds everything above it
+SCORE_BINS = 256
+LEVEL_BINS = 64
+
+
+## ----- Policies ----- ##
+# observations (n, size) from BatchWorld -> actions (n,) key bits
+def random_policy(observations, rng):
+    return rng.choice(np.array([0, UP, DOWN, SPACE, UP | SPACE, DOWN | SPACE]), len(observations))
+
+
+def scripted_policy(observations, rng):
+    # always shoots, moves away from the oldest alien when it's ahead at about the same height,
+    # goes to the oldest coin otherwise
+    # (columns: ship x, y, level, then dx, dy, speed, alive for 4 aliens, then dx, dy, alive for 2 coins)
+    dx = observations[:, 3]
+    dy = observations[:, 4]
+    danger = (observations[:, 6] > 0) & (dx > -0.1) & (dx < 0.6) & (np.abs(dy) < 0.25)
+    dodge = np.where(dy > 0, UP, DOWN)
+    coin = observations[:, 20]
+    chase = np.where(observations[:, 21] > 0, np.where(coin < 0, UP, np.where(coin > 0, DOWN, 0)), 0)
+    return np.where(danger, dodge, chase) | SPACE
+
+
+POLICIES = {'random': random_policy, 'scripted': scripted_policy}
+
+
+## ----- Worker ----- ##
+def run_chunk(task):
+    # one chunk of games with one combination -> its totals
+    index, params, games, max_frames, policy, waves, seed = task
+    for name, value in params.items():
+        owner, attribute = KNOBS[name]
+        setattr(owner, attribute, value)
+
+    rng = np.random.default_rng(seed)
+    batch = BatchWorld(games, seed=rng.integers(1 << 62), waves=Waves.load(waves))
+    choose = POLICIES[policy]
+    observations = batch.observe()
+    for _ in range(max_frames):
+        _, done, observations = batch.step(choose(observations, rng))
+        if done.all():
+            break
+
+    frames = batch.frames
+    return {
+        'combination': index,
+        'params': params,
+        'games': games,
+        'crashed': int(batch.done.sum()),
+        'frames_sum': int(frames.sum()),
+        'frames_hist': np.bincount(frames * 100 // (max_frames + 1), minlength=101)[:101].tolist(),
+        'score_hist': np.bincount(np.minimum(batch.score, SCORE_BINS - 1), minlength=SCORE_BINS).tolist(),
+        'level_hist': np.bincount(np.minimum(batch.level, LEVEL_BINS - 1), minlength=LEVEL_BINS).tolist(),
+    }
+
+
+## ----- Totals ----- ##
+class Totals:
+    # everything about one combination, added up chunk by chunk
+    def __init__(self, params):
+        self.params = params
+        self.games = 0
+        self.crashed = 0
+        self.frames_sum = 0
+        self.frames_hist = np.zeros(101, dtype=np.int64)
+        self.score_hist = np.zeros(SCORE_BINS, dtype=np.int64)
+        self.level_hist = np.zeros(LEVEL_BINS, dtype=np.int64)
+
+    def add(self, result):
+        self.games += result['games']
+        self.crashed += result['crashed']
+        self.frames_sum += result['frames_sum']
+        self.frames_hist += result['frames_hist']
+        self.score_hist += result['score_hist']
+        self.level_hist += result['level_hist']
+
+    def summary(self, max_frames):
+        def percentile(hist, p):
+            return int(np.searchsorted(np.cumsum(hist), p / 100 * hist.sum()))
+        return {
+            'params': self.params,
+            'games': self.games,
+            'crashed': self.crashed,
+            'mean_frames': self.frames_sum / max(self.games, 1),
+            # frames are in 1% bins of max_frames
+            'p50_frames': percentile(self.frames_hist, 50) * (max_frames + 1) // 100,
+            'mean_score': float(np.arange(SCORE_BINS) @ self.score_hist) / max(self.games, 1),
+            'p50_score': percentile(self.score_hist, 50),
+            'p90_score': percentile(self.score_hist, 90),
+            'mean_level': float(np.arange(LEVEL_BINS) @ self.level_hist) / max(self.games, 1),
+            'max_level': int(np.flatnonzero(self.level_hist)[-1]) if self.level_hist.any() else 0,
+        }
+
+
+def tasks(combinations, games, chunk, max_frames, policy, waves, seed):
+    for index, params in enumerate(combinations):
+        for number, start in enumerate(range(0, games, chunk)):
+            # every chunk gets its own random numbers, the same ones from run to run
+            chunk_seed = np.random.SeedSequence([seed, index, number]).generate_state(1)[0]
+            yield index, params, min(chunk, games - start), max_frames, policy, waves, int(chunk_seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="difficulty / balance sweep over the tuning knobs")
+    parser.add_argument('--alien-interval', type=int, nargs='+', default=[Alien.spawn_interval],
+                        help="frames between two aliens (not counting the waves)")
+    parser.add_argument('--alien-spread', type=float, nargs='+', default=[Alien.speed_spread],
+                        help="alien speed = spread * random() + level")
+    parser.add_argument('--coin-interval', type=int, nargs='+', default=[Coin.spawn_interval],
+                        help="frames between two coins")
+    parser.add_argument('--level-points', type=int, nargs='+', default=[World.level_points],
+                        help="points per level")
+    parser.add_argument('--waves', default=WAVES,
+                        help="wave file (default assets/waves.json)")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='scripted')
+    parser.add_argument('--games', type=int, default=10000, help="games per combination")
+    parser.add_argument('--chunk', type=int, default=1000, help="games per task (one BatchWorld)")
+    parser.add_argument('--max-frames', type=int, default=5400, help="a game still going after this stops")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: every core)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='sweep.jsonl', help="chunk totals, then one summary per combination")
+    args = parser.parse_args()
+
+    names = ('alien_interval', 'alien_spread', 'coin_interval', 'level_points')
+    combinations = [dict(zip(names, values)) for values in itertools.product(
+        args.alien_interval, args.alien_spread, args.coin_interval, args.level_points)]
+    totals = [Totals(params) for params in combinations]
+
+    start = time.perf_counter()
+    frames = 0
+    with open(args.out, 'w') as out, multiprocessing.Pool(args.workers) as pool:
+        work = tasks(combinations, args.games, args.chunk, args.max_frames, args.policy, args.waves,
+                     args.seed)
+        for result in pool.imap_unordered(run_chunk, work):
+            totals[result['combination']].add(result)
+            frames += result['frames_sum']
+            out.write(json.dumps({'chunk': result}) + "\n")
+            out.flush()
+
+        for total in totals:
+            summary = total.summary(args.max_frames)
+            out.write(json.dumps({'summary': summary}) + "\n")
+            print(json.dumps(summary))
+
+    elapsed = time.perf_counter() - start
+    games = args.games * len(combinations)
+    print(f"{games} games, {frames} frames in {elapsed:.1f} s "
+          f"({games / elapsed:,.0f} games/s, {frames / elapsed:,.0f} frames/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
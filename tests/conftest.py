@@ -0,0 +1,7 @@
+## ------------- LIBRARY -------------- ##
+import os
+import sys
+
+# the game's modules are flat files at the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
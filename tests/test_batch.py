@@ -0,0 +1,78 @@
+## ------------- LIBRARY -------------- ##
+import numpy as np
+
+from batch import BatchWorld
+from world import World
+from sprites import Bullet, Alien, Coin, Player
+from inputs import Inputs, UP, DOWN, LEFT, RIGHT, SPACE
+
+
+# BatchWorld plays exactly like World: a few games are run in both with the same random numbers
+# and the same keys and compared after every step (benchmarks/batch.py times it)
+ACTIONS = np.array([0, UP, DOWN, LEFT, RIGHT, SPACE, UP | SPACE, DOWN | SPACE])
+
+
+# stands in for World.random, handing out the numbers the batch used for one game
+# (alien y, alien speed, coin y), the alien and the coin ask for a different range
+class SameRandom:
+    def __init__(self, height):
+        self.height = height
+        self.row = None
+
+    def randint(self, a, b):
+        u = self.row[0] if b == self.height - Alien.height else self.row[2]
+        return a + int(u * (b - a + 1))
+
+    def random(self):
+        return self.row[1]
+
+
+def state(world):
+    # what is compared between the two: score, done, ship and every sprite
+    def boxes(cls):
+        return sorted((float(s.x), float(s.y)) for s in cls.sprites)
+    return (world.score, world.state == "End", Player.player.x, Player.player.y,
+            boxes(Alien), boxes(Coin), boxes(Bullet))
+
+
+def batch_state(games, i):
+    def boxes(x, y, alive):
+        return sorted((float(a), float(b)) for a, b in zip(x[i][alive[i]], y[i][alive[i]]))
+    return (int(games.score[i]), bool(games.done[i]), int(games.player_x[i]), int(games.player_y[i]),
+            boxes(games.alien_x, games.alien_y, games.alien_alive),
+            boxes(games.coin_x, games.coin_y, games.coin_alive),
+            boxes(games.bullet_x, games.bullet_y, games.bullet_alive))
+
+
+def test_batch_plays_exactly_like_world(games=12, steps=1500, seed=1):
+    rng = np.random.default_rng(seed)
+    draws = []
+
+    def uniform(shape):
+        draws.append(rng.random(shape))
+        return draws[-1]
+
+    batch = BatchWorld(games, seed=seed, uniform=uniform)
+    # random keys, biased towards shooting and moving so games last a while and use every rule
+    actions = ACTIONS[rng.integers(0, len(ACTIONS), (steps, games))]
+    expected = []
+    for t in range(steps):
+        batch.step(actions[t])
+        expected.append([batch_state(batch, i) for i in range(games)])
+
+    for i in range(games):
+        world = World(width=batch.width, height=batch.height, stars=False)
+        world.random = SameRandom(batch.height)
+        world.state = "Playing"
+        for t in range(steps):
+            if world.state == "End":
+                break
+            world.random.row = draws[t][:, i]
+            action = int(actions[t, i])
+            world.step(Inputs(held=action, pressed=action & SPACE))
+            assert state(world) == expected[t][i], f"game {i} step {t}"
+
+    # the games went through the rules that matter: crashes and points
+    last = expected[-1]
+    assert any(row[1] for row in last)
+    assert max(row[0] for row in last) > 0
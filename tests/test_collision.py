@@ -0,0 +1,126 @@
+## ------------- LIBRARY -------------- ##
+import random
+
+import pytest
+
+from world import World
+from sprites import POOLS, Sprite, Bullet, Alien, Coin, Explosion, Player
+from collision import overlaps, swept_overlaps
+from snapshot import restore_pool
+
+
+# the collisions of a frame, through the real update_all of the pools (object pools and numpy arrays,
+# where the sprites end up and swept along their move): who hits what, what's left, score and crash
+# (benchmarks/collision.py times the grid against checking every pair)
+@pytest.fixture(params=[(False, False), (True, False), (False, True), (True, True)],
+                ids=['objects', 'arrays', 'objects-swept', 'arrays-swept'])
+def world(request):
+    vectorized, continuous = request.param
+    world = World(seed=1, vectorized=vectorized, continuous=continuous, stars=False)
+    world.state = "Playing"
+    for cls in POOLS:
+        place(cls)
+    return world
+
+
+def place(cls, *sprites):
+    # the pool holds exactly these (x, y, vx), in this order
+    restore_pool(cls, [x for x, _, _ in sprites], [y for _, y, _ in sprites], [vx for _, _, vx in sprites],
+                 [0] * len(sprites), [0] * len(sprites))
+
+
+def left(cls):
+    # (x, y) of the live sprites, in pool order
+    sprites = cls.sprites
+    if Sprite.vectorized:
+        n = len(sprites)
+        return list(zip(sprites.x[:n].tolist(), sprites.y[:n].tolist()))
+    return [(sprite.x, sprite.y) for sprite in sprites]
+
+
+def test_a_bullet_takes_an_alien_with_it(world):
+    place(Alien, (60, 40, 1.0), (100, 10, 1.0))
+    place(Bullet, (58, 42, Bullet.speed))
+    Alien.update_all()
+    assert left(Alien) == [(99, 10)]
+    assert left(Bullet) == []
+    assert len(Explosion.sprites) == 1
+    assert world.state == "Playing"
+
+
+def test_an_alien_on_the_ship_ends_the_game(world):
+    player = Player.player
+    place(Alien, (player.x + 3, player.y - 2, 1.0), (100, 10, 1.0))
+    Alien.update_all()
+    assert world.state == "End"
+    assert left(Alien) == [(99, 10)]
+    assert len(Explosion.sprites) == 1
+
+
+def test_a_coin_on_the_ship_is_collected(world):
+    player = Player.player
+    place(Coin, (player.x + 1, player.y, Coin.speed), (100, 10, Coin.speed))
+    Coin.update_all()
+    assert world.score == 1
+    assert left(Coin) == [(100 - Coin.speed, 10)]
+    assert world.state == "Playing"
+
+
+def test_a_fast_alien_only_hits_a_bullet_it_went_through_when_swept(world):
+    # from 70 to 50 in one frame, the bullet at 68 is behind where it ends up
+    place(Alien, (70, 40, 20.0))
+    place(Bullet, (68, 42, Bullet.speed))
+    Alien.update_all()
+    hit = world.continuous
+    assert left(Alien) == ([] if hit else [(50, 40)])
+    assert left(Bullet) == ([] if hit else [(68, 42)])
+
+
+def test_a_coin_the_ship_went_through_is_only_collected_when_swept(world):
+    # the ship went down from 20 to 60 in one frame, the coin was in the way
+    player = Player.player
+    player.py, player.y = 20, 60
+    place(Coin, (player.x + Coin.speed, 40, Coin.speed))
+    Coin.update_all()
+    assert world.score == (1 if world.continuous else 0)
+    assert left(Coin) == ([] if world.continuous else [(player.x, 40)])
+
+
+# every alien against every bullet: the first bullet it touches (in spawn order) goes with it
+def brute_force(aliens, bullets, continuous):
+    live = list(bullets)
+    kept = []
+    for x, y, vx in aliens:
+        x1 = x - vx
+        for bullet in live:
+            bx, by = bullet
+            if continuous:
+                hit = swept_overlaps(x, y, x1, y, Alien.width, Alien.height,
+                                     bx + Bullet.speed, by, bx, by, Bullet.width, Bullet.height)
+            else:
+                hit = overlaps(x1, y, Alien.width, Alien.height, bx, by, Bullet.width, Bullet.height)
+            if hit:
+                live.remove(bullet)
+                break
+        else:
+            kept.append((x1, y))
+    return kept, live
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_a_crowded_frame_matches_checking_every_pair(world, seed):
+    # away from the ship and the left edge: only aliens and bullets meet
+    rng = random.Random(seed)
+    aliens = [(rng.uniform(30, world.width), rng.randint(0, world.height - Alien.height), rng.uniform(1, 6))
+              for _ in range(Alien.max_live)]
+    bullets = [(rng.uniform(30, world.width), rng.randint(0, world.height - Bullet.height)) for _ in range(40)]
+    place(Alien, *aliens)
+    place(Bullet, *[(x, y, Bullet.speed) for x, y in bullets])
+    Alien.update_all()
+
+    kept, live = brute_force(aliens, bullets, world.continuous)
+    assert len(kept) < len(aliens)
+    assert left(Alien) == kept
+    assert left(Bullet) == live
+    assert len(Explosion.sprites) == len(aliens) - len(kept)
+    assert world.state == "Playing"
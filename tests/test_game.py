@@ -0,0 +1,192 @@
+## ------------- LIBRARY -------------- ##
+import gc
+import sys
+import types
+import atexit
+import importlib
+
+import pytest
+
+import sprites
+from sprites import Alien, Player
+from timestep import FixedTimestep
+
+
+# the front end (game.py) without a window: pyxel is replaced by a stand-in that draws nothing
+# and whose keys are set by the test, the clock moves one step per frame
+KEYS = ['KEY_UP', 'KEY_DOWN', 'KEY_LEFT', 'KEY_RIGHT', 'KEY_SPACE', 'KEY_M', 'KEY_S', 'KEY_L', 'KEY_RETURN',
+        'KEY_P', 'KEY_F1', 'KEY_F2', 'KEY_F3', 'KEY_F5', 'KEY_F9', 'KEY_BACKSPACE']
+
+
+class Image:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def cls(self, colour):
+        pass
+
+    def blt(self, *args):
+        pass
+
+    def text(self, *args):
+        pass
+
+
+def window():
+    pyxel = types.ModuleType('pyxel')
+    for code, name in enumerate(KEYS):
+        setattr(pyxel, name, code)
+    pyxel.width = 120
+    pyxel.height = 90
+    pyxel.frame_count = 0
+    pyxel.input_text = ""
+    pyxel.keys = set()
+    pyxel.btn = lambda key: key in pyxel.keys
+    pyxel.btnp = lambda key: key in pyxel.keys
+    pyxel.init = lambda width, height, **kwargs: None
+    pyxel.load = lambda *args, **kwargs: None
+    pyxel.run = lambda update, draw: None
+    pyxel.Image = Image
+    for name in ('cls', 'blt', 'text', 'rect'):
+        setattr(pyxel, name, lambda *args, **kwargs: None)
+    return pyxel
+
+
+# what a menu writes on its image
+class Texts(Image):
+    def __init__(self):
+        super().__init__(120, 90)
+        self.texts = []
+
+    def text(self, x, y, text, colour):
+        self.texts.append(text)
+
+
+class Session:
+    def __init__(self, game, pyxel):
+        self.game = game
+        self.pyxel = pyxel
+        self.now = 0.0
+
+    def frame(self, *keys, steps=1, text=""):
+        # steps=0 -> a frame that came early (a faster screen than the game's 30 steps per second)
+        self.pyxel.keys = {getattr(self.pyxel, key) for key in keys}
+        self.pyxel.input_text = text
+        self.now += steps / 30
+        self.game.update()
+        self.game.draw()
+        self.pyxel.frame_count += 1
+
+    def crash(self):
+        # an alien right on the ship
+        player = Player.player
+        Alien.spawn(player.x + 2, player.y)
+        for _ in range(5):
+            self.frame()
+            if self.game.world.state == "End":
+                return
+        raise AssertionError("the ship didn't crash")
+
+    def runs(self):
+        return self.game.leaderboard.count()
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    pyxel = window()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(sys.modules, 'pyxel', pyxel)
+    for name in ('game', 'ui', 'starfield'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.setattr(sprites, 'pyxel', pyxel)
+    # what the game leaves for the end of the process is done at the end of the test
+    closing = []
+    monkeypatch.setattr(atexit, 'register', closing.append)
+
+    game = importlib.import_module('game')
+    # (the game keeps everything on the class, the instance reads it from there)
+    session = Session(game.Game(), pyxel)
+    game.Game.timestep = FixedTimestep(rate=30, clock=lambda: session.now)
+    yield session
+
+    for close in reversed(closing):
+        close()
+    game.Game.memory.close()
+    gc.unfreeze()
+
+
+def start(session):
+    session.frame()
+    session.frame('KEY_SPACE')
+    for _ in range(30):
+        session.frame()
+    assert session.game.world.state == "Playing"
+
+
+def test_rewinding_past_a_game_over_records_the_run_once(session):
+    start(session)
+    session.crash()
+    assert session.runs() == 1
+
+    # [BACKSPACE] back into the game, then it ends again
+    for _ in range(3):
+        session.frame('KEY_BACKSPACE')
+    assert session.game.world.state == "Playing"
+    session.crash()
+    assert session.runs() == 1
+
+    # a new game is a new run
+    session.frame('KEY_M')
+    session.frame()
+    start(session)
+    session.crash()
+    assert session.runs() == 2
+
+
+def test_quickloading_past_a_game_over_records_the_run_once(session):
+    start(session)
+    session.frame('KEY_F5')
+    session.crash()
+    session.frame('KEY_F9')
+    assert session.game.world.state == "Playing"
+    session.crash()
+    assert session.runs() == 1
+
+
+def test_keys_pressed_on_frames_without_a_step_go_to_one_step_each(session):
+    start(session)
+    # [M] pauses, [S] on the pause screen opens the save menu: both pressed before a step ran
+    session.frame('KEY_M', steps=0)
+    session.frame('KEY_S', steps=0)
+    session.frame()
+    assert session.game.world.state == "Pause"
+    session.frame()
+    assert session.game.world.state == "Save Menu"
+
+
+def test_a_slot_is_shown_and_loaded_with_the_number_it_was_saved_with(session):
+    start(session)
+    # [M] pause, [S] save, slot 3 (1 and 2 stay empty), name "a", [ENTER]
+    session.frame('KEY_M')
+    session.frame('KEY_S')
+    session.frame(text="3")
+    session.frame(text="a")
+    session.frame('KEY_RETURN')
+    assert session.game.world.state == "Playing"
+    session.game.writer.close()
+    session.crash()
+    session.frame('KEY_M')
+    session.frame('KEY_L')
+    assert session.game.world.state == "Load Menu"
+
+    image = Texts()
+    session.game.render_load_menu(image)
+    assert "[3]" in image.texts and "[1]" not in image.texts
+    image = Texts()
+    session.game.render_save_slots(image)
+    assert image.texts.count("[1]") == 1 and "[2]" not in image.texts
+
+    session.frame(text="3")
+    assert session.game.world.state == "Playing"
+    assert session.game.pname == "a"
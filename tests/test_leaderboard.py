@@ -0,0 +1,76 @@
+## ------------- LIBRARY -------------- ##
+import sqlite3
+
+import pytest
+
+from leaderboard import Leaderboard
+from savestore import SaveWriter
+
+
+# a connection whose inserts fail (a full disk, a locked file), everything else goes through
+class Failing:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def executemany(self, *args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def __enter__(self):
+        return self.connection.__enter__()
+
+    def __exit__(self, *exc):
+        return self.connection.__exit__(*exc)
+
+
+@pytest.fixture
+def board(tmp_path, monkeypatch):
+    # the legacy slots (load.csv, saves/) are looked for in the working directory
+    monkeypatch.chdir(tmp_path)
+    board = Leaderboard(str(tmp_path / 'leaderboard.db'), cabinet='test')
+    yield board
+    board.close()
+
+
+def count(board):
+    with board.lock:
+        return board.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+
+def test_a_failed_flush_keeps_the_runs_for_the_next_one(board):
+    board.record("Ada", 120)
+    board.record("Bob", 80)
+    connection = board.connection
+    board.connection = Failing(connection)
+    with pytest.raises(sqlite3.Error):
+        board.flush()
+    assert len(board.pending) == 2
+
+    board.connection = connection
+    board.record("Cy", 40)
+    board.flush()
+    assert board.pending == []
+    assert count(board) == 3
+
+
+def test_the_writer_thread_flushes_the_runs_and_keeps_its_error(board):
+    writer = SaveWriter(board)
+    connection = board.connection
+    board.connection = Failing(connection)
+    board.record("Ada", 120)
+    writer.write_runs()
+    writer.save(0, "Ada", 120)
+    writer.flush()
+    assert isinstance(writer.run_error, OSError)
+    assert len(board.pending) == 1
+
+    # the next run's flush takes the one left behind too
+    board.connection = connection
+    board.record("Bob", 80)
+    writer.write_runs()
+    writer.close()
+    assert writer.run_error is None
+    assert board.pending == []
+    assert count(board) == 2
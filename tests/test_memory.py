@@ -0,0 +1,29 @@
+## ------------- LIBRARY -------------- ##
+import gc
+
+import pytest
+
+from memory import GCManager
+
+
+@pytest.fixture
+def memory():
+    threshold = gc.get_threshold()
+    memory = GCManager(safety=2)
+    memory.manage()
+    # small thresholds: a few hundred objects are enough to go through every generation
+    gc.set_threshold(50, 2, 2)
+    yield memory
+    gc.set_threshold(*threshold)
+    memory.close()
+
+
+def test_frames_without_slack_still_get_every_generation_collected(memory):
+    kept = []
+    for frame in range(200):
+        kept.append([[] for _ in range(20)])
+        memory.idle(0.0)
+    collections = [memory.stats[generation][0] for generation in range(3)]
+    assert all(collections), collections
+    assert memory.forced == sum(collections)
+    assert gc.get_count()[2] < 2 * 2
@@ -0,0 +1,127 @@
+## ------------- LIBRARY -------------- ##
+import time
+import random
+import threading
+
+import pytest
+
+import sprites
+from world import World
+from inputs import Inputs, UP, DOWN, SPACE, KEY_M
+from sprites import POOLS
+from spectate import StateEncoder, StateDecoder, Broadcaster, Spectator, NAMES, capture
+
+
+# the spectator stream (spectate.py): what the decoders rebuild is the game, on every frame,
+# also for the ones joining late, and on a real socket every frame passes the game's checksum
+# (benchmarks/spectate.py times it)
+class NullPyxel:
+    def blt(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def headless(monkeypatch):
+    monkeypatch.setattr(sprites, 'pyxel', NullPyxel())
+
+
+def inputs(world, rng):
+    # shoots and wanders, starts again after a game over
+    if world.state == "Start":
+        return Inputs(pressed=SPACE)
+    if world.state == "End":
+        return Inputs(pressed=KEY_M)
+    held = rng.choice((0, UP, DOWN, UP, DOWN, 0))
+    return Inputs(held=held, pressed=SPACE if rng.random() < 0.3 else 0)
+
+
+def expected(world):
+    player = sprites.Player.player
+    return ((int(player.x), int(player.y), player.animation_frame),
+            {name: [row[:3] for row in capture(cls)] for name, cls in zip(NAMES, POOLS)})
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_decoders_rebuild_every_frame(vectorized, frames=1500, join_every=300, seed=3):
+    world = World(seed=seed, vectorized=vectorized)
+    rng = random.Random(seed)
+    encoder = StateEncoder()
+    decoder = StateDecoder()
+    late = []
+    for frame in range(frames):
+        world.step(inputs(world, rng))
+        delta = encoder.update(world)
+        key = encoder.keyframe()
+
+        state = decoder.decode(key if frame == 0 else delta)
+        truth = expected(world)
+        assert state.sprites() == truth, f"frame {frame}"
+        assert (state.state, state.score, state.level) == (world.state, world.score, world.level)
+        # a spectator coming in now starts from the KEY
+        for other in late:
+            assert other.decode(delta).sprites() == truth, f"frame {frame}: late decoder"
+        if frame % join_every == join_every - 1:
+            joined = StateDecoder()
+            joined.decode(key)
+            late.append(joined)
+    assert len(late) == frames // join_every
+
+
+def test_a_frame_that_doesnt_match_its_checksum_is_refused():
+    world = World(seed=3)
+    rng = random.Random(3)
+    encoder = StateEncoder(checksum=True)
+    decoder = StateDecoder()
+    world.step(inputs(world, rng))
+    encoder.update(world)
+    decoder.decode(encoder.keyframe())
+    for _ in range(30):
+        world.step(inputs(world, rng))
+        decoder.decode(encoder.update(world))
+    assert decoder.checked == 31
+    world.step(inputs(world, rng))
+    message = bytearray(encoder.update(world))
+    message[-1] ^= 0xFF
+    with pytest.raises(ValueError):
+        decoder.decode(bytes(message))
+
+
+def test_spectators_on_a_socket_pass_every_checksum(frames=300, seed=3):
+    world = World(seed=seed)
+    rng = random.Random(seed)
+    broadcaster = Broadcaster(port=0, checksum=True)
+    # a slow spectator (small receive buffer, sleeps on every frame) misses frames, the game
+    # never waits for it, and what it gets is still right
+    spectators = {'fast': (Spectator(port=broadcaster.port, timeout=10), 0),
+                  'slow': (Spectator(port=broadcaster.port, timeout=10, receive_buffer=2048), 0.005)}
+    got = {}
+    errors = []
+
+    def watch(name, spectator, sleep):
+        got[name] = 0
+        try:
+            for _ in spectator.states():
+                got[name] += 1
+                if sleep:
+                    time.sleep(sleep)
+        except (ValueError, OSError) as error:
+            errors.append(f"{name}: {error}")
+
+    threads = [threading.Thread(target=watch, args=(name, spectator, sleep))
+               for name, (spectator, sleep) in spectators.items()]
+    for thread in threads:
+        thread.start()
+    for _ in range(frames):
+        world.step(inputs(world, rng))
+        broadcaster.publish(world)
+        time.sleep(0.001)
+    broadcaster.close()
+    for thread in threads:
+        thread.join()
+    for spectator, _ in spectators.values():
+        spectator.close()
+
+    assert errors == []
+    assert got['fast'] > 0 and got['slow'] > 0
+    for spectator, _ in spectators.values():
+        assert spectator.decoder.checked > 0
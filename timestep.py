@@ -0,0 +1,56 @@
+## ------------- LIBRARY -------------- ##
+import time
+
+
+### ----------------------------------- ###
+### ---------- FIXED TIMESTEP --------- ###
+### ----------------------------------- ###
+
+# the game moves a fixed amount every step (stars 2 px, aliens vx px...), so the steps
+# are run at a fixed rate of real time, whatever the number of frames actually drawn:
+#   loop = FixedTimestep(rate=30)
+#   every frame: for _ in range(loop.advance()): world.step(...)
+#                draw, loop.rendered()
+# a slow frame -> the next one runs more steps to catch up, up to max_steps,
+# so frames are skipped (not steps) and the game keeps its real speed
+class FixedTimestep:
+    def __init__(self, rate=30, max_steps=4, clock=time.perf_counter):
+        # steps per second, and the most steps run before drawing one frame
+        self.rate = rate
+        self.dt = 1 / rate
+        self.max_steps = max_steps
+        self.clock = clock
+
+        # real time not simulated yet
+        self.accumulator = 0.0
+        self.last = None
+
+        # totals: steps run, frames drawn, steps given up when even max_steps wasn't enough
+        self.steps = 0
+        self.frames = 0
+        self.dropped = 0
+
+    def advance(self):
+        # how many steps to run now
+        now = self.clock()
+        if self.last is None:
+            # first frame -> one step
+            self.last = now - self.dt
+        self.accumulator += now - self.last
+        self.last = now
+
+        steps = int(self.accumulator / self.dt)
+        self.accumulator -= steps * self.dt
+        if steps > self.max_steps:
+            # too far behind (a long hitch), forget the rest instead of catching up forever
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+        self.steps += steps
+        return steps
+
+    def rendered(self):
+        self.frames += 1
+
+    def report(self):
+        # ex: "steps 1800 frames 1200 dropped 0" -> the sim kept its pace, 600 frames were skipped
+        return f"steps {self.steps} frames {self.frames} dropped {self.dropped}"
@@ -0,0 +1,38 @@
+## ------------- LIBRARY -------------- ##
+import pyxel
+
+
+### ----------------------------------- ###
+### ------------- UI LAYERS ----------- ###
+### ----------------------------------- ###
+
+# a screen of text and logos drawn once into its own image, then put on the screen
+# with one blit every frame. It's only drawn again when its key changes
+# (the score, the save slots, the name being typed...):
+#   hud = UILayer(120, 90, render)       # render(image) draws with image.text / image.blt
+#   every frame: hud.draw(key=(score,))
+class UILayer:
+    # nothing is drawn in this colour, it's left out when the layer is put on the screen
+    # (the game draws nothing black on top of the background)
+    colkey = 0
+
+    def __init__(self, width, height, render):
+        self.width = width
+        self.height = height
+        self.render = render
+        self.image = pyxel.Image(width, height)
+        # key of what is in the image now, None -> nothing yet
+        self.key = None
+        # how many times it was drawn again (to check the cache works)
+        self.renders = 0
+
+    def invalidate(self):
+        self.key = None
+
+    def draw(self, key=()):
+        if key != self.key:
+            self.image.cls(self.colkey)
+            self.render(self.image)
+            self.key = key
+            self.renders += 1
+        pyxel.blt(0, 0, self.image, 0, 0, self.width, self.height, self.colkey)
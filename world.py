@@ -0,0 +1,148 @@
+## ------------- LIBRARY -------------- ##
+import random
+
+from sprites import Sprite, Star, Bullet, Alien, Explosion, Coin, Player, LeakCheck
+from inputs import SPACE, KEY_M, KEY_S, NO_INPUT
+from scheduler import SpawnScheduler, Waves
+
+
+### ----------------------------------- ###
+### -------------- WORLD -------------- ###
+### ----------------------------------- ###
+
+# the whole game without a window: sprites, player, score, level and state
+# the pyxel front end (game.py) only reads the keys, calls step() and draws
+# headless use (tests, tuning, replays):
+#   world = World(seed=1)
+#   world.step(Inputs(pressed=SPACE))
+#   for _ in range(1000):
+#       world.step(Inputs(held=UP))
+class World:
+    # one level up every level_points points
+    level_points = 10
+
+    def __init__(self, width=120, height=90, seed=None, vectorized=False, stars=True, leak_check=False,
+                 waves=None, continuous=False):
+        # size of the screen
+        self.width = width
+        self.height = height
+        # same seed -> same game for the same inputs
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.vectorized = vectorized
+        # True -> swept collisions (Sprite.continuous), nothing goes through anything at high levels
+        self.continuous = continuous
+        # False -> no Star sprites, the front end draws its own background (starfield.py)
+        self.stars = stars
+        # True -> fail as soon as a sprite pool keeps growing (debug, see LeakCheck)
+        self.leak_check = leak_check
+        # extra aliens / coins on level ups (scheduler.py), None -> assets/waves.json
+        self.waves = Waves.load() if waves is None else waves
+
+        self.setup()
+
+    def setup(self):
+        self.state = 'Start'
+        self.score = 0
+        self.level = 1
+        # frames since the world was created, and when the last game started
+        self.frame_count = 0
+        self.start_frame_count = 0
+
+        # the sprite classes keep their pools on the class, point them at this world
+        Sprite.world = self
+        Player.world = self
+        Sprite.vectorized = self.vectorized
+        Sprite.continuous = self.continuous
+
+        # spawn counters start over so a seed always gives the same game
+        Star.clock = 0
+        Star.count = 0
+        # an alien every Alien.spawn_interval frames (the first one on frame 17),
+        # a coin every Coin.spawn_interval frames (the first one right away)
+        self.spawns = SpawnScheduler(kinds=('alien', 'coin'), waves=self.waves)
+        self.spawns.repeat('alien', every=Alien.spawn_interval, first=Alien.spawn_interval - 1)
+        self.spawns.repeat('coin', every=Coin.spawn_interval, first=0)
+
+        # initialize x and y of the spaceship
+        Player.setup(x = 5 , y = 50)
+
+        # initialize sprite lists
+        Star.setup()
+        Bullet.setup()
+        Alien.setup()
+        Explosion.setup()
+        Coin.setup()
+
+        self.leaks = LeakCheck() if self.leak_check else None
+
+    def step(self, inputs=NO_INPUT):
+        ## START PLAYING
+        if (inputs.pressed & SPACE) and self.state == 'Start':
+            self.state = "Playing"
+            self.start_frame_count = self.frame_count
+
+        # when game is playing -> update all
+        if self.state == "Playing":
+            if self.stars:
+                Star.update_all()
+            Bullet.update_all()
+            # this frame's new aliens and coins, they move with the others right away
+            for kind, count in self.spawns.advance():
+                spawner = Alien if kind == 'alien' else Coin
+                for _ in range(count):
+                    spawner.append()
+            Alien.update_all()
+            Explosion.update_all()
+            Coin.update_all()
+            Player.update(inputs)
+
+        # when game is paused (on menu) -> let stars continue
+        if self.state == "Pause" and self.stars:
+            Star.update_all()
+
+        # when the game is over -> let stars continue and left exploded spaceship there
+        # (also on the frame the ship crashed)
+        if self.state == "End":
+            if self.stars:
+                Star.update_all()
+            Explosion.update_all()
+
+        ## RULES - checked after everything moved
+        if self.state == "Playing":
+            if inputs.pressed & KEY_M:
+                self.state = 'Pause'
+
+            # every 10 points is one level up
+            if (self.score != 0) and (self.score % self.level_points == 0):
+                level = int((self.score / self.level_points) + 1)
+                if level != self.level:
+                    self.level = level
+                    # the waves of the new level
+                    self.spawns.level_up(level)
+
+        elif self.state == "Pause":
+            # resume playing
+            if inputs.pressed & KEY_M:
+                self.state = "Playing"
+
+            # go to save menu
+            if inputs.pressed & KEY_S:
+                self.state = "Save Menu"
+
+        elif self.state == "End":
+            # the spaceship keeps exploding
+            Explosion.append(Player.player.x, Player.player.y)
+
+            # to restart the game
+            if inputs.pressed & KEY_M:
+                self.state = "Start"
+
+        self.frame_count += 1
+
+        if self.leaks is not None:
+            self.leaks.check()
+
+    # the level up banner is shown while the score is on a multiple of 10
+    def leveling_up(self):
+        return self.state == "Playing" and (self.score != 0) and (self.score % self.level_points == 0)